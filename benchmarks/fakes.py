@@ -0,0 +1,523 @@
+"""
+Dublês locais dos serviços externos, para medir o caminho de requisição sem
+consumir cota do Azure.
+
+- FakeOpenAI / FakeAsyncOpenAI: ciclo de vida de threads, runs e tool calls da
+  Assistants API (queued -> requires_action -> completed), chat.completions
+  (com tool calls, para o engine de completions) e assistants, compartilhando o
+  mesmo FakeAssistantsBackend.
+- FakeSearchClient / FakeAsyncSearchClient: consultas vetoriais do Azure AI Search.
+- FakeTransport: ServiceNow Table API e webhook do Teams, no lugar do HttpTransport.
+
+Cada dependência tem uma LatencyModel própria.
+"""
+
+import asyncio
+import itertools
+import json
+import math
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+INCIDENT_RE = re.compile(r"INC\d{8}")
+TERMINAL_STATUSES = ("completed", "failed", "cancelled", "expired", "incomplete")
+
+
+class LatencyModel:
+    """
+    Distribuição log-normal de latência, definida pela mediana e pelo p95 (ms).
+
+    ``LatencyModel.parse("120,400")`` cria o modelo a partir da linha de comando;
+    ``"0"`` desliga a latência.
+    """
+
+    def __init__(self, median_ms=0.0, p95_ms=None, seed=None):
+        self.median_ms = float(median_ms)
+        self.p95_ms = float(p95_ms) if p95_ms is not None else self.median_ms
+        # p95 de uma log-normal = mediana * exp(1.645 * sigma)
+        self.sigma = (
+            math.log(self.p95_ms / self.median_ms) / 1.645
+            if self.median_ms > 0 and self.p95_ms > self.median_ms
+            else 0.0
+        )
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, spec):
+        values = [float(value) for value in str(spec).split(",") if value.strip()]
+        return cls(*values[:2]) if values else cls()
+
+    def sample_seconds(self):
+        if self.median_ms <= 0:
+            return 0.0
+        with self._lock:
+            factor = self._random.lognormvariate(0, self.sigma) if self.sigma else 1
+        return self.median_ms * factor / 1000
+
+    def sleep(self):
+        delay = self.sample_seconds()
+        if delay:
+            time.sleep(delay)
+
+    async def asleep(self):
+        delay = self.sample_seconds()
+        if delay:
+            await asyncio.sleep(delay)
+
+    def __repr__(self):
+        return f"LatencyModel(median_ms={self.median_ms}, p95_ms={self.p95_ms})"
+
+
+def default_tool_plan(content):
+    """
+    Decide as rodadas de ferramentas de um run a partir da pergunta do usuário.
+
+    :return: Lista de rodadas; cada rodada é uma lista de (nome, argumentos).
+    """
+    incidents = INCIDENT_RE.findall(content)
+    if incidents:
+        return [[("get_incident_status", {"incident_numbers": incidents})]]
+    if "agente" in content.lower():
+        return [[("transfer_to_teams_agent", {"message": content})]]
+    return [[("ai_search_tool", {"query": content, "search_needed": True})]]
+
+
+def _text_message(message_id, thread_id, role, text, run_id=None):
+    block = SimpleNamespace(type="text", text=SimpleNamespace(value=text))
+    return SimpleNamespace(
+        id=message_id, thread_id=thread_id, role=role, content=[block], run_id=run_id
+    )
+
+
+class FakeAssistantsBackend:
+    """
+    Estado compartilhado pelos clientes falsos síncrono e assíncrono.
+
+    Um run fica pendente até o tempo sorteado em ``run_latency``; depois passa por
+    cada rodada de ``tool_plan`` (``requires_action``) e termina ``completed``,
+    gravando a resposta do assistente no thread.
+    """
+
+    def __init__(self, run_latency=None, tool_plan=default_tool_plan):
+        self.run_latency = run_latency or LatencyModel()
+        self.tool_plan = tool_plan
+        self.threads = {}
+        self.runs = {}
+        self.assistants = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _new_id(self, prefix):
+        return f"{prefix}_{next(self._ids)}"
+
+    # --- threads e mensagens -------------------------------------------------
+    def create_thread(self, messages=None):
+        with self._lock:
+            thread_id = self._new_id("thread")
+            self.threads[thread_id] = []
+        for message in messages or []:
+            self.create_message(thread_id, message["role"], message["content"])
+        return SimpleNamespace(id=thread_id)
+
+    def retrieve_thread(self, thread_id):
+        if thread_id not in self.threads:
+            raise KeyError(f"Thread {thread_id} não encontrada.")
+        return SimpleNamespace(id=thread_id)
+
+    def create_message(self, thread_id, role, content, run_id=None):
+        with self._lock:
+            message = _text_message(
+                self._new_id("msg"), thread_id, role, content, run_id
+            )
+            self.threads[thread_id].append(message)
+        return message
+
+    def list_messages(self, thread_id, run_id=None, order="desc", after=None, **_):
+        with self._lock:
+            messages = list(self.threads.get(thread_id, []))
+        if run_id is not None:
+            messages = [m for m in messages if m.run_id == run_id]
+        if order == "desc":
+            messages.reverse()
+        if after is not None:
+            ids = [m.id for m in messages]
+            messages = messages[ids.index(after) + 1 :] if after in ids else []
+        return messages
+
+    # --- runs ---------------------------------------------------------------
+    def create_run(self, thread_id, **params):
+        last_user = next(
+            (m for m in reversed(self.threads[thread_id]) if m.role == "user"), None
+        )
+        content = last_user.content[0].text.value if last_user else ""
+        with self._lock:
+            run_id = self._new_id("run")
+            self.runs[run_id] = {
+                "id": run_id,
+                "thread_id": thread_id,
+                "content": content,
+                "status": "queued",
+                "rounds": list(self.tool_plan(content)),
+                "ready_at": time.monotonic() + self.run_latency.sample_seconds(),
+                "tool_calls": None,
+            }
+        return self.retrieve_run(thread_id, run_id)
+
+    def retrieve_run(self, thread_id, run_id):
+        with self._lock:
+            state = self.runs[run_id]
+            if state["status"] in ("queued", "in_progress"):
+                if time.monotonic() < state["ready_at"]:
+                    state["status"] = "in_progress"
+                elif state["rounds"]:
+                    state["status"] = "requires_action"
+                    state["tool_calls"] = [
+                        SimpleNamespace(
+                            id=self._new_id("call"),
+                            type="function",
+                            function=SimpleNamespace(
+                                name=name, arguments=json.dumps(arguments)
+                            ),
+                        )
+                        for name, arguments in state["rounds"].pop(0)
+                    ]
+                else:
+                    state["status"] = "completed"
+                    answer = f"Resposta simulada para: {state['content']}"
+                    self.threads[thread_id].append(
+                        _text_message(
+                            self._new_id("msg"), thread_id, "assistant", answer, run_id
+                        )
+                    )
+            return self._run_object(state)
+
+    def submit_tool_outputs(self, thread_id, run_id, tool_outputs):
+        with self._lock:
+            state = self.runs[run_id]
+            if state["status"] != "requires_action":
+                raise ValueError(f"Run {run_id} não está aguardando ferramentas.")
+            expected = {call.id for call in state["tool_calls"]}
+            received = {output["tool_call_id"] for output in tool_outputs}
+            if expected != received:
+                raise ValueError("tool_outputs não correspondem às tool calls.")
+            state["status"] = "queued"
+            state["tool_calls"] = None
+            state["ready_at"] = time.monotonic() + self.run_latency.sample_seconds()
+            return self._run_object(state)
+
+    def cancel_run(self, thread_id, run_id):
+        with self._lock:
+            state = self.runs[run_id]
+            if state["status"] not in TERMINAL_STATUSES:
+                state["status"] = "cancelled"
+            return self._run_object(state)
+
+    @staticmethod
+    def _run_object(state):
+        required_action = None
+        if state["status"] == "requires_action":
+            required_action = SimpleNamespace(
+                type="submit_tool_outputs",
+                submit_tool_outputs=SimpleNamespace(tool_calls=state["tool_calls"]),
+            )
+        return SimpleNamespace(
+            id=state["id"],
+            thread_id=state["thread_id"],
+            status=state["status"],
+            required_action=required_action,
+        )
+
+    # --- assistants e chat completions ----------------------------------------
+    def create_assistant(self, **params):
+        with self._lock:
+            assistant = SimpleNamespace(id=self._new_id("asst"), **params)
+            self.assistants[assistant.id] = assistant
+        return assistant
+
+    def update_assistant(self, assistant_id, **params):
+        assistant = self.assistants[assistant_id]
+        for key, value in params.items():
+            setattr(assistant, key, value)
+        return assistant
+
+    def list_assistants(self, **_):
+        return list(self.assistants.values())
+
+    def chat_completion(self, messages=(), tools=None, tool_choice=None, **_):
+        """
+        Sem ferramentas, um resumo; com ferramentas, uma rodada do engine de chat
+        completions: as tool calls de ``tool_plan`` ainda não feitas desde a última
+        pergunta ou, esgotadas (ou ``tool_choice="none"``), a resposta final.
+        """
+        completion_id = self._new_id("chatcmpl")
+        if not tools:
+            return _completion(completion_id, "Resumo simulado.")
+        last_user = max(
+            (i for i, m in enumerate(messages) if m["role"] == "user"), default=0
+        )
+        content = messages[last_user]["content"] if messages else ""
+        done = sum(1 for m in messages[last_user:] if m["role"] == "assistant")
+        plan = self.tool_plan(content)
+        if tool_choice != "none" and done < len(plan):
+            tool_calls = [
+                SimpleNamespace(
+                    id=self._new_id("call"),
+                    type="function",
+                    function=SimpleNamespace(
+                        name=name, arguments=json.dumps(arguments)
+                    ),
+                )
+                for name, arguments in plan[done]
+            ]
+            return _completion(completion_id, None, tool_calls)
+        return _completion(completion_id, f"Resposta simulada para: {content}")
+
+
+def _completion(completion_id, content, tool_calls=None):
+    return SimpleNamespace(
+        id=completion_id,
+        choices=[
+            SimpleNamespace(
+                message=SimpleNamespace(content=content, tool_calls=tool_calls)
+            )
+        ],
+    )
+
+
+class _RawResponse:
+    def __init__(self, run, poll_after_ms):
+        self._run = run
+        self.headers = {"openai-poll-after-ms": str(poll_after_ms)}
+
+    def parse(self):
+        return self._run
+
+
+class FakeOpenAI:
+    """
+    Substituto do AzureOpenAI: mesma superfície usada pelo projeto (beta.threads,
+    beta.assistants e chat.completions), com latência por chamada de API.
+    """
+
+    def __init__(self, backend, api_latency=None, poll_after_ms=200, **_):
+        self.backend = backend
+        self.api_latency = api_latency or LatencyModel()
+        call = self._call
+
+        runs = SimpleNamespace(
+            create=lambda thread_id, **p: call(backend.create_run, thread_id, **p),
+            retrieve=lambda thread_id, run_id: call(
+                backend.retrieve_run, thread_id, run_id
+            ),
+            submit_tool_outputs=lambda thread_id, run_id, tool_outputs: call(
+                backend.submit_tool_outputs, thread_id, run_id, tool_outputs
+            ),
+            cancel=lambda thread_id, run_id: call(
+                backend.cancel_run, thread_id, run_id
+            ),
+            with_raw_response=SimpleNamespace(
+                retrieve=lambda thread_id, run_id: _RawResponse(
+                    call(backend.retrieve_run, thread_id, run_id), poll_after_ms
+                )
+            ),
+        )
+        messages = SimpleNamespace(
+            create=lambda thread_id, role, content: call(
+                backend.create_message, thread_id, role, content
+            ),
+            list=lambda thread_id, **p: call(backend.list_messages, thread_id, **p),
+        )
+        self.beta = SimpleNamespace(
+            threads=SimpleNamespace(
+                create=lambda messages=None: call(backend.create_thread, messages),
+                retrieve=lambda thread_id: call(backend.retrieve_thread, thread_id),
+                messages=messages,
+                runs=runs,
+            ),
+            assistants=SimpleNamespace(
+                create=lambda **p: call(backend.create_assistant, **p),
+                update=lambda assistant_id, **p: call(
+                    backend.update_assistant, assistant_id, **p
+                ),
+                list=lambda **p: call(backend.list_assistants, **p),
+            ),
+        )
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._complete))
+
+    def _complete(self, **params):
+        # com ferramentas é uma rodada de geração: mesma latência de um passo do run
+        if params.get("tools"):
+            self.backend.run_latency.sleep()
+        return self._call(self.backend.chat_completion, **params)
+
+    def _call(self, method, *args, **kwargs):
+        self.api_latency.sleep()
+        return method(*args, **kwargs)
+
+
+class _AsyncList:
+    """Lista que também pode ser percorrida com ``async for`` (como AsyncPaginator)."""
+
+    def __init__(self, items):
+        self._items = items
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for item in self._items:
+            yield item
+
+
+class _AsyncMessagePage:
+    """Como o AsyncPaginator: ``async for`` sem ``await`` prévio."""
+
+    def __init__(self, pending):
+        self._pending = pending
+
+    async def __aiter__(self):
+        for message in await self._pending:
+            yield message
+
+
+class FakeAsyncOpenAI:
+    """Substituto do AsyncAzureOpenAI, sobre o mesmo backend do FakeOpenAI."""
+
+    def __init__(self, backend, api_latency=None, poll_after_ms=200, **_):
+        self.backend = backend
+        self.api_latency = api_latency or LatencyModel()
+        self.poll_after_ms = poll_after_ms
+        call = self._call
+
+        async def raw_retrieve(thread_id, run_id):
+            run = await call(backend.retrieve_run, thread_id, run_id)
+            return _RawResponse(run, self.poll_after_ms)
+
+        self.beta = SimpleNamespace(
+            threads=SimpleNamespace(
+                create=lambda messages=None: call(backend.create_thread, messages),
+                retrieve=lambda thread_id: call(backend.retrieve_thread, thread_id),
+                messages=SimpleNamespace(
+                    create=lambda thread_id, role, content: call(
+                        backend.create_message, thread_id, role, content
+                    ),
+                    list=lambda thread_id, **p: _AsyncMessagePage(
+                        call(backend.list_messages, thread_id, **p)
+                    ),
+                ),
+                runs=SimpleNamespace(
+                    create=lambda thread_id, **p: call(
+                        backend.create_run, thread_id, **p
+                    ),
+                    retrieve=lambda thread_id, run_id: call(
+                        backend.retrieve_run, thread_id, run_id
+                    ),
+                    with_raw_response=SimpleNamespace(retrieve=raw_retrieve),
+                    submit_tool_outputs=lambda thread_id, run_id, tool_outputs: call(
+                        backend.submit_tool_outputs, thread_id, run_id, tool_outputs
+                    ),
+                    cancel=lambda thread_id, run_id: call(
+                        backend.cancel_run, thread_id, run_id
+                    ),
+                ),
+            ),
+        )
+
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._complete))
+
+    async def _complete(self, **params):
+        if params.get("tools"):
+            await self.backend.run_latency.asleep()
+        return await self._call(self.backend.chat_completion, **params)
+
+    async def _call(self, method, *args, **kwargs):
+        await self.api_latency.asleep()
+        return method(*args, **kwargs)
+
+
+def fake_documents(query, count):
+    """Documentos sintéticos para uma consulta (textos distintos, scores decrescentes)."""
+    return [
+        {
+            "chunk": (
+                f"Trecho {i} sobre {query}. Procedimento número {i} descrito em "
+                f"detalhes para o tema consultado. Consulte a seção {i + 1}."
+            ),
+            "title": f"documento-{i}.pdf",
+            "metadata_storage_path": f"https://storage.local/docs/documento-{i}.pdf",
+            "@search.score": round(1 / (i + 1), 4),
+        }
+        for i in range(count)
+    ]
+
+
+class FakeSearchClient:
+    """Substituto do SearchClient: devolve ``top`` documentos sintéticos."""
+
+    def __init__(self, latency=None, **_):
+        self.latency = latency or LatencyModel()
+
+    def search(self, search_text=None, top=3, vector_queries=None, **_):
+        self.latency.sleep()
+        query = vector_queries[0]["text"] if vector_queries else search_text or ""
+        return fake_documents(query, top)
+
+
+class FakeAsyncSearchClient(FakeSearchClient):
+    async def search(self, search_text=None, top=3, vector_queries=None, **_):
+        await self.latency.asleep()
+        query = vector_queries[0]["text"] if vector_queries else search_text or ""
+        return _AsyncList(fake_documents(query, top))
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, payload=None):
+        self.status_code = status_code
+        self._payload = payload or {}
+        self.text = json.dumps(self._payload)
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+class FakeTransport:
+    """
+    Substituto do HttpTransport: responde à Table API do ServiceNow (consultas
+    ``u_numberIN...``) e aceita os posts do webhook do Teams.
+    """
+
+    def __init__(self, servicenow_latency=None, webhook_latency=None):
+        self.servicenow_latency = servicenow_latency or LatencyModel()
+        self.webhook_latency = webhook_latency or LatencyModel()
+        self.webhook_posts = 0
+
+    def get(self, url, params=None, **_):
+        self.servicenow_latency.sleep()
+        query = (params or {}).get("sysparm_query", "")
+        numbers = INCIDENT_RE.findall(query)
+        return FakeResponse(
+            payload={
+                "result": [
+                    {
+                        "u_number": number,
+                        "u_short_description": "Incidente simulado",
+                        "u_state": "Em andamento",
+                        "u_priority": "3",
+                    }
+                    for number in numbers
+                ]
+            }
+        )
+
+    def post(self, url, json=None, **_):
+        self.webhook_latency.sleep()
+        self.webhook_posts += 1
+        return FakeResponse()
@@ -0,0 +1,334 @@
+"""
+Teste de carga offline do caminho de requisição.
+
+Executa ``function_app.chatbotapi`` (ou ``chatbotapi_async``) contra os dublês de
+benchmarks.fakes, em vários níveis de concorrência, e reporta vazão e latências
+p50/p95/p99. Nenhuma chamada sai da máquina.
+
+Uso:
+    python -m benchmarks.load_test --concurrency 1,4,16 --requests 100
+    python -m benchmarks.load_test --route chatbotapi_async --run-latency 800,2500
+    python -m benchmarks.load_test --json resultados.json
+
+As latências são ``mediana,p95`` em ms (distribuição log-normal).
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fakes import (
+    FakeAssistantsBackend,
+    FakeAsyncOpenAI,
+    FakeAsyncSearchClient,
+    FakeOpenAI,
+    FakeSearchClient,
+    FakeTransport,
+    LatencyModel,
+)
+
+DEFAULT_QUESTIONS = (
+    "Como configuro a VPN no notebook?",
+    "Qual o procedimento para resetar a senha do e-mail?",
+    "Qual o status do incidente INC00000042?",
+    "Como solicito acesso ao sistema financeiro?",
+    "Quero falar com um agente",
+    "Onde encontro a política de home office?",
+)
+
+BENCHMARK_ENV = {
+    "AZURE_OPENAI_ENDPOINT": "https://openai.local",
+    "AZURE_OPENAI_API_KEY": "benchmark",
+    "AZURE_OPENAI_API_VERSION": "2024-05-01-preview",
+    "AZURE_OPENAI_DEPLOYMENT_ID": "benchmark-deployment",
+    "AZURE_AI_SEARCH_API_KEY": "benchmark",
+    "AZURE_AI_SEARCH_ENDPOINT": "https://search.local",
+    "AZURE_AI_SEARCH_INDEX": "benchmark-index",
+    "SN_INSTANCE_URL": "https://servicenow.local",
+    "TEAMS_WEBHOOK_URL": "https://teams.local/webhook",
+    # sem caches: cada requisição percorre o caminho completo
+    "ANSWER_CACHE_ENABLED": "false",
+    "AI_SEARCH_CACHE_ENABLED": "false",
+    "HANDOFF_QUEUE_MODE": "inprocess",
+}
+
+
+def percentile(values, pct):
+    """Percentil pelo método nearest-rank."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(-(-pct * len(ordered) // 100)), 1)
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def install_fakes(latencies, with_caches=False, engine=None):
+    """
+    Troca os clientes externos pelos dublês. Deve rodar antes de importar
+    function_app, que monta os clientes no import.
+
+    :param latencies: Dicionário de LatencyModel (openai, run, search, servicenow,
+        webhook).
+    :return: Função que desfaz as trocas.
+    """
+    from services import assistant, async_assistant, teams_handoff
+    from services.tools import ai_search_tool
+    from utils import http_transport
+
+    previous_env = {key: os.environ.get(key) for key in (*BENCHMARK_ENV, "CHAT_ENGINE")}
+    os.environ.update(BENCHMARK_ENV)
+    os.environ.setdefault(
+        "ASSISTANT_REGISTRY_PATH",
+        os.path.join(tempfile.mkdtemp(prefix="bench-"), "registry.json"),
+    )
+    if engine:
+        os.environ["CHAT_ENGINE"] = engine
+    if with_caches:
+        os.environ["ANSWER_CACHE_ENABLED"] = "true"
+        os.environ["AI_SEARCH_CACHE_ENABLED"] = "true"
+
+    backend = FakeAssistantsBackend(run_latency=latencies["run"])
+    patches = [
+        (
+            assistant,
+            "AzureOpenAI",
+            lambda **_: FakeOpenAI(backend, latencies["openai"]),
+        ),
+        (
+            async_assistant,
+            "AsyncAzureOpenAI",
+            lambda **_: FakeAsyncOpenAI(backend, latencies["openai"]),
+        ),
+        (
+            teams_handoff,
+            "AzureOpenAI",
+            lambda **_: FakeOpenAI(backend, latencies["openai"]),
+        ),
+        (
+            ai_search_tool,
+            "SearchClient",
+            lambda **_: FakeSearchClient(latencies["search"]),
+        ),
+        (
+            ai_search_tool,
+            "AsyncSearchClient",
+            lambda **_: FakeAsyncSearchClient(latencies["search"]),
+        ),
+        (
+            http_transport,
+            "_default_transport",
+            FakeTransport(latencies["servicenow"], latencies["webhook"]),
+        ),
+    ]
+    originals = [(module, name, getattr(module, name)) for module, name, _ in patches]
+    for module, name, replacement in patches:
+        setattr(module, name, replacement)
+
+    def restore():
+        for module, name, original in originals:
+            setattr(module, name, original)
+        for key, value in previous_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+    return restore
+
+
+def user_function(function):
+    """Função Python por trás de uma rota registrada no FunctionApp."""
+    builder = getattr(function, "_function", None)
+    return builder.get_user_function() if builder is not None else function
+
+
+def build_request(content):
+    import azure.functions as func
+
+    return func.HttpRequest(
+        method="POST",
+        url="/api/chatbotapi",
+        body=json.dumps({"role": "user", "content": content}).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+
+
+def run_level(handler, concurrency, total_requests, questions):
+    """
+    Dispara ``total_requests`` requisições com ``concurrency`` em paralelo.
+
+    :return: Dicionário com vazão, percentis de latência (ms) e erros.
+    """
+    cycle = itertools.cycle(questions)
+    contents = [next(cycle) for _ in range(total_requests)]
+
+    def one(content):
+        started = time.perf_counter()
+        response = handler(build_request(content))
+        return (time.perf_counter() - started) * 1000, is_success(response)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(one, contents))
+    elapsed = time.perf_counter() - started
+    return summarize(concurrency, results, elapsed)
+
+
+async def arun_level(handler, concurrency, total_requests, questions):
+    """Versão de run_level para rotas async, num único event loop."""
+    cycle = itertools.cycle(questions)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(content):
+        async with semaphore:
+            started = time.perf_counter()
+            response = await handler(build_request(content))
+            return (time.perf_counter() - started) * 1000, is_success(response)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one(next(cycle)) for _ in range(total_requests)))
+    return summarize(concurrency, results, time.perf_counter() - started)
+
+
+def is_success(response):
+    """Status 200 com uma resposta de verdade (não a mensagem de erro padrão)."""
+    from services.chat_services import ERROR_ANSWER
+
+    if response.status_code != 200:
+        return False
+    return json.loads(response.get_body()).get("answer") != ERROR_ANSWER
+
+
+def summarize(concurrency, results, elapsed):
+    latencies = [latency for latency, _ in results]
+    errors = sum(1 for _, ok in results if not ok)
+    return {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "errors": errors,
+        "throughput_rps": round(len(results) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "max_ms": round(max(latencies, default=0), 1),
+    }
+
+
+def format_table(rows):
+    header = (
+        f"{'conc':>5} {'reqs':>6} {'erros':>6} {'req/s':>8} "
+        f"{'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+    )
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        lines.append(
+            f"{row['concurrency']:>5} {row['requests']:>6} {row['errors']:>6} "
+            f"{row['throughput_rps']:>8.2f} {row['p50_ms']:>8.1f} "
+            f"{row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['max_ms']:>8.1f}"
+        )
+    return "\n".join(lines)
+
+
+def run_benchmark(
+    route="chatbotapi",
+    concurrency_levels=(1, 4, 16),
+    requests_per_level=50,
+    latencies=None,
+    questions=DEFAULT_QUESTIONS,
+    with_caches=False,
+    engine=None,
+):
+    """
+    Monta o function_app com os dublês e mede cada nível de concorrência.
+
+    :param engine: CHAT_ENGINE a medir (assistants ou completions); padrão: o do
+        ambiente.
+
+    :return: Lista de resultados (um dicionário por nível).
+    """
+    latencies = {**default_latencies(), **(latencies or {})}
+    restore = install_fakes(latencies, with_caches=with_caches, engine=engine)
+    try:
+        import function_app
+
+        handler = user_function(getattr(function_app, route))
+        results = []
+        for concurrency in concurrency_levels:
+            if asyncio.iscoroutinefunction(handler):
+                result = asyncio.run(
+                    arun_level(handler, concurrency, requests_per_level, questions)
+                )
+            else:
+                result = run_level(handler, concurrency, requests_per_level, questions)
+            results.append(result)
+        return results
+    finally:
+        restore()
+
+
+def default_latencies():
+    return {
+        "openai": LatencyModel(60, 200),
+        "run": LatencyModel(800, 2500),
+        "search": LatencyModel(120, 400),
+        "servicenow": LatencyModel(150, 600),
+        "webhook": LatencyModel(100, 300),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--route", default="chatbotapi", choices=("chatbotapi", "chatbotapi_async")
+    )
+    parser.add_argument("--concurrency", default="1,4,16")
+    parser.add_argument("--requests", type=int, default=50, help="por nível")
+    parser.add_argument("--openai-latency", default="60,200")
+    parser.add_argument("--run-latency", default="800,2500")
+    parser.add_argument("--search-latency", default="120,400")
+    parser.add_argument("--servicenow-latency", default="150,600")
+    parser.add_argument("--webhook-latency", default="100,300")
+    parser.add_argument("--with-caches", action="store_true")
+    parser.add_argument("--engine", choices=("assistants", "completions"))
+    parser.add_argument("--json", help="grava os resultados neste arquivo")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    latencies = {
+        "openai": LatencyModel.parse(args.openai_latency),
+        "run": LatencyModel.parse(args.run_latency),
+        "search": LatencyModel.parse(args.search_latency),
+        "servicenow": LatencyModel.parse(args.servicenow_latency),
+        "webhook": LatencyModel.parse(args.webhook_latency),
+    }
+    results = run_benchmark(
+        route=args.route,
+        concurrency_levels=[int(c) for c in args.concurrency.split(",")],
+        requests_per_level=args.requests,
+        latencies=latencies,
+        with_caches=args.with_caches,
+        engine=args.engine,
+    )
+    print(format_table(results))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(
+                {"route": args.route, "args": vars(args), "results": results},
+                f,
+                indent=2,
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,397 @@
+"""
+Micro-benchmarks dos helpers do caminho quente.
+
+Cada benchmark mede o tempo por chamada (melhor de ``--repeat`` rodadas) e é
+comparado com a baseline gravada em benchmarks/baselines.json. Os tempos são
+normalizados por uma calibração (um laço Python fixo), para que a baseline
+sobreviva a máquinas um pouco mais rápidas ou mais lentas.
+
+Uso:
+    python -m benchmarks.micro                # compara com a baseline
+    python -m benchmarks.micro --update       # regrava a baseline
+    python -m benchmarks.micro --only ai_search
+
+Sai com código 1 se algum benchmark ficar mais lento que a baseline além do
+limite (``--threshold`` ou ``MICRO_BENCH_THRESHOLD``, padrão: 0.25 = 25%).
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from benchmarks.fakes import fake_documents
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+
+# variáveis mínimas para instanciar as ferramentas sem tocar a rede
+TOOL_ENV = {
+    "AZURE_AI_SEARCH_API_KEY": "benchmark",
+    "AZURE_AI_SEARCH_ENDPOINT": "https://search.local",
+    "AZURE_AI_SEARCH_INDEX": "benchmark-index",
+    "AI_SEARCH_CACHE_ENABLED": "false",
+    "SN_INSTANCE_URL": "https://servicenow.local",
+    "TEAMS_WEBHOOK_URL": "https://teams.local/webhook",
+}
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """
+    Registra um benchmark. A função decorada é um context manager que prepara o
+    cenário e entrega (yield) a função a ser medida.
+    """
+
+    def decorator(setup):
+        BENCHMARKS[name] = contextmanager(setup)
+        return setup
+
+    return decorator
+
+
+@contextmanager
+def _quiet_loader():
+    """
+    Silencia o loader: os logs de ferramentas ausentes do config.yaml poluiriam a
+    saída, e as fases registradas no profiler do processo iriam acumular.
+    """
+    from utils import tool_loader
+    from utils.startup_profiler import StartupProfiler
+
+    logging.disable(logging.ERROR)
+    try:
+        with patch.object(tool_loader, "startup_profiler", StartupProfiler()):
+            yield
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+@benchmark("tool_loader.lazy")
+def _bench_tool_loader_lazy():
+    from services import tools as tools_package
+    from utils.tool_loader import load_tools_from_package
+
+    with _quiet_loader():
+        yield lambda: load_tools_from_package(tools_package, lazy=True)
+
+
+@benchmark("tool_loader.eager")
+def _bench_tool_loader_eager():
+    from services import tools as tools_package
+    from utils.tool_loader import load_tools_from_package
+
+    with patch.dict(os.environ, TOOL_ENV), _quiet_loader():
+        load_tools_from_package(tools_package, lazy=False)  # imports fora da medição
+        yield lambda: load_tools_from_package(tools_package, lazy=False)
+
+
+class _EchoTool:
+    """Ferramenta sintética: mede só o custo do despacho, não o da ferramenta."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def get_tool_infos(self):
+        return {
+            "type": "function",
+            "function": {"name": self.name, "description": "", "parameters": {}},
+        }
+
+    def execute(self, **kwargs):
+        return kwargs
+
+
+def _bare_assistant(tool_count):
+    from services.assistant import Assistant
+
+    assistant = Assistant.__new__(Assistant)  # sem cliente nem registry
+    assistant.tool_instances = [_EchoTool(f"tool_{i}") for i in range(tool_count)]
+    assistant.tool_map = assistant._map_tools()
+    return assistant
+
+
+@benchmark("assistant.map_tools[20]")
+def _bench_map_tools():
+    assistant = _bare_assistant(20)
+    yield assistant._map_tools
+
+
+@benchmark("assistant.call_tool_by_name")
+def _bench_call_tool_by_name():
+    assistant = _bare_assistant(20)
+    context = SimpleNamespace()
+    arguments = json.dumps(
+        {
+            "query": "Como configuro a VPN no notebook?",
+            "k_results": 3,
+            "search_needed": True,
+        }
+    )
+    yield lambda: assistant.call_tool_by_name(context, "tool_10", arguments)
+
+
+def _search_tool():
+    from services.tools.ai_search_tool import AISearchTool
+
+    with patch.dict(os.environ, TOOL_ENV):
+        return AISearchTool()
+
+
+@benchmark("ai_search.process_results[300]")
+def _bench_process_results():
+    tool = _search_tool()
+    results = fake_documents("configuração da VPN", 300)
+    yield lambda: tool._process_results(results, k_results=3)
+
+
+@benchmark("ai_search.format_citation[300]")
+def _bench_format_citation():
+    tool = _search_tool()
+    results = [
+        {**document, "score": document["@search.score"]}
+        for document in fake_documents("configuração da VPN", 300)
+    ]
+    yield lambda: tool._format_citation(results)
+
+
+@benchmark("chat.extract_answer[200]")
+def _bench_extract_answer():
+    from services.chat_services import extract_answer
+
+    blocks = [
+        SimpleNamespace(
+            type="text",
+            text=SimpleNamespace(
+                value=f"Parágrafo {i} da resposta, com citação [{i}]. "
+            ),
+        )
+        for i in range(200)
+    ]
+    messages = [
+        SimpleNamespace(role="user", content=[]),
+        SimpleNamespace(role="assistant", content=blocks),
+    ]
+    yield lambda: extract_answer(messages)
+
+
+def measure(func, repeat=7, min_time=0.1):
+    """
+    Tempo por chamada, em ns: ajusta o número de chamadas até uma rodada durar
+    ``min_time`` segundos e devolve a melhor de ``repeat`` rodadas.
+    """
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+    best = elapsed
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, time.perf_counter() - started)
+    return best / number * 1e9
+
+
+def _calibration_workload():
+    total = 0
+    for i in range(1000):
+        total += i * i % 7
+    return total
+
+
+def calibrate(repeat=7, min_time=0.1):
+    """Tempo (ns) de um laço Python fixo, usado para normalizar os resultados."""
+    return measure(_calibration_workload, repeat=repeat, min_time=min_time)
+
+
+def run_benchmarks(names=None, repeat=7, min_time=0.1):
+    """
+    Executa os benchmarks selecionados.
+
+    :param names: Filtros por substring do nome; None executa todos.
+    :return: Dicionário com a calibração e o tempo por chamada (ns) de cada benchmark.
+    """
+    results = {}
+    # calibra antes de cada benchmark e fica com o melhor tempo, que é o mais estável
+    calibration = calibrate(repeat=repeat, min_time=min_time)
+    for name, setup in BENCHMARKS.items():
+        if names and not any(selected in name for selected in names):
+            continue
+        calibration = min(calibration, calibrate(repeat=repeat, min_time=min_time))
+        with setup() as func:
+            results[name] = round(measure(func, repeat=repeat, min_time=min_time), 1)
+    return {
+        "calibration_ns": round(calibration, 1),
+        "python": platform.python_version(),
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """
+    Compara os tempos normalizados pela calibração de cada execução.
+
+    :return: Lista de linhas (name, baseline_ns, current_ns, ratio, regressed);
+        ``ratio`` é None para benchmarks sem baseline.
+    """
+    scale = baseline["calibration_ns"] / current["calibration_ns"]
+    rows = []
+    for name, current_ns in current["results"].items():
+        baseline_ns = baseline["results"].get(name)
+        ratio = current_ns * scale / baseline_ns if baseline_ns else None
+        rows.append(
+            {
+                "name": name,
+                "baseline_ns": baseline_ns,
+                "current_ns": current_ns,
+                "ratio": round(ratio, 3) if ratio is not None else None,
+                "regressed": ratio is not None and ratio > 1 + threshold,
+            }
+        )
+    return rows
+
+
+def check(baseline, names=None, repeat=7, min_time=0.1, threshold=0.25, retries=2):
+    """
+    Mede e compara com a baseline. Benchmarks acima do limite são medidos de novo
+    (até ``retries`` vezes) e só contam como regressão se continuarem acima: um
+    pico isolado de ruído na máquina não derruba o gate.
+
+    :return: Linhas de ``compare``, com a melhor medição de cada benchmark.
+    """
+    rows = compare(
+        run_benchmarks(names, repeat=repeat, min_time=min_time), baseline, threshold
+    )
+    for _ in range(retries):
+        suspects = [row["name"] for row in rows if row["regressed"]]
+        if not suspects:
+            break
+        retried = compare(
+            run_benchmarks(suspects, repeat=repeat, min_time=min_time),
+            baseline,
+            threshold,
+        )
+        by_name = {row["name"]: row for row in retried}
+        rows = [
+            (
+                by_name[row["name"]]
+                if row["name"] in by_name
+                and by_name[row["name"]]["ratio"] < row["ratio"]
+                else row
+            )
+            for row in rows
+        ]
+    return rows
+
+
+def load_baselines(path=BASELINES_PATH):
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def write_baselines(data, path=BASELINES_PATH):
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(data, file, indent=2, sort_keys=True)
+        file.write("\n")
+
+
+def _format_ns(value):
+    if value is None:
+        return "-"
+    if value >= 1e6:
+        return f"{value / 1e6:.2f} ms"
+    if value >= 1e3:
+        return f"{value / 1e3:.1f} µs"
+    return f"{value:.0f} ns"
+
+
+def format_table(rows):
+    header = f"{'benchmark':<34} {'baseline':>10} {'atual':>10} {'razão':>7}"
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        ratio = f"{row['ratio']:.2f}x" if row["ratio"] is not None else "nova"
+        flag = "  REGRESSÃO" if row["regressed"] else ""
+        lines.append(
+            f"{row['name']:<34} {_format_ns(row['baseline_ns']):>10} "
+            f"{_format_ns(row['current_ns']):>10} {ratio:>7}{flag}"
+        )
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--only", action="append", help="filtro por nome (repetível)")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.1, help="segundos")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=float(os.getenv("MICRO_BENCH_THRESHOLD", "0.25")),
+    )
+    parser.add_argument(
+        "--retries", type=int, default=2, help="novas medições antes de falhar"
+    )
+    parser.add_argument("--baselines", default=BASELINES_PATH)
+    parser.add_argument("--update", action="store_true", help="regrava a baseline")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.update:
+        current = run_benchmarks(args.only, repeat=args.repeat, min_time=args.min_time)
+        baseline = load_baselines(args.baselines) or {"results": {}}
+        # --only atualiza só os benchmarks executados
+        if args.only and baseline["results"]:
+            scale = current["calibration_ns"] / baseline["calibration_ns"]
+            current["results"] = {
+                **{
+                    name: round(value * scale, 1)
+                    for name, value in baseline["results"].items()
+                },
+                **current["results"],
+            }
+        write_baselines(current, args.baselines)
+        print(f"Baseline gravada em {args.baselines}")
+        return 0
+
+    baseline = load_baselines(args.baselines)
+    if baseline is None:
+        print(f"Sem baseline em {args.baselines}; rode com --update.")
+        return 1
+    rows = check(
+        baseline,
+        args.only,
+        repeat=args.repeat,
+        min_time=args.min_time,
+        threshold=args.threshold,
+        retries=args.retries,
+    )
+    print(format_table(rows))
+    regressions = [row["name"] for row in rows if row["regressed"]]
+    if regressions:
+        print(
+            f"\n{len(regressions)} regressão(ões) acima de {args.threshold:.0%}: "
+            + ", ".join(regressions)
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+"""
+Reprodução de traces gravados pelo TraceRecorder (TRACE_RECORDING_ENABLED=true).
+
+Agrupa os traces por conversa (threadId devolvido), respeita os intervalos
+originais entre as requisições (divididos por ``--speedup``) e mantém o
+encadeamento dos turnos: cada follow-up espera a resposta do turno anterior e
+usa o threadId que o alvo devolveu. ``--concurrency`` limita as requisições em
+voo.
+
+Uso:
+    python -m benchmarks.replay traces.jsonl --local --speedup 10
+    python -m benchmarks.replay traces.jsonl --target https://app.azurewebsites.net \\
+        --function-key $KEY --speedup 2 --concurrency 32
+
+Com ``--local`` o alvo é o function_app em processo, com os dublês de
+benchmarks.fakes. ``--speedup 0`` dispara tudo o mais rápido possível.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.load_test import (
+    default_latencies,
+    install_fakes,
+    percentile,
+    user_function,
+)
+
+
+def load_traces(path, route=None):
+    """
+    Lê o arquivo de traces, opcionalmente só de uma rota.
+
+    :return: Lista de traces ordenada pelo instante de chegada.
+    """
+    traces = []
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            trace = json.loads(line)
+            if route is None or trace.get("route") == route:
+                traces.append(trace)
+    return sorted(traces, key=lambda trace: trace["ts"])
+
+
+def group_conversations(traces):
+    """
+    Agrupa os traces em conversas, pelo threadId devolvido em cada turno.
+
+    Uma conversa cujo primeiro turno gravado já trazia threadId (a gravação
+    começou no meio dela) é reproduzida como conversa nova, para nunca escrever
+    em um thread real.
+
+    :return: Lista de conversas (listas de traces em ordem), pela chegada do
+        primeiro turno.
+    """
+    conversations = {}
+    for index, trace in enumerate(traces):
+        key = trace.get("threadId") or f"sem-thread-{index}"
+        conversations.setdefault(key, []).append(trace)
+    return sorted(conversations.values(), key=lambda turns: turns[0]["ts"])
+
+
+class HttpTarget:
+    """Alvo remoto: uma instância publicada do function_app."""
+
+    def __init__(self, base_url, route="chatbotapi", function_key=None, timeout=120):
+        import requests
+
+        self.url = f"{base_url.rstrip('/')}/api/{route}"
+        self.session = requests.Session()
+        if function_key:
+            self.session.headers["x-functions-key"] = function_key
+        self.timeout = timeout
+
+    async def send(self, body):
+        """:return: Tupla (status, corpo JSON ou None)."""
+        response = await asyncio.to_thread(
+            self.session.post, self.url, json=body, timeout=self.timeout
+        )
+        try:
+            return response.status_code, response.json()
+        except ValueError:
+            return response.status_code, None
+
+
+class LocalTarget:
+    """Alvo local: a rota do function_app em processo, sobre os dublês."""
+
+    def __init__(self, route="chatbotapi"):
+        import function_app
+
+        self.handler = user_function(getattr(function_app, route))
+        self.route = route
+
+    async def send(self, body):
+        import azure.functions as func
+
+        request = func.HttpRequest(
+            method="POST",
+            url=f"/api/{self.route}",
+            body=json.dumps(body).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        if asyncio.iscoroutinefunction(self.handler):
+            response = await self.handler(request)
+        else:
+            response = await asyncio.to_thread(self.handler, request)
+        try:
+            return response.status_code, json.loads(response.get_body())
+        except ValueError:
+            return response.status_code, None
+
+
+async def replay(conversations, target, speedup=1.0, concurrency=16):
+    """
+    Reproduz as conversas no alvo.
+
+    :param speedup: Fator de compressão dos intervalos; 0 dispara sem esperar.
+    :return: Lista de resultados por requisição (turn, latency_ms, ok, lag_ms).
+    """
+    if not conversations:
+        return []
+    semaphore = asyncio.Semaphore(concurrency)
+    first_ts = min(turns[0]["ts"] for turns in conversations)
+    started = time.perf_counter()
+    results = []
+
+    async def wait_until(ts):
+        if speedup <= 0:
+            return 0.0
+        due = (ts - first_ts) / speedup
+        delay = due - (time.perf_counter() - started)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        # atraso em relação ao agendado: cresce quando o alvo satura
+        return max((time.perf_counter() - started) - due, 0.0) * 1000
+
+    async def run_conversation(turns):
+        thread_id = None
+        for index, trace in enumerate(turns):
+            lag_ms = await wait_until(trace["ts"])
+            body = {
+                "role": trace["request"].get("role") or "user",
+                "content": trace["request"]["content"],
+            }
+            if thread_id:
+                body["threadId"] = thread_id
+            async with semaphore:
+                sent = time.perf_counter()
+                try:
+                    status, payload = await target.send(body)
+                except Exception as e:
+                    logging.error(f"Falha ao reproduzir requisição: {e}")
+                    status, payload = None, None
+                latency_ms = (time.perf_counter() - sent) * 1000
+            ok = status == 200 and bool(payload and payload.get("threadId"))
+            results.append(
+                {
+                    "turn": "first" if index == 0 else "follow_up",
+                    "latency_ms": latency_ms,
+                    "ok": ok,
+                    "lag_ms": lag_ms,
+                    "recorded_ms": trace.get("duration_ms"),
+                }
+            )
+            if not ok:
+                # sem o threadId não dá para encadear o resto da conversa
+                results.extend(
+                    {"turn": "skipped", "latency_ms": None, "ok": False, "lag_ms": 0}
+                    for _ in turns[index + 1 :]
+                )
+                return
+            thread_id = payload["threadId"]
+
+    await asyncio.gather(*(run_conversation(turns) for turns in conversations))
+    elapsed = time.perf_counter() - started
+    for result in results:
+        result["elapsed_s"] = elapsed
+    return results
+
+
+def summarize_replay(results):
+    """
+    Resume a reprodução no total e por tipo de turno.
+
+    :return: Lista de linhas (um dicionário por grupo).
+    """
+    elapsed = results[0]["elapsed_s"] if results else 0.0
+    groups = {
+        "total": [r for r in results if r["turn"] != "skipped"],
+        "first": [r for r in results if r["turn"] == "first"],
+        "follow_up": [r for r in results if r["turn"] == "follow_up"],
+    }
+    rows = []
+    for name, group in groups.items():
+        latencies = [r["latency_ms"] for r in group]
+        recorded = [r["recorded_ms"] for r in group if r.get("recorded_ms")]
+        rows.append(
+            {
+                "group": name,
+                "requests": len(group),
+                "errors": sum(1 for r in group if not r["ok"]),
+                "throughput_rps": (
+                    round(len(group) / elapsed, 2) if elapsed and group else 0.0
+                ),
+                "p50_ms": round(percentile(latencies, 50), 1),
+                "p95_ms": round(percentile(latencies, 95), 1),
+                "p99_ms": round(percentile(latencies, 99), 1),
+                "recorded_p95_ms": round(percentile(recorded, 95), 1),
+                "max_lag_ms": round(max((r["lag_ms"] for r in group), default=0), 1),
+            }
+        )
+    rows[0]["skipped"] = sum(1 for r in results if r["turn"] == "skipped")
+    return rows
+
+
+def format_table(rows):
+    header = (
+        f"{'grupo':<10} {'reqs':>6} {'erros':>6} {'req/s':>8} {'p50':>8} "
+        f"{'p95':>8} {'p99':>8} {'p95 grav.':>10} {'atraso':>8}"
+    )
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        lines.append(
+            f"{row['group']:<10} {row['requests']:>6} {row['errors']:>6} "
+            f"{row['throughput_rps']:>8.2f} {row['p50_ms']:>8.1f} "
+            f"{row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} "
+            f"{row['recorded_p95_ms']:>10.1f} {row['max_lag_ms']:>8.1f}"
+        )
+    if rows and rows[0].get("skipped"):
+        lines.append(f"{rows[0]['skipped']} turnos pulados (turno anterior falhou)")
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("traces", help="arquivo JSON lines do TraceRecorder")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--target", help="URL base da Function App")
+    target.add_argument("--local", action="store_true", help="function_app local")
+    parser.add_argument(
+        "--route", default="chatbotapi", choices=("chatbotapi", "chatbotapi_async")
+    )
+    parser.add_argument(
+        "--source-route", help="só reproduz os traces desta rota (padrão: todas)"
+    )
+    parser.add_argument("--function-key", help="chave da função (x-functions-key)")
+    parser.add_argument("--speedup", type=float, default=1.0)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--json", help="grava o resumo neste arquivo")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    conversations = group_conversations(load_traces(args.traces, args.source_route))
+    print(
+        f"{sum(len(turns) for turns in conversations)} requisições em "
+        f"{len(conversations)} conversas"
+    )
+
+    restore = install_fakes(default_latencies()) if args.local else None
+    try:
+        target = (
+            LocalTarget(args.route)
+            if args.local
+            else HttpTarget(args.target, args.route, args.function_key)
+        )
+        loop = asyncio.new_event_loop()
+        # os envios síncronos (HTTP e rota síncrona) rodam no executor do loop
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=args.concurrency))
+        try:
+            results = loop.run_until_complete(
+                replay(conversations, target, args.speedup, args.concurrency)
+            )
+        finally:
+            loop.close()
+    finally:
+        if restore:
+            restore()
+
+    rows = summarize_replay(results)
+    print(format_table(rows))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": rows}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,64 +1,340 @@
 import logging
 import json
+import os
 
-from dotenv import load_dotenv
-import azure.functions as func
+# o profiler vem primeiro para medir todo o resto do cold start
+from utils.startup_profiler import startup_profiler
 
-from services.chat_services import ChatServices
+startup_profiler.track_imports()
+
+with startup_profiler.phase("imports"):
+    from dotenv import load_dotenv
+    import azure.functions as func
+    from azurefunctions.extensions.http.fastapi import (
+        PlainTextResponse,
+        Request,
+        StreamingResponse,
+    )
+
+    from services.async_assistant import AsyncAssistant
+    from services.completions_chat_services import create_chat_services
+    from services.teams_handoff import HANDOFF_QUEUE_NAME, get_handoff_worker
+    from utils.metrics import metrics, track_request
+    from utils.trace_recorder import record_traces
 
 # carrega variáveis de ambiente
-load_dotenv()
+with startup_profiler.phase("load_dotenv"):
+    load_dotenv()
 
 # inicializa o FunctionApp
 app = func.FunctionApp(http_auth_level=func.AuthLevel.ANONYMOUS)
 
-chat_services = ChatServices()
+# um único assistente (ferramentas + clientes) compartilhado pelos dois endpoints
+with startup_profiler.phase("assistant"):
+    assistant_instance = AsyncAssistant()
+# o mesmo worker (e SummaryStore) da fila em memória e da atualização dos resumos
+handoff_worker = get_handoff_worker(client=assistant_instance.client)
+with startup_profiler.phase("chat_services"):
+    # CHAT_ENGINE: assistants (threads e runs) ou completions (chat completions)
+    chat_services, async_chat_services = create_chat_services(assistant_instance)
+startup_profiler.finish()
 
 
-@app.route(route="chatbotapi")
-def chatbotapi(req: func.HttpRequest) -> func.HttpResponse:
-    logging.info("Recebida requisição em /chatbotapi")
+def validate_chat_body(req_body):
+    """
+    Extrai e valida os campos do body de chat.
 
-    # parse do body
+    :return: Tupla (role, content, thread_id, error_message).
+    """
+    role = req_body.get("role")
+    content = req_body.get("content")
+    thread_id = req_body.get("threadId")
+
+    if not role or not content:
+        logging.error("Faltando 'role' ou 'content' na requisição.")
+        return None, None, None, "Fields 'role' and 'content' are required."
+    return role, content, thread_id, None
+
+
+def parse_chat_request(req: func.HttpRequest):
+    """
+    Valida o body da requisição de chat.
+
+    :return: Tupla (role, content, thread_id, error_response). Quando o body é
+        inválido, error_response traz o HttpResponse 400 a ser devolvido.
+    """
     try:
         req_body = req.get_json()
         logging.debug(f"Request body: {req_body}")
     except ValueError:
         logging.error("JSON inválido no corpo da requisição.")
-        return func.HttpResponse("Invalid JSON", status_code=400)
+        return None, None, None, func.HttpResponse("Invalid JSON", status_code=400)
 
-    role = req_body.get("role")
-    content = req_body.get("content")
-    thread_id = req_body.get("threadId")
+    role, content, thread_id, error_message = validate_chat_body(req_body)
+    if error_message:
+        return None, None, None, func.HttpResponse(error_message, status_code=400)
+    return role, content, thread_id, None
+
+
+def format_sse(event, data):
+    """Formata um evento no padrão Server-Sent Events."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def debug_requested(params):
+    """
+    Indica se a requisição pediu o detalhamento de tempos (``?debug=true``).
+    A opção expõe detalhes internos em rotas anônimas, por isso só vale com
+    DEBUG_TIMINGS_ENABLED=true (padrão: desligada).
+    """
+    if os.getenv("DEBUG_TIMINGS_ENABLED", "false").lower() != "true":
+        return False
+    return str(params.get("debug", "")).lower() in ("1", "true", "timings")
+
+
+def debug_payload(context):
+    """Detalhamento de tempos da requisição, para diagnosticar respostas lentas."""
+    return {
+        "timings": context.timer.as_dict(),
+        "rounds": context.rounds,
+        "pollCount": context.poll_count,
+        "runStatus": getattr(context.run, "status", None),
+    }
+
+
+def chat_response(thread_id, answer, citations, context=None, debug=False):
+    """
+    Monta o HTTP response de uma resposta do assistente.
+
+    Com o contexto, inclui o header Server-Timing; com ``debug``, também o
+    detalhamento de tempos no corpo.
+    """
+    response_body = {
+        "threadId": thread_id,
+        "answer": answer,
+        "citations": citations,
+    }
+    headers = {}
+    if context is not None:
+        headers["Server-Timing"] = context.timer.server_timing()
+        if debug:
+            response_body["debug"] = debug_payload(context)
+    return func.HttpResponse(
+        json.dumps(response_body),
+        status_code=200,
+        mimetype="application/json",
+        headers=headers,
+    )
 
-    if not role or not content:
-        logging.error("Faltando 'role' ou 'content' na requisição.")
-        return func.HttpResponse(
-            "Fields 'role' and 'content' are required.", status_code=400
-        )
+
+def internal_error_response():
+    return func.HttpResponse(
+        "An internal error occurred. Please try again later.", status_code=500
+    )
+
+
+@app.route(route="chatbotapi")
+@track_request("chatbotapi")
+@record_traces("chatbotapi")
+def chatbotapi(req: func.HttpRequest) -> func.HttpResponse:
+    logging.info("Recebida requisição em /chatbotapi")
+
+    # parse do body
+    role, content, thread_id, error_response = parse_chat_request(req)
+    if error_response:
+        return error_response
 
     try:
+        # estado da conversa é por requisição; clientes e ferramentas são compartilhados
+        context = chat_services.new_context()
+        debug = debug_requested(req.params)
+
         # obtém ou cria a thread
-        if not thread_id:
-            thread_id = chat_services.create_new_thread()
+        new_thread = not thread_id
+        if new_thread:
+            # primeira pergunta: tenta o cache de respostas antes de rodar o assistente
+            cached = chat_services.answer_from_cache(context, content)
+            if cached:
+                return chat_response(
+                    context.thread_id, *cached, context=context, debug=debug
+                )
+            thread_id = chat_services.create_new_thread(context)
         else:
-            chat_services.retrieve_old_thread(thread_id)
+            chat_services.retrieve_old_thread(context, thread_id)
 
-        chat_services.add_user_message(content=content)
-        answer, citations = chat_services.execute_assistant()
+        # serializado por thread: mensagens seguidas no mesmo thread não colidem
+        answer, citations = chat_services.answer(context, content)
+        if new_thread:
+            chat_services.remember_answer(context, content, answer)
 
         # monta e retorna o HTTP response
-        response_body = {
-            "threadId": thread_id,
-            "answer": answer,
-            "citations": citations,
-        }
-        return func.HttpResponse(
-            json.dumps(response_body), status_code=200, mimetype="application/json"
-        )
+        return chat_response(thread_id, answer, citations, context, debug)
+
+    except Exception as e:
+        logging.error(f"Erro interno: {e}", exc_info=True)
+        return internal_error_response()
+
+
+@app.route(route="chatbotapi_async")
+@track_request("chatbotapi_async")
+@record_traces("chatbotapi_async")
+async def chatbotapi_async(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Versão assíncrona de /chatbotapi: não prende uma thread do worker durante o run,
+    permitindo manter muitas conversas em andamento no mesmo processo.
+    """
+    logging.info("Recebida requisição em /chatbotapi_async")
+
+    role, content, thread_id, error_response = parse_chat_request(req)
+    if error_response:
+        return error_response
+
+    try:
+        context = async_chat_services.new_context()
+        debug = debug_requested(req.params)
+        new_thread = not thread_id
+        if new_thread:
+            cached = await async_chat_services.answer_from_cache(context, content)
+            if cached:
+                return chat_response(
+                    context.thread_id, *cached, context=context, debug=debug
+                )
+            thread_id = await async_chat_services.create_new_thread(context)
+        else:
+            await async_chat_services.retrieve_old_thread(context, thread_id)
+
+        answer, citations = await async_chat_services.answer(context, content)
+        if new_thread:
+            async_chat_services.remember_answer(context, content, answer)
+
+        return chat_response(thread_id, answer, citations, context, debug)
+
+    except Exception as e:
+        logging.error(f"Erro interno: {e}", exc_info=True)
+        return internal_error_response()
+
+
+@app.route(route="chatbotapi_stream", methods=[func.HttpMethod.POST])
+@track_request("chatbotapi_stream")
+async def chatbotapi_stream(req: Request) -> StreamingResponse:
+    """
+    Versão em streaming de /chatbotapi: devolve a resposta como Server-Sent Events.
+
+    Eventos: ``thread`` (threadId), ``delta`` (trechos de texto), ``citations`` ao
+    final e ``error`` em caso de falha. Requer a extensão de HTTP streams do Azure
+    Functions (azurefunctions-extensions-http-fastapi) e PYTHON_ENABLE_INIT_INDEXING=1.
+    """
+    logging.info("Recebida requisição em /chatbotapi_stream")
+
+    try:
+        req_body = await req.json()
+        logging.debug(f"Request body: {req_body}")
+    except ValueError:
+        logging.error("JSON inválido no corpo da requisição.")
+        return PlainTextResponse("Invalid JSON", status_code=400)
+
+    role, content, thread_id, error_message = validate_chat_body(req_body)
+    if error_message:
+        return PlainTextResponse(error_message, status_code=400)
+
+    try:
+        context = async_chat_services.new_context()
+        if not thread_id:
+            thread_id = await async_chat_services.create_new_thread(context)
+        else:
+            await async_chat_services.retrieve_old_thread(context, thread_id)
 
     except Exception as e:
         logging.error(f"Erro interno: {e}", exc_info=True)
-        return func.HttpResponse(
+        return PlainTextResponse(
             "An internal error occurred. Please try again later.", status_code=500
         )
+
+    debug = debug_requested(req.query_params)
+
+    async def event_stream():
+        yield format_sse("thread", {"threadId": thread_id})
+        # a mensagem entra na vez do thread, como em /chatbotapi_async
+        async for event, data in async_chat_services.stream_answer(context, content):
+            yield format_sse(event, data)
+        if debug:
+            yield format_sse("timings", debug_payload(context))
+
+    # o header só cobre as fases anteriores ao início do stream
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Server-Timing": context.timer.server_timing()},
+    )
+
+
+@app.route(
+    route="cache/invalidate",
+    methods=[func.HttpMethod.POST],
+    auth_level=func.AuthLevel.FUNCTION,
+)
+def invalidate_cache(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Descarta as respostas e os resultados de busca em cache. Deve ser chamado
+    sempre que o índice de busca for atualizado.
+
+    Limpa os caches desta instância e grava uma nova geração dos caches. As
+    outras instâncias só enxergam a invalidação se CACHE_GENERATION_PATH apontar
+    para um armazenamento compartilhado (ex.: $HOME/data); no padrão, um
+    arquivo temporário local, elas continuam servindo o cache antigo até o TTL
+    (ANSWER_CACHE_TTL_SECONDS e AI_SEARCH_CACHE_TTL_SECONDS).
+    """
+    logging.info("Recebida requisição em /cache/invalidate")
+    chat_services.invalidate_caches()
+    return func.HttpResponse(
+        json.dumps({"invalidated": True}), status_code=200, mimetype="application/json"
+    )
+
+
+@app.route(
+    route="metrics",
+    methods=[func.HttpMethod.GET],
+    auth_level=func.AuthLevel.FUNCTION,
+)
+def metrics_endpoint(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Métricas desta instância no formato texto do Prometheus: latência das rotas,
+    status dos runs, consultas de polling, ferramentas e buscas.
+    """
+    return func.HttpResponse(
+        metrics.render(), status_code=200, mimetype=metrics.CONTENT_TYPE
+    )
+
+
+@app.route(
+    route="diagnostics/startup",
+    methods=[func.HttpMethod.GET],
+    auth_level=func.AuthLevel.FUNCTION,
+)
+def startup_diagnostics(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    Tempos do cold start desta instância: fases, ferramentas (inclusive as
+    carregadas sob demanda depois) e, com STARTUP_PROFILE_IMPORTS=true, imports.
+    """
+    return func.HttpResponse(
+        json.dumps(startup_profiler.as_dict()),
+        status_code=200,
+        mimetype="application/json",
+    )
+
+
+@app.queue_trigger(
+    arg_name="msg", queue_name=HANDOFF_QUEUE_NAME, connection="AzureWebJobsStorage"
+)
+def teams_handoff(msg: func.QueueMessage) -> None:
+    """
+    Worker dos hand-offs para o Teams (HANDOFF_QUEUE_MODE=storage). Uma exceção
+    devolve a mensagem à fila para nova tentativa; depois de
+    ``maxDequeueCount`` (host.json) tentativas, o runtime a move para a fila
+    ``teams-handoff-poison``.
+    """
+    job = msg.get_json()
+    logging.info(
+        f"Processando hand-off {job.get('job_id')} (tentativa {msg.dequeue_count})"
+    )
+    handoff_worker.process(job, attempt=msg.dequeue_count, dead_letter=False)
@@ -1,7 +1,12 @@
+import asyncio
 from abc import ABC, abstractmethod
 
 
 class AssistantToolBase(ABC):
+    # Environment variables the tool cannot be built without. They are recorded in
+    # the tools manifest so lazy tools can be validated at startup without importing them.
+    required_env = ()
+
     @abstractmethod
     def get_tool_infos(self):
         """
@@ -15,3 +20,11 @@ class AssistantToolBase(ABC):
         This method should define the functionality of the tool when it is executed.
         """
         pass
+
+    async def aexecute(self, **kwargs):
+        """
+        Async counterpart of execute. By default it runs execute in a worker thread so
+        blocking tools do not stall the event loop; tools with native async clients
+        should override it.
+        """
+        return await asyncio.to_thread(self.execute, **kwargs)
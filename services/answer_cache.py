@@ -0,0 +1,109 @@
+import hashlib
+import logging
+import os
+
+from utils.cache_generation import get_cache_generation
+from utils.text_cache import SimilarTextCache
+
+
+class AnswerCache(SimilarTextCache):
+    """
+    Cache de respostas completas para a primeira pergunta de uma conversa.
+
+    A chave é a pergunta normalizada mais o fingerprint da configuração do
+    assistente (modelo, instruções e schemas das ferramentas), de modo que uma
+    mudança de configuração nunca sirva respostas antigas. Só entram no cache
+    respostas de runs concluídos que usaram apenas ferramentas "cacheáveis"
+    (``ANSWER_CACHE_TOOLS``, por padrão só a busca): uma transferência para o Teams
+    ou a consulta de um incidente precisam acontecer de novo. A geração dos
+    caches (CacheGeneration) também entra na chave: ``/cache/invalidate``
+    descarta as respostas de todas as instâncias que compartilham a geração.
+
+    Configuração: ``ANSWER_CACHE_ENABLED``, ``ANSWER_CACHE_SIZE``,
+    ``ANSWER_CACHE_TTL_SECONDS`` e ``ANSWER_CACHE_SIMILARITY``.
+    """
+
+    def __init__(
+        self,
+        fingerprint,
+        max_size=None,
+        ttl_seconds=None,
+        similarity_threshold=None,
+        cacheable_tools=None,
+        generation=None,
+    ):
+        super().__init__(
+            max_size=max_size or int(os.getenv("ANSWER_CACHE_SIZE", "512")),
+            ttl_seconds=ttl_seconds
+            or float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600")),
+            similarity_threshold=(
+                similarity_threshold
+                if similarity_threshold is not None
+                else float(os.getenv("ANSWER_CACHE_SIMILARITY", "0"))
+            ),
+        )
+        self.fingerprint = fingerprint
+        self.generation = generation or get_cache_generation()
+        self.cacheable_tools = set(
+            cacheable_tools
+            or os.getenv("ANSWER_CACHE_TOOLS", "ai_search_tool").split(",")
+        )
+
+    @staticmethod
+    def config_fingerprint(*parts):
+        """Combina as partes da configuração num único fingerprint."""
+        payload = "\x1f".join(str(part) for part in parts)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def lookup(self, question):
+        """
+        :return: Tupla (answer, citations) em cache para a pergunta, ou None.
+        """
+        return self.get(question, self._scope())
+
+    def store(self, question, answer, citations):
+        self.set(question, (answer, list(citations)), self._scope())
+
+    def _scope(self):
+        return (self.fingerprint, self.generation.current())
+
+    def is_cacheable(self, context):
+        """
+        Indica se a resposta do contexto pode ser reaproveitada por outras conversas.
+        """
+        if not context.answered:
+            return False  # algo falhou depois do run (ex.: messages.list)
+        if context.run is None or context.run.status != "completed":
+            return False
+        used_tools = {tool for r in context.rounds for tool in r["tools"]}
+        return used_tools <= self.cacheable_tools
+
+    def invalidate(self):
+        """Descarta todas as respostas (ex.: após reindexação do índice de busca)."""
+        logging.info("Cache de respostas invalidado.")
+        self.clear()
+
+
+def lookup_cached_answer(answer_cache, context, content):
+    """
+    Consulta o cache de respostas na fase ``answer_cache.lookup`` do contexto.
+
+    :param answer_cache: AnswerCache, ou None quando o cache está desligado.
+    :return: Tupla (answer, citations) ou None.
+    """
+    if answer_cache is None:
+        return None
+    with context.timer.phase("answer_cache.lookup") as details:
+        cached = answer_cache.lookup(content)
+        details["hit"] = cached is not None
+    if cached is not None:
+        logging.info("Resposta servida pelo cache; criando conversa semeada.")
+    return cached
+
+
+def seed_messages(content, answer):
+    """Mensagens de uma conversa nova semeada com a pergunta e a resposta em cache."""
+    return [
+        {"role": "user", "content": content},
+        {"role": "assistant", "content": answer},
+    ]
@@ -1,7 +1,13 @@
 from utils.tool_loader import load_tools_from_package
 from services import tools as tools_package
-from openai import AzureOpenAI
+from services.assistant_registry import AssistantRegistry
+from openai import AzureOpenAI, NotFoundError
+from utils.metrics import TOOL_CALLS, TOOL_ERRORS, TOOL_LATENCY
+from utils.startup_profiler import startup_profiler
+import logging
 import os
+import threading
+import time
 import ast
 import json
 
@@ -18,18 +24,24 @@ class Assistant:
         role_prompt (str): The role prompt instructions for the assistant.
         tool_instances (list): A list of dynamically loaded tool instances.
         tools_schemas (list): A list of tool schemas in OpenAI format.
-        assistant (object): The assistant instance created using the Azure OpenAI client.
+        registry (AssistantRegistry): Registry that reuses persisted assistants.
+        assistant (AssistantRef): Reference to the assistant resolved by the registry.
         tool_map (dict): A mapping of tool function names to their respective instances.
     """
 
     def __init__(self):
-        self.client = self._initialize_client()
+        with startup_profiler.phase("assistant.client"):
+            self.client = self._initialize_client()
         self.deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT_ID")
         self.role_prompt = os.getenv("ROLE_PROMPT")
-        self.tool_instances = self._load_tools()
+        with startup_profiler.phase("assistant.tools"):
+            self.tool_instances = self._load_tools()
         self.tools_schemas = self._extract_tool_schemas()
-        self.assistant = self._create_assistant()
+        self.registry = AssistantRegistry(self.client)
+        with startup_profiler.phase("assistant.resolve"):
+            self.assistant = self._create_assistant()
         self.tool_map = self._map_tools()
+        self._refresh_lock = threading.Lock()
 
     def _initialize_client(self):
         """Inicializa o cliente Azure OpenAI."""
@@ -48,9 +60,11 @@ class Assistant:
         return [tool.get_tool_infos() for tool in self.tool_instances]
 
     def _create_assistant(self):
-        """Cria o assistente com as ferramentas declaradas e configurações adicionais."""
-
-        return self.client.beta.assistants.create(
+        """
+        Resolve o assistente com as ferramentas declaradas e configurações adicionais,
+        reutilizando um assistente persistido sempre que a configuração for a mesma.
+        """
+        return self.registry.resolve(
             model=self.deployment,
             instructions=self.role_prompt,
             tools=self.tools_schemas,
@@ -58,6 +72,32 @@ class Assistant:
             top_p=1,
         )
 
+    def refresh_assistant(self, stale_id):
+        """
+        Re-resolve o assistente quando o ID em uso deixou de existir no servidor
+        (ex.: assistente apagado com o ID ainda no cache do registro).
+
+        Um NotFoundError num ``runs.create`` também pode vir de um thread
+        inexistente; por isso o assistente é consultado antes de descartar o cache.
+
+        :param stale_id: ID do assistente usado na chamada que falhou.
+        :return: True se o assistente foi (ou já tinha sido) trocado e a chamada
+            pode ser repetida; False se o assistente ainda existe.
+        """
+        with self._refresh_lock:
+            if self.assistant.id != stale_id:
+                return True  # outra requisição já re-resolveu
+            try:
+                self.client.beta.assistants.retrieve(stale_id)
+                return False
+            except NotFoundError:
+                logging.warning(
+                    f"Assistente {stale_id} não existe mais; resolvendo de novo."
+                )
+            self.registry.invalidate(self.assistant.fingerprint)
+            self.assistant = self._create_assistant()
+            return True
+
     def _map_tools(self):
         """Cria o mapeamento de nome da função para instância da classe."""
         return {
@@ -65,8 +105,8 @@ class Assistant:
             for tool in self.tool_instances
         }
 
-    def call_tool_by_name(self, context, name, arguments: str):
-        """Chama uma ferramenta pelo nome."""
+    def _parse_arguments(self, context, name, arguments: str):
+        """Converte os argumentos da chamada e resolve a ferramenta pelo nome."""
 
         # Converte a string de um dicionário para um dicionário real
         try:
@@ -82,4 +122,22 @@ class Assistant:
         tool = self.tool_map.get(name)
         if not tool:
             raise ValueError(f"Ferramenta '{name}' não encontrada.")
-        return tool.execute(**args)
+        return tool, args
+
+    def metric_label(self, name):
+        """Label da ferramenta nas métricas (nomes desconhecidos viram 'unknown')."""
+        return name if name in self.tool_map else "unknown"
+
+    def call_tool_by_name(self, context, name, arguments: str):
+        """Chama uma ferramenta pelo nome."""
+        label = self.metric_label(name)
+        TOOL_CALLS.inc(tool=label)
+        started = time.perf_counter()
+        try:
+            tool, args = self._parse_arguments(context, name, arguments)
+            return tool.execute(**args)
+        except Exception:
+            TOOL_ERRORS.inc(tool=label)
+            raise
+        finally:
+            TOOL_LATENCY.observe(time.perf_counter() - started, tool=label)
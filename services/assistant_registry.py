@@ -0,0 +1,167 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import namedtuple
+
+# Referência leve ao assistente resolvido: só o ID é usado nos runs
+AssistantRef = namedtuple("AssistantRef", ["id", "fingerprint"])
+
+
+class AssistantRegistry:
+    """
+    Registro de assistentes persistidos no Azure OpenAI.
+
+    Em vez de criar um assistente novo a cada cold start, o registro calcula um
+    fingerprint da configuração (nome, modelo, instruções, temperatura, top_p e
+    schemas das ferramentas) e:
+
+    - reutiliza o ID gravado no cache local, sem nenhuma chamada de rede;
+    - reutiliza um assistente existente cujo metadata tenha o mesmo fingerprint;
+    - chama ``assistants.update`` quando apenas as ferramentas mudaram;
+    - cria um assistente novo somente quando nada disso é possível.
+
+    O cache local é um arquivo JSON (``ASSISTANT_REGISTRY_PATH``). Por padrão fica
+    no diretório temporário da instância; apontá-lo para ``$HOME/data`` faz com que
+    todas as instâncias do Function App compartilhem o mesmo cache. As entradas
+    do cache são separadas por endpoint (``AZURE_OPENAI_ENDPOINT``), para que um
+    arquivo compartilhado entre recursos nunca devolva o ID de outro recurso.
+    Só são reutilizados ou atualizados assistentes com o mesmo nome
+    (``ASSISTANT_NAME``): slots diferentes no mesmo recurso (ex.: staging e
+    produção) nunca sobrescrevem as ferramentas um do outro.
+    """
+
+    ASSISTANT_NAME = "rag-assistant"
+    CONFIG_KEY = "config_fingerprint"
+    BASE_KEY = "base_fingerprint"
+
+    def __init__(self, client, cache_path=None, name=None, endpoint=None):
+        self.client = client
+        self.endpoint = (
+            endpoint if endpoint is not None else os.getenv("AZURE_OPENAI_ENDPOINT", "")
+        )
+        self.cache_path = (
+            cache_path
+            or os.getenv("ASSISTANT_REGISTRY_PATH")
+            or os.path.join(tempfile.gettempdir(), "rag_assistant_registry.json")
+        )
+        self.name = name or os.getenv("ASSISTANT_NAME", self.ASSISTANT_NAME)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _hash(payload):
+        serialized = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+    def fingerprints(self, model, instructions, tools, temperature, top_p):
+        """
+        Calcula os fingerprints da configuração.
+
+        :return: Tupla (config, base). ``config`` cobre tudo, inclusive ferramentas;
+            ``base`` ignora as ferramentas e identifica assistentes atualizáveis.
+        """
+        base = {
+            "name": self.name,
+            "model": model,
+            "instructions": instructions,
+            "temperature": temperature,
+            "top_p": top_p,
+        }
+        return self._hash({**base, "tools": tools}), self._hash(base)
+
+    def cache_key(self, fingerprint):
+        """Chave do cache local: o fingerprint, escopado pelo endpoint do recurso."""
+        endpoint = self.endpoint.rstrip("/")
+        return f"{endpoint}#{fingerprint}" if endpoint else fingerprint
+
+    def resolve(self, model, instructions, tools, temperature=1, top_p=1):
+        """
+        Retorna a referência do assistente correspondente à configuração.
+
+        :return: AssistantRef com o ID do assistente e o fingerprint da configuração.
+        """
+        config_fp, base_fp = self.fingerprints(
+            model, instructions, tools, temperature, top_p
+        )
+        with self._lock:
+            cached_id = self._read_cache().get(self.cache_key(config_fp))
+            if cached_id:
+                logging.info(f"Assistente reutilizado do cache local: {cached_id}")
+                return AssistantRef(cached_id, config_fp)
+
+            metadata = {self.CONFIG_KEY: config_fp, self.BASE_KEY: base_fp}
+            assistant_id = self._find_or_update(tools, metadata)
+            if not assistant_id:
+                assistant = self.client.beta.assistants.create(
+                    name=self.name,
+                    model=model,
+                    instructions=instructions,
+                    tools=tools,
+                    temperature=temperature,
+                    top_p=top_p,
+                    metadata=metadata,
+                )
+                assistant_id = assistant.id
+                logging.info(f"Assistente criado: {assistant_id}")
+
+            self._write_cache(config_fp, assistant_id)
+            return AssistantRef(assistant_id, config_fp)
+
+    def invalidate(self, fingerprint):
+        """Remove do cache local o ID associado ao fingerprint (ex.: assistente apagado)."""
+        with self._lock:
+            cache = self._read_cache()
+            if cache.pop(self.cache_key(fingerprint), None) is not None:
+                self._dump_cache(cache)
+
+    def _find_or_update(self, tools, metadata):
+        """Procura um assistente existente compatível; atualiza as ferramentas se preciso."""
+        candidate = None
+        for assistant in self.client.beta.assistants.list(order="desc", limit=100):
+            if getattr(assistant, "name", None) != self.name:
+                continue  # assistente de outro slot/aplicação no mesmo recurso
+            assistant_metadata = getattr(assistant, "metadata", None) or {}
+            if assistant_metadata.get(self.CONFIG_KEY) == metadata[self.CONFIG_KEY]:
+                logging.info(f"Assistente existente reutilizado: {assistant.id}")
+                return assistant.id
+            if (
+                candidate is None
+                and assistant_metadata.get(self.BASE_KEY) == metadata[self.BASE_KEY]
+            ):
+                candidate = assistant
+
+        if candidate is not None:
+            self.client.beta.assistants.update(
+                candidate.id, tools=tools, metadata=metadata
+            )
+            logging.info(f"Ferramentas do assistente atualizadas: {candidate.id}")
+            return candidate.id
+        return None
+
+    def _read_cache(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as file:
+                cache = json.load(file)
+            return cache if isinstance(cache, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _write_cache(self, fingerprint, assistant_id):
+        cache = self._read_cache()
+        cache[self.cache_key(fingerprint)] = assistant_id
+        self._dump_cache(cache)
+
+    def _dump_cache(self, cache):
+        try:
+            directory = os.path.dirname(self.cache_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # grava em arquivo temporário e renomeia para não deixar JSON parcial
+            tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(cache, file)
+            os.replace(tmp_path, self.cache_path)
+        except (OSError, TypeError, ValueError) as e:
+            logging.warning(f"Não foi possível gravar o cache de assistentes: {e}")
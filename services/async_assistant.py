@@ -0,0 +1,44 @@
+import os
+import time
+from openai import AsyncAzureOpenAI
+from services.assistant import Assistant
+from utils.metrics import TOOL_CALLS, TOOL_ERRORS, TOOL_LATENCY
+
+
+class AsyncAssistant(Assistant):
+    """
+    Variante assíncrona do Assistant.
+
+    Reaproveita o carregamento das ferramentas e a resolução do assistente (feitos uma
+    única vez, no cold start, com o cliente síncrono) e acrescenta um cliente
+    AsyncAzureOpenAI para o caminho de requisição, além da execução assíncrona das
+    ferramentas.
+    Attributes:
+        async_client (AsyncAzureOpenAI): The async Azure OpenAI client instance.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.async_client = self._initialize_async_client()
+
+    def _initialize_async_client(self):
+        """Inicializa o cliente assíncrono do Azure OpenAI."""
+        return AsyncAzureOpenAI(
+            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+            api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+            api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
+        )
+
+    async def acall_tool_by_name(self, context, name, arguments: str):
+        """Chama uma ferramenta pelo nome sem bloquear o event loop."""
+        label = self.metric_label(name)
+        TOOL_CALLS.inc(tool=label)
+        started = time.perf_counter()
+        try:
+            tool, args = self._parse_arguments(context, name, arguments)
+            return await tool.aexecute(**args)
+        except Exception:
+            TOOL_ERRORS.inc(tool=label)
+            raise
+        finally:
+            TOOL_LATENCY.observe(time.perf_counter() - started, tool=label)
@@ -0,0 +1,244 @@
+import asyncio
+import logging
+from openai import NotFoundError
+from services.answer_cache import lookup_cached_answer, seed_messages
+from services.chat_services import (
+    ADDITIONAL_INSTRUCTIONS,
+    ERROR_ANSWER,
+    BaseChatServices,
+    create_answer_cache,
+    extract_answer,
+)
+from services.run_driver import RunDriver
+from services.run_waiter import create_run_waiter
+from services.teams_handoff import create_summary_refresher
+from services.thread_cache import create_thread_cache
+from services.thread_coordinator import AsyncThreadCoordinator
+from services.tool_dispatcher import ToolDispatcher
+from utils.metrics import record_run
+
+
+class AsyncChatServices(BaseChatServices):
+    """
+    Versão assíncrona do ChatServices, usada pelos endpoints async e de streaming.
+
+    Os clientes e as ferramentas são compartilhados; o estado da conversa (thread, run
+    e citações) vive no ConversationContext de cada requisição, de forma que várias
+    conversas possam ficar em andamento no mesmo event loop sem interferir umas nas
+    outras.
+    """
+
+    def __init__(
+        self,
+        assistant_instance,
+        answer_cache=None,
+        thread_cache=None,
+        summary_refresher=None,
+    ):
+        self.assistant_instance = assistant_instance
+        # cliente síncrono: exposto às ferramentas que recebem o contexto
+        self.client = assistant_instance.client
+        self.async_client = assistant_instance.async_client
+        self.assistant = assistant_instance.assistant
+        self.tool_dispatcher = ToolDispatcher(assistant_instance)
+        self.run_driver = RunDriver(
+            create_run_waiter(self.client, async_client=self.async_client),
+            self.tool_dispatcher,
+            self.async_client,
+        )
+        # normalmente compartilhado com o ChatServices síncrono
+        self.answer_cache = answer_cache or create_answer_cache(self.assistant)
+        self.thread_cache = thread_cache or create_thread_cache()
+        self.summary_refresher = summary_refresher or create_summary_refresher(
+            self.client
+        )
+        self.thread_coordinator = AsyncThreadCoordinator(self)
+
+    async def create_new_thread(self, context):
+        logging.info("Criando nova thread (async).")
+        with context.timer.phase("threads.create"):
+            thread = await self.async_client.beta.threads.create()
+        context.thread_id = thread.id
+        self.remember_thread(context.thread_id)
+        return context.thread_id
+
+    async def retrieve_old_thread(self, context, thread_id):
+        if self.thread_known(context, thread_id):
+            context.thread_id = thread_id
+            return
+        logging.info(f"Recuperando thread existente (async): {thread_id}")
+        with context.timer.phase("threads.retrieve"):
+            await self.async_client.beta.threads.retrieve(thread_id=thread_id)
+        context.thread_id = thread_id
+        self.remember_thread(thread_id)
+
+    async def answer_from_cache(self, context, content: str):
+        """
+        Versão assíncrona de ChatServices.answer_from_cache.
+        """
+        cached = lookup_cached_answer(self.answer_cache, context, content)
+        if cached is None:
+            return None
+        answer, citations = cached
+        await self.seed_thread(context, content, answer)
+        context.citations = list(citations)
+        return answer, context.citations
+
+    async def seed_thread(self, context, content: str, answer: str):
+        with context.timer.phase("threads.create"):
+            thread = await self.async_client.beta.threads.create(
+                messages=seed_messages(content, answer)
+            )
+        context.thread_id = thread.id
+        self.remember_thread(context.thread_id)
+
+    async def add_user_message(self, context, content: str):
+        """
+        Adiciona uma mensagem do usuário ao thread do contexto.
+        """
+        logging.info(f"Adicionando mensagem do usuário ao thread: {content!r}")
+        try:
+            with context.timer.phase("messages.create"):
+                await self.async_client.beta.threads.messages.create(
+                    thread_id=context.thread_id, role="user", content=content
+                )
+        except NotFoundError:
+            self.forget_thread(context.thread_id)
+            raise
+
+    async def answer(self, context, content: str):
+        """
+        Versão assíncrona de ChatServices.answer.
+        """
+        return await self.thread_coordinator.submit(context, content)
+
+    async def stream_answer(self, context, content: str):
+        """
+        Versão em streaming de answer: adiciona a mensagem e gera os eventos de
+        stream_assistant na vez do thread. Uma requisição que chega durante um
+        run ativo no mesmo thread espera (ou é respondida por ele) em vez de
+        falhar ao criar a mensagem.
+        """
+        try:
+            async for event, data in self.thread_coordinator.stream(context, content):
+                yield event, data
+        except Exception as e:
+            logging.error(f"Erro ao processar a mensagem (stream): {e}", exc_info=True)
+            yield "error", {"message": ERROR_ANSWER}
+
+    def prefetch_search(self, context, content: str):
+        """
+        Versão assíncrona de ChatServices.prefetch_search (chamar dentro do event loop).
+        """
+        self.tool_dispatcher.aprefetch(context, content)
+
+    async def execute_assistant(self, context):
+        logging.info("Executando assistente (async).")
+        try:
+            try:
+                await self._adrive(context)
+            except NotFoundError:
+                if not await self.refresh_assistant():
+                    raise
+                await self._adrive(context)
+            if context.run.status != "completed":
+                logging.error(f"Run finalizado com status {context.run.status}.")
+                return ERROR_ANSWER, []
+            self.remember_thread(context.thread_id, context.run.id)
+            self.refresh_summary(context)
+
+            with context.timer.phase("messages.list"):
+                messages = [
+                    message
+                    async for message in self.async_client.beta.threads.messages.list(
+                        thread_id=context.thread_id, run_id=context.run.id
+                    )
+                ]
+            answer = extract_answer(messages)
+            context.answered = True
+            return answer, context.citations
+
+        except Exception as e:
+            logging.error(f"Erro ao processar a mensagem: {e}", exc_info=True)
+            return ERROR_ANSWER, []
+
+    async def stream_assistant(self, context):
+        """
+        Executa o assistente em modo streaming.
+
+        Gera tuplas (evento, dados) à medida que o run avança: ``delta`` para cada
+        trecho de texto, ``citations`` ao final e ``error`` se algo falhar. Quando o
+        run pede ferramentas no meio do stream, elas são executadas e o stream
+        continua via ``submit_tool_outputs_stream``, com os limites de rodadas e de
+        tempo do RunDriver; se algum estoura, o run é cancelado e sai ``error``.
+        """
+        logging.info("Executando assistente (stream).")
+        try:
+            retried = False
+            while True:
+                try:
+                    async for event, data in self._stream_run(context):
+                        yield event, data
+                    break
+                except NotFoundError:
+                    # o run nem chegou a ser criado: assistente apagado no servidor?
+                    if retried or context.run is not None:
+                        raise
+                    if not await self.refresh_assistant():
+                        raise
+                    retried = True
+
+            record_run(context)
+            if context.run is not None and context.run.status != "completed":
+                logging.error(f"Run finalizado com status {context.run.status}.")
+                yield "error", {"message": ERROR_ANSWER}
+                return
+            if context.run is not None:
+                self.remember_thread(context.thread_id, context.run.id)
+                self.refresh_summary(context)
+
+            context.answered = True
+            yield "citations", {"citations": context.citations}
+
+        except Exception as e:
+            logging.error(f"Erro ao processar a mensagem (stream): {e}", exc_info=True)
+            yield "error", {"message": ERROR_ANSWER}
+
+    async def _stream_run(self, context):
+        """
+        Acompanha o run em streaming pelo RunDriver, gerando os eventos ``delta``.
+        """
+        async for text in self.run_driver.astream(
+            context,
+            additional_instructions=ADDITIONAL_INSTRUCTIONS,
+            assistant_id=self.assistant.id,
+            tool_choice="required",
+        ):
+            yield "delta", {"text": text}
+
+    async def cancel_run(self, context):
+        """
+        Cancela o run ativo do contexto e espera o cancelamento terminar
+        (ex.: stream interrompido pelo cliente).
+        """
+        await self.run_driver.acancel(context)
+
+    async def _adrive(self, context):
+        await self.run_driver.adrive(
+            context,
+            additional_instructions=ADDITIONAL_INSTRUCTIONS,
+            assistant_id=self.assistant.id,
+            tool_choice="required",
+        )
+
+    async def refresh_assistant(self):
+        """
+        Versão assíncrona de ChatServices.refresh_assistant (a consulta ao
+        assistente usa o cliente síncrono, numa thread).
+        """
+        refreshed = await asyncio.to_thread(
+            self.assistant_instance.refresh_assistant, self.assistant.id
+        )
+        if refreshed:
+            self.assistant = self.assistant_instance.assistant
+        return refreshed
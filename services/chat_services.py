@@ -1,129 +1,293 @@
 import logging
+import os
+from openai import NotFoundError
+from services.answer_cache import AnswerCache, lookup_cached_answer, seed_messages
 from services.assistant import Assistant
-from services.tools.ai_search_tool import (
-    AISearchTool,
+from services.conversation_context import ConversationContext
+from services.run_driver import RunDriver
+from services.run_waiter import create_run_waiter
+from services.teams_handoff import create_summary_refresher
+from services.thread_cache import create_thread_cache
+from services.thread_coordinator import ThreadCoordinator
+from services.tool_dispatcher import ToolDispatcher
+from utils.cache_generation import get_cache_generation
+from utils.tool_loader import LazyTool
+
+ADDITIONAL_INSTRUCTIONS = (
+    "Você é um assistente técnico especializado em fornecer respostas precisas "
+    "e bem estruturadas. Sempre utilize o contexto recuperado via RAG para fundamentar suas respostas, "
+    "cite as fontes recuperadas (use números entre colchetes para indicar citações) "
+    "e formate tudo em Markdown (títulos, listas, blocos de código, etc.). "
+    "Caso não encontre informações relevantes, diga apenas: Desculpe, não consegui encontrar informações relevantes para sua pergunta. "
 )
 
+ERROR_ANSWER = "Desculpe, ocorreu um erro ao processar sua solicitação. Por favor, tente novamente mais tarde."
+
+
+def extract_answer(messages):
+    """
+    Concatena os blocos de texto da última mensagem do assistente.
+    """
+    answer = ""
+    assistant_message = next(
+        (m for m in reversed(messages) if m.role == "assistant"), None
+    )
+    if assistant_message:
+        # concatena todos os blocos de texto
+        for block in assistant_message.content:
+            if block.type == "text" and hasattr(block, "text"):
+                answer += block.text.value
+    return answer
+
+
+def create_answer_cache(assistant):
+    """
+    Cria o cache de respostas (ANSWER_CACHE_ENABLED=false desliga), com um
+    fingerprint que cobre a configuração do assistente e as instruções do run.
+    """
+    if os.getenv("ANSWER_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    return AnswerCache(
+        AnswerCache.config_fingerprint(
+            getattr(assistant, "fingerprint", assistant.id), ADDITIONAL_INSTRUCTIONS
+        )
+    )
+
+
+class BaseChatServices:
+    """
+    Base comum do ChatServices e do AsyncChatServices: os métodos sem I/O que
+    consultam e alimentam os caches compartilhados (threads, respostas e resumos).
+
+    As subclasses criam os atributos abaixo (None desliga o cache correspondente).
+    Attributes:
+        client: Synchronous OpenAI client exposed to the tools through the context.
+        thread_cache (ThreadCache | None): Threads already validated.
+        answer_cache (AnswerCache | None): Answers to repeated first questions.
+        summary_refresher (SummaryRefresher | None): Background hand-off summaries.
+    """
+
+    def new_context(self, thread_id=None):
+        """
+        Cria o contexto de uma nova requisição.
+        """
+        return ConversationContext(self.client, thread_id=thread_id)
+
+    def thread_known(self, context, thread_id):
+        """
+        Consulta o cache de threads, registrando a consulta no timer do contexto.
+
+        :return: True se o thread já é conhecido e não precisa ser recuperado.
+        """
+        if self.thread_cache is None:
+            return False
+        with context.timer.phase("thread_cache.lookup") as details:
+            details["hit"] = self.thread_cache.lookup(thread_id) is not None
+        return details["hit"]
+
+    def remember_thread(self, thread_id, last_run_id=None):
+        if self.thread_cache is not None:
+            self.thread_cache.remember(thread_id, last_run_id)
+
+    def forget_thread(self, thread_id):
+        """
+        Descarta o thread do cache (a API respondeu que ele não existe).
+        """
+        if self.thread_cache is not None:
+            self.thread_cache.forget(thread_id)
+
+    def refresh_summary(self, context):
+        """
+        Agenda a atualização do resumo do thread (SUMMARY_REFRESH_ENABLED), para
+        que um hand-off posterior só precise incorporar o último turno.
+        """
+        if self.summary_refresher is not None:
+            self.summary_refresher.schedule(context.thread_id, context.transcript)
+
+    def remember_answer(self, context, content: str, answer: str):
+        """
+        Guarda a resposta da primeira pergunta de uma conversa, se for reaproveitável.
+        """
+        if not answer or answer == ERROR_ANSWER:
+            return
+        if self.answer_cache is not None and self.answer_cache.is_cacheable(context):
+            self.answer_cache.store(content, answer, context.citations)
+
 
-class ChatServices:
-    def __init__(self):
-        # inicializa o assistente e o cliente OpenAI
-        self.assistant_instance = Assistant()
+class ChatServices(BaseChatServices):
+    def __init__(self, assistant_instance=None):
+        # inicializa o assistente e o cliente OpenAI (ou reaproveita um já criado)
+        self.assistant_instance = assistant_instance or Assistant()
         self.client = self.assistant_instance.client
         self.assistant = self.assistant_instance.assistant
-        # inicializa ferramenta de busca vetorizada
-        self.search_tool = AISearchTool()
-        self.citations = []
+        # executa as tool calls de cada rodada em paralelo
+        self.tool_dispatcher = ToolDispatcher(self.assistant_instance)
+        # estratégia de espera do run (RUN_WAIT_MODE: backoff, poll ou stream)
+        self.run_waiter = create_run_waiter(self.client)
+        # conduz o run por quantas rodadas de ferramentas forem necessárias
+        self.run_driver = RunDriver(self.run_waiter, self.tool_dispatcher)
+        # respostas completas para primeiras perguntas repetidas
+        self.answer_cache = create_answer_cache(self.assistant)
+        # threads já validados: follow-ups não precisam de threads.retrieve
+        self.thread_cache = create_thread_cache()
+        # resumo do hand-off atualizado em segundo plano a cada run concluído
+        self.summary_refresher = create_summary_refresher(self.client)
+        # uma requisição por vez em cada thread; mensagens na fila viram um só run
+        self.thread_coordinator = ThreadCoordinator(self)
 
-    def create_new_thread(self):
+    def create_new_thread(self, context):
         logging.info("Criando nova thread.")
-        thread = self.client.beta.threads.create()
-        self.thread_id = thread.id
-        return self.thread_id
+        with context.timer.phase("threads.create"):
+            thread = self.client.beta.threads.create()
+        context.thread_id = thread.id
+        self.remember_thread(context.thread_id)
+        return context.thread_id
 
-    def retrieve_old_thread(self, thread_id):
+    def retrieve_old_thread(self, context, thread_id):
+        if self.thread_known(context, thread_id):
+            context.thread_id = thread_id
+            return
         logging.info(f"Recuperando thread existente: {thread_id}")
-        self.client.beta.threads.retrieve(thread_id=thread_id)
+        with context.timer.phase("threads.retrieve"):
+            self.client.beta.threads.retrieve(thread_id=thread_id)
+        context.thread_id = thread_id
+        self.remember_thread(thread_id)
 
-    def add_user_message(self, content: str):
+    def answer_from_cache(self, context, content: str):
         """
-        Adiciona uma mensagem do usuário ao thread atual.
+        Responde a primeira pergunta de uma conversa pelo cache de respostas.
+
+        Em caso de acerto, cria a conversa já semeada com a pergunta e a resposta
+        (seed_thread), para que as perguntas seguintes funcionem normalmente.
+
+        :return: Tupla (answer, citations) ou None se não houver resposta em cache.
         """
-        logging.info(f"Adicionando mensagem do usuário ao thread: {content!r}")
-        self.client.beta.threads.messages.create(
-            thread_id=self.thread_id, role="user", content=content
-        )
+        cached = lookup_cached_answer(self.answer_cache, context, content)
+        if cached is None:
+            return None
+        answer, citations = cached
+        self.seed_thread(context, content, answer)
+        context.citations = list(citations)
+        return answer, context.citations
 
-    def execute_assistant(self):
-        logging.info("Executando assistente.")
-        try:
-            self.run = self.client.beta.threads.runs.create(
-                thread_id=self.thread_id,
-                additional_instructions=(
-                    "Você é um assistente técnico especializado em fornecer respostas precisas "
-                    "e bem estruturadas. Sempre utilize o contexto recuperado via RAG para fundamentar suas respostas, "
-                    "cite as fontes recuperadas (use números entre colchetes para indicar citações) "
-                    "e formate tudo em Markdown (títulos, listas, blocos de código, etc.). "
-                    "Caso não encontre informações relevantes, diga apenas: Desculpe, não consegui encontrar informações relevantes para sua pergunta. "
-                ),
-                assistant_id=self.assistant.id,
-                tool_choice="required",
+    def seed_thread(self, context, content: str, answer: str):
+        """
+        Cria a thread já com a pergunta e a resposta (uma única chamada).
+        """
+        with context.timer.phase("threads.create"):
+            thread = self.client.beta.threads.create(
+                messages=seed_messages(content, answer)
             )
+        context.thread_id = thread.id
+        self.remember_thread(context.thread_id)
+
+    def invalidate_caches(self):
+        """
+        Descarta as respostas e os resultados de busca em cache
+        (ex.: após a reindexação do índice de busca).
+
+        Além de limpar os caches desta instância, grava uma nova geração dos
+        caches; as demais instâncias que leem o mesmo arquivo de geração
+        (CACHE_GENERATION_PATH) param de usar as entradas antigas em até
+        CACHE_GENERATION_CHECK_SECONDS.
+        """
+        get_cache_generation().bump()
+        if self.answer_cache is not None:
+            self.answer_cache.invalidate()
+        for tool in self.assistant_instance.tool_instances:
+            # ferramentas lazy ainda não carregadas não têm cache a limpar
+            if isinstance(tool, LazyTool):
+                tool = tool.tool
+            tool_cache = getattr(tool, "cache", None)
+            if tool_cache is not None:
+                tool_cache.clear()
 
-            # espera até completar
-            while self.run.status in ["queued", "in_progress", "cancelling"]:
-                logging.debug(f"Status do run: {self.run.status}. Aguardando...")
-                self.run = self.client.beta.threads.runs.retrieve(
-                    thread_id=self.thread_id, run_id=self.run.id
+    def add_user_message(self, context, content: str):
+        """
+        Adiciona uma mensagem do usuário ao thread do contexto.
+        """
+        logging.info(f"Adicionando mensagem do usuário ao thread: {content!r}")
+        try:
+            with context.timer.phase("messages.create"):
+                self.client.beta.threads.messages.create(
+                    thread_id=context.thread_id, role="user", content=content
                 )
+        except NotFoundError:
+            # thread vindo do cache que não existe mais: a próxima vez consulta a API
+            self.forget_thread(context.thread_id)
+            raise
+
+    def answer(self, context, content: str):
+        """
+        Adiciona a mensagem do usuário e executa o assistente na vez do thread.
+        Mensagens que chegam durante um run ativo no mesmo thread esperam e são
+        respondidas juntas pelo run seguinte.
+
+        :return: Tupla (answer, citations).
+        """
+        return self.thread_coordinator.submit(context, content)
+
+    def prefetch_search(self, context, content: str):
+        """
+        Adianta a busca do RAG com a mensagem do usuário (SEARCH_PREFETCH_ENABLED),
+        em paralelo com a criação da mensagem e do run. Chamado pelo
+        ThreadCoordinator só para a requisição que conduz o run.
+        """
+        self.tool_dispatcher.prefetch(context, content)
+
+    def execute_assistant(self, context):
+        logging.info("Executando assistente.")
+        try:
+            try:
+                self._drive(context)
+            except NotFoundError:
+                # assistente apagado no servidor: re-resolve e tenta uma vez
+                if not self.refresh_assistant():
+                    raise
+                self._drive(context)
+            self._log_run_outcome(context)
+            if context.run.status != "completed":
+                return ERROR_ANSWER, []
+            self.remember_thread(context.thread_id, context.run.id)
+            self.refresh_summary(context)
 
             # coleta a resposta final
-            answer = ""
-            if self.run.status == "completed":
+            with context.timer.phase("messages.list"):
                 messages = list(
                     self.client.beta.threads.messages.list(
-                        thread_id=self.thread_id, run_id=self.run.id
-                    )
-                )
-                assistant_message = next(
-                    (m for m in reversed(messages) if m.role == "assistant"), None
-                )
-                if assistant_message:
-                    # concatena todos os blocos de texto
-                    for block in assistant_message.content:
-                        if block.type == "text" and hasattr(block, "text"):
-                            answer += block.text.value
-                return answer, self.citations
-
-            elif self.run.status == "requires_action":
-                tool_outputs = []
-                for tool in self.run.required_action.submit_tool_outputs.tool_calls:
-                    tool_return = self.assistant_instance.call_tool_by_name(
-                        context=self,
-                        name=tool.function.name,
-                        arguments=tool.function.arguments,
-                    )
-                    logging.info(
-                        f"Function Name {tool.function.name}\nArguments:{tool.function.arguments}"
+                        thread_id=context.thread_id, run_id=context.run.id
                     )
-                    if tool.function.name == "ai_search_tool":
-                        self.citations += tool_return.get("citations", [])
-                    tool_output = {
-                        "tool_call_id": tool.id,
-                        "output": str(tool_return.get("tool_output", "No output")),
-                    }
-                    tool_outputs.append(tool_output)
-                try:
-                    self.run = (
-                        self.client.beta.threads.runs.submit_tool_outputs_and_poll(
-                            thread_id=self.thread_id,
-                            run_id=self.run.id,
-                            tool_outputs=tool_outputs,
-                        )
-                    )
-                    logging.info("Tool outputs submitted successfully.")
-                except Exception as e:
-                    logging.error("Failed to submit tool outputs:", e)
-
-            messages = list(
-                self.client.beta.threads.messages.list(
-                    thread_id=self.thread_id, run_id=self.run.id
                 )
-            )
-            assistant_message = next(
-                (m for m in reversed(messages) if m.role == "assistant"), None
-            )
-            if assistant_message:
-                # concatena todos os blocos de texto
-                for block in assistant_message.content:
-                    if block.type == "text" and hasattr(block, "text"):
-                        answer += block.text.value
-
-            return answer, self.citations
+            answer = extract_answer(messages)
+            context.answered = True
+            return answer, context.citations
 
         except Exception as e:
             logging.error(f"Erro ao processar a mensagem: {e}", exc_info=True)
-            return (
-                "Desculpe, ocorreu um erro ao processar sua solicitação. Por favor, tente novamente mais tarde.",
-                [],
-            )
+            return ERROR_ANSWER, []
+
+    def _drive(self, context):
+        self.run_driver.drive(
+            context,
+            additional_instructions=ADDITIONAL_INSTRUCTIONS,
+            assistant_id=self.assistant.id,
+            tool_choice="required",
+        )
+
+    def refresh_assistant(self):
+        """
+        Troca o assistente em uso se o ID dele não existe mais no servidor.
+
+        :return: True se a chamada que falhou pode ser repetida.
+        """
+        if not self.assistant_instance.refresh_assistant(self.assistant.id):
+            return False
+        self.assistant = self.assistant_instance.assistant
+        return True
+
+    def _log_run_outcome(self, context):
+        logging.info(
+            f"Run {context.run.id} finalizado com status {context.run.status} "
+            f"após {context.poll_count} consultas e {len(context.rounds)} rodadas "
+            f"de ferramentas: {context.rounds}"
+        )
@@ -0,0 +1,327 @@
+import logging
+import os
+import time
+from types import SimpleNamespace
+
+from services.answer_cache import seed_messages
+from services.async_chat_services import AsyncChatServices
+from services.chat_services import (
+    ADDITIONAL_INSTRUCTIONS,
+    ERROR_ANSWER,
+    ChatServices,
+)
+from services.conversation_store import ConversationStore
+from utils.metrics import record_run
+
+
+class CompletionsEngine:
+    """
+    Conduz uma resposta com ``chat.completions.create`` em vez de threads e runs.
+
+    Usa os mesmos schemas de ferramentas do assistente e o histórico do
+    ConversationStore. Cada rodada de ferramentas custa uma chamada ao modelo: a
+    primeira exige uma tool call (como o ``tool_choice="required"`` dos runs), as
+    seguintes deixam o modelo decidir e, atingido ``RUN_MAX_TOOL_ROUNDS``, a
+    última chamada proíbe ferramentas para forçar a resposta final.
+    Attributes:
+        store (ConversationStore): Conversation history keyed by threadId.
+        model (str): Deployment used for the completions.
+        tools (list): Tool schemas in OpenAI format (Assistant.tools_schemas).
+        system_prompt (str): Assistant role prompt plus the run instructions.
+        max_rounds (int): Maximum number of tool rounds per answer.
+    """
+
+    def __init__(self, assistant_instance, store=None, max_rounds=None):
+        self.store = store or ConversationStore()
+        self.model = assistant_instance.deployment
+        self.tools = assistant_instance.tools_schemas
+        self.system_prompt = "\n\n".join(
+            part
+            for part in (assistant_instance.role_prompt, ADDITIONAL_INSTRUCTIONS)
+            if part
+        )
+        self.max_rounds = max_rounds or int(os.getenv("RUN_MAX_TOOL_ROUNDS", "5"))
+
+    def request(self, messages, round_number):
+        """Parâmetros da chamada ao modelo na rodada ``round_number`` (0 = primeira)."""
+        if round_number == 0:
+            tool_choice = "required"
+        elif round_number >= self.max_rounds:
+            tool_choice = "none"
+        else:
+            tool_choice = "auto"
+        return {
+            "model": self.model,
+            "messages": [{"role": "system", "content": self.system_prompt}, *messages],
+            "tools": self.tools,
+            "tool_choice": tool_choice,
+            "temperature": 1,
+            "top_p": 1,
+        }
+
+    @staticmethod
+    def assistant_message(message):
+        """Converte a mensagem do modelo para o histórico."""
+        entry = {"role": "assistant", "content": message.content}
+        if message.tool_calls:
+            entry["tool_calls"] = [
+                {
+                    "id": tool.id,
+                    "type": "function",
+                    "function": {
+                        "name": tool.function.name,
+                        "arguments": tool.function.arguments,
+                    },
+                }
+                for tool in message.tool_calls
+            ]
+        return entry
+
+    @staticmethod
+    def tool_messages(tool_outputs):
+        return [
+            {
+                "role": "tool",
+                "tool_call_id": output["tool_call_id"],
+                "content": output["output"],
+            }
+            for output in tool_outputs
+        ]
+
+    def begin(self, context):
+        """
+        Prepara o contexto da resposta e devolve o histórico a enviar.
+        """
+        # o hand-off para o Teams resume a conversa a partir destes textos
+        context.transcript = self.store.user_texts(context.thread_id)
+        return self.store.history(context.thread_id)
+
+    def seed(self, context, content, answer):
+        """Cria a conversa já semeada com a pergunta e a resposta em cache."""
+        context.thread_id = self.store.create(seed_messages(content, answer))
+
+    def rounds(self, context):
+        """
+        Loop das rodadas de ferramentas de uma resposta, sem I/O.
+
+        Gera os pedidos ``("completion", parâmetros)`` e ``("tools", tool_calls)``
+        e recebe de volta, via ``send``, a resposta do modelo ou os tool outputs;
+        os serviços síncrono e assíncrono só executam os pedidos. Uma falha deve
+        ser devolvida com ``throw``, para fechar a fase em andamento.
+
+        :return: A resposta final (em ``StopIteration.value``).
+        """
+        messages = self.begin(context)
+        new_messages = []
+        round_number = 0
+        pending_round = None
+        while True:
+            started = time.monotonic()
+            with context.timer.phase(f"completion.round{round_number}"):
+                response = yield "completion", self.request(
+                    messages + new_messages, round_number
+                )
+            context.poll_count += 1
+            if pending_round is not None:
+                self.record_round(context, *pending_round, _elapsed_ms(started))
+            message = response.choices[0].message
+            new_messages.append(self.assistant_message(message))
+            if not message.tool_calls:
+                break
+
+            round_number += 1
+            started = time.monotonic()
+            with context.timer.phase(f"tools.round{round_number}"):
+                tool_outputs = yield "tools", message.tool_calls
+            new_messages += self.tool_messages(tool_outputs)
+            pending_round = (message.tool_calls, _elapsed_ms(started))
+
+        answer = message.content or ""
+        self.finish(context, response, new_messages, answer)
+        return answer
+
+    def finish(self, context, response, new_messages, answer):
+        """Grava o turno no histórico e registra o resultado como um run."""
+        self.store.append(context.thread_id, *new_messages)
+        context.run = SimpleNamespace(
+            id=response.id, status="completed" if answer else "incomplete"
+        )
+        record_run(context)
+
+    @staticmethod
+    def record_round(context, tool_calls, tools_ms, model_ms):
+        context.rounds.append(
+            {
+                "round": len(context.rounds) + 1,
+                "tools": [tool.function.name for tool in tool_calls],
+                "tools_ms": round(tools_ms, 1),
+                "run_ms": round(model_ms, 1),
+            }
+        )
+
+
+def _elapsed_ms(started):
+    return (time.monotonic() - started) * 1000
+
+
+class CompletionsChatServices(ChatServices):
+    """
+    ChatServices no modo ``CHAT_ENGINE=completions``: a conversa fica no
+    ConversationStore e cada resposta é uma sequência de ``chat.completions``,
+    uma chamada por rodada de ferramentas, em vez de thread, mensagem, run,
+    consultas ao run e listagem das mensagens.
+    """
+
+    def __init__(self, assistant_instance=None, store=None):
+        super().__init__(assistant_instance=assistant_instance)
+        self.engine = CompletionsEngine(self.assistant_instance, store)
+
+    def create_new_thread(self, context):
+        context.thread_id = self.engine.store.create()
+        return context.thread_id
+
+    def retrieve_old_thread(self, context, thread_id):
+        self.engine.store.ensure(thread_id)
+        context.thread_id = thread_id
+
+    def seed_thread(self, context, content: str, answer: str):
+        self.engine.seed(context, content, answer)
+
+    def add_user_message(self, context, content: str):
+        self.engine.store.append(
+            context.thread_id, {"role": "user", "content": content}
+        )
+
+    def execute_assistant(self, context):
+        logging.info("Executando assistente (chat completions).")
+        rounds = self.engine.rounds(context)
+        try:
+            request = next(rounds)
+            while True:
+                kind, payload = request
+                try:
+                    if kind == "completion":
+                        result = self.client.chat.completions.create(**payload)
+                    else:
+                        result = self.tool_dispatcher.dispatch(context, payload)
+                except Exception as e:
+                    request = rounds.throw(e)
+                else:
+                    request = rounds.send(result)
+        except StopIteration as stop:
+            answer = stop.value
+        except Exception as e:
+            logging.error(f"Erro ao processar a mensagem: {e}", exc_info=True)
+            return ERROR_ANSWER, []
+        if answer:
+            context.answered = True
+            self.refresh_summary(context)
+        return answer, context.citations
+
+
+class AsyncCompletionsChatServices(AsyncChatServices):
+    """
+    Versão assíncrona do CompletionsChatServices, sobre o mesmo engine (e o
+    mesmo histórico) do caminho síncrono.
+    """
+
+    def __init__(
+        self, assistant_instance, engine, answer_cache=None, summary_refresher=None
+    ):
+        super().__init__(
+            assistant_instance,
+            answer_cache=answer_cache,
+            summary_refresher=summary_refresher,
+        )
+        self.engine = engine
+
+    async def create_new_thread(self, context):
+        context.thread_id = self.engine.store.create()
+        return context.thread_id
+
+    async def retrieve_old_thread(self, context, thread_id):
+        self.engine.store.ensure(thread_id)
+        context.thread_id = thread_id
+
+    async def seed_thread(self, context, content: str, answer: str):
+        self.engine.seed(context, content, answer)
+
+    async def add_user_message(self, context, content: str):
+        self.engine.store.append(
+            context.thread_id, {"role": "user", "content": content}
+        )
+
+    async def execute_assistant(self, context):
+        logging.info("Executando assistente (chat completions, async).")
+        rounds = self.engine.rounds(context)
+        try:
+            request = next(rounds)
+            while True:
+                kind, payload = request
+                try:
+                    if kind == "completion":
+                        result = await self.async_client.chat.completions.create(
+                            **payload
+                        )
+                    else:
+                        result = await self.tool_dispatcher.adispatch(context, payload)
+                except Exception as e:
+                    request = rounds.throw(e)
+                else:
+                    request = rounds.send(result)
+        except StopIteration as stop:
+            answer = stop.value
+        except Exception as e:
+            logging.error(f"Erro ao processar a mensagem: {e}", exc_info=True)
+            return ERROR_ANSWER, []
+        if answer:
+            context.answered = True
+            self.refresh_summary(context)
+        return answer, context.citations
+
+    async def stream_assistant(self, context):
+        """
+        No modo completions a resposta sai inteira, num único ``delta``; os
+        eventos seguem o mesmo protocolo do stream de runs.
+        """
+        answer, citations = await self.execute_assistant(context)
+        if answer == ERROR_ANSWER:
+            yield "error", {"message": ERROR_ANSWER}
+            return
+        yield "delta", {"text": answer}
+        yield "citations", {"citations": citations}
+
+
+CHAT_ENGINES = ("assistants", "completions")
+
+
+def create_chat_services(assistant_instance, mode=None):
+    """
+    Cria os serviços de chat síncrono e assíncrono do engine configurado em
+    ``CHAT_ENGINE`` (assistants ou completions; padrão: assistants). Os dois
+    compartilham o cache de respostas, a atualização dos resumos e, conforme o engine, o cache de threads
+    (assistants) ou o histórico (completions).
+
+    :return: Tupla (ChatServices, AsyncChatServices).
+    """
+    mode = mode or os.getenv("CHAT_ENGINE", "assistants")
+    if mode not in CHAT_ENGINES:
+        raise ValueError(f"CHAT_ENGINE inválido: '{mode}'.")
+    if mode == "completions":
+        chat_services = CompletionsChatServices(assistant_instance)
+        async_chat_services = AsyncCompletionsChatServices(
+            assistant_instance,
+            chat_services.engine,
+            answer_cache=chat_services.answer_cache,
+            summary_refresher=chat_services.summary_refresher,
+        )
+    else:
+        chat_services = ChatServices(assistant_instance=assistant_instance)
+        async_chat_services = AsyncChatServices(
+            assistant_instance,
+            answer_cache=chat_services.answer_cache,
+            thread_cache=chat_services.thread_cache,
+            summary_refresher=chat_services.summary_refresher,
+        )
+    logging.info(f"Engine de chat: {mode}")
+    return chat_services, async_chat_services
@@ -0,0 +1,68 @@
+from utils.request_timing import RequestTimer
+
+
+class ConversationContext:
+    """
+    Estado de uma única requisição de chat.
+
+    Guarda a thread, o run e as citações da conversa em andamento. Os clientes e as
+    ferramentas continuam compartilhados no ChatServices; o contexto é criado a cada
+    requisição e descartado ao final, o que permite atender requisições concorrentes
+    sem que uma sobrescreva o estado da outra.
+    Attributes:
+        client (AzureOpenAI): Shared OpenAI client, exposed to tools that need it.
+        thread_id (str): ID of the thread the request is working on.
+        run (object): Current run of the request, if any.
+        citations (list): Citations collected by tool calls during this request.
+        poll_count (int): Server round trips spent following runs in this request.
+        rounds (list): Timing of each tool round driven in this request.
+        timer (RequestTimer): Latency waterfall of this request (Server-Timing).
+        superseded (bool): Set when a newer message asks to cancel the current run.
+        transcript (list): User messages of a locally stored conversation (chat
+            completions engine), used to summarize hand-offs; None otherwise.
+        search_prefetch (SearchPrefetch): Speculative search started with the user
+            message, until a tool call claims it.
+        answered (bool): Set once the final answer was extracted successfully; only
+            such answers may go to the answer cache.
+    """
+
+    __slots__ = (
+        "client",
+        "thread_id",
+        "run",
+        "citations",
+        "poll_count",
+        "rounds",
+        "timer",
+        "superseded",
+        "transcript",
+        "search_prefetch",
+        "answered",
+    )
+
+    def __init__(self, client, thread_id=None):
+        self.client = client
+        self.thread_id = thread_id
+        self.run = None
+        self.citations = []
+        self.poll_count = 0
+        self.rounds = []
+        self.timer = RequestTimer()
+        self.superseded = False
+        self.transcript = None
+        self.search_prefetch = None
+        self.answered = False
+
+    def start_run(self):
+        """
+        Descarta o estado do run anterior (ex.: run substituído pelo
+        ThreadCoordinator) antes de um novo run no mesmo contexto.
+        """
+        self.run = None
+        self.citations = []
+        self.rounds = []
+        self.superseded = False
+        self.answered = False
+        if self.search_prefetch is not None:
+            self.search_prefetch.pending.cancel()
+            self.search_prefetch = None
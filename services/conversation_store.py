@@ -0,0 +1,92 @@
+import logging
+import os
+import threading
+import uuid
+
+from utils.cache import TTLCache
+
+
+class ConversationStore:
+    """
+    Histórico das conversas do modo chat completions, por threadId.
+
+    Guarda as mensagens no formato de ``chat.completions`` (user, assistant com
+    tool_calls e tool) num TTLCache em memória (``CONVERSATION_STORE_SIZE`` e
+    ``CONVERSATION_STORE_TTL_SECONDS``). O histórico enviado ao modelo é
+    limitado às ``CONVERSATION_MAX_MESSAGES`` mensagens mais recentes, cortando
+    sempre no início de um turno do usuário para não separar uma tool call do
+    seu resultado.
+
+    O store é do processo: com várias instâncias, as conversas dependem de
+    afinidade de sessão (ou de um store compartilhado no lugar deste).
+    Attributes:
+        max_messages (int): Maximum number of history messages sent to the model.
+    """
+
+    def __init__(self, max_size=None, ttl_seconds=None, max_messages=None):
+        self.max_messages = max_messages or int(
+            os.getenv("CONVERSATION_MAX_MESSAGES", "40")
+        )
+        self._entries = TTLCache(
+            max_size=max_size or int(os.getenv("CONVERSATION_STORE_SIZE", "4096")),
+            ttl_seconds=ttl_seconds
+            or float(os.getenv("CONVERSATION_STORE_TTL_SECONDS", "86400")),
+        )
+        self._lock = threading.Lock()
+
+    def create(self, messages=None):
+        """
+        Cria uma conversa, opcionalmente já semeada com mensagens.
+
+        :return: O threadId da conversa.
+        """
+        thread_id = f"chat_{uuid.uuid4().hex}"
+        self._entries.set(thread_id, list(messages or []))
+        return thread_id
+
+    def __contains__(self, thread_id):
+        return thread_id in self._entries
+
+    def ensure(self, thread_id):
+        """
+        Garante que a conversa exista. Uma conversa expirada (ou de outra
+        instância) recomeça vazia com o mesmo threadId.
+        """
+        with self._lock:
+            if thread_id not in self._entries:
+                logging.warning(
+                    f"Conversa {thread_id} não encontrada; recomeçando o histórico."
+                )
+                self._entries.set(thread_id, [])
+
+    def append(self, thread_id, *messages):
+        with self._lock:
+            history = self._entries.get(thread_id) or []
+            self._entries.set(thread_id, history + list(messages))
+
+    def history(self, thread_id):
+        """
+        Mensagens recentes da conversa, prontas para o modelo.
+
+        :return: Lista de mensagens (cópia), começando num turno do usuário.
+        """
+        history = self._entries.get(thread_id) or []
+        if len(history) <= self.max_messages:
+            return list(history)
+        recent = history[-self.max_messages :]
+        for index, message in enumerate(recent):
+            if message["role"] == "user":
+                return recent[index:]
+        # turno longo demais: mantém ao menos a última pergunta e o que veio depois
+        last_user = max(
+            (i for i, m in enumerate(history) if m["role"] == "user"), default=0
+        )
+        return history[last_user:]
+
+    def user_texts(self, thread_id):
+        """Textos das mensagens do usuário, da mais antiga para a mais nova."""
+        return [
+            message["content"]
+            for message in self._entries.get(thread_id) or []
+            if message["role"] == "user"
+        ]
@@ -0,0 +1,319 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from services.run_waiter import PENDING_STATUSES, RunDeadlineExceeded
+from utils.metrics import record_run
+
+# status em que o run ainda pode ser cancelado
+ACTIVE_STATUSES = PENDING_STATUSES + ("requires_action",)
+
+# intervalo entre as consultas enquanto um run cancelado termina de cancelar
+CANCEL_POLL_SECONDS = 0.2
+
+
+class RunDriver:
+    """
+    Conduz um run do início ao fim, atravessando quantas rodadas de ferramentas
+    forem necessárias.
+
+    A cada ``requires_action`` as tool calls são executadas pelo ToolDispatcher e os
+    outputs enviados; o ciclo se repete até o run sair de ``requires_action``. Há um
+    limite de rodadas (``RUN_MAX_TOOL_ROUNDS``) e um orçamento de tempo de parede
+    (``RUN_BUDGET_SECONDS``); se algum deles estoura, o run é cancelado com
+    ``runs.cancel``. O tempo de cada rodada fica registrado em ``context.rounds``.
+    Os mesmos limites valem para o caminho de streaming (``astream``).
+
+    Um run marcado como substituído (``context.superseded``, pelo
+    ThreadCoordinator) é cancelado antes da próxima rodada. Em todo
+    cancelamento o driver espera o run sair de ``cancelling`` (até
+    ``RUN_CANCEL_WAIT_SECONDS``): até lá o thread não aceita mensagens nem
+    outro run, e o ThreadCoordinator passaria a vez cedo demais.
+    Attributes:
+        run_waiter (RunWaiter): Strategy used to wait for the sync run.
+        tool_dispatcher (ToolDispatcher): Executes the tool calls of each round.
+        async_client (AsyncAzureOpenAI): Client used by adrive, if any.
+        max_rounds (int): Maximum number of tool rounds per run.
+        budget_seconds (float): Wall-clock budget for the whole run.
+        cancel_wait_seconds (float): Maximum wait for a cancelled run to settle.
+    """
+
+    def __init__(
+        self,
+        run_waiter,
+        tool_dispatcher,
+        async_client=None,
+        max_rounds=None,
+        budget_seconds=None,
+        cancel_wait_seconds=None,
+    ):
+        self.run_waiter = run_waiter
+        self.client = run_waiter.client
+        self.tool_dispatcher = tool_dispatcher
+        self.async_client = async_client
+        self.max_rounds = max_rounds or int(os.getenv("RUN_MAX_TOOL_ROUNDS", "5"))
+        self.budget_seconds = budget_seconds or float(
+            os.getenv("RUN_BUDGET_SECONDS", str(run_waiter.deadline_seconds))
+        )
+        self.cancel_wait_seconds = (
+            cancel_wait_seconds
+            if cancel_wait_seconds is not None
+            else float(os.getenv("RUN_CANCEL_WAIT_SECONDS", "10"))
+        )
+
+    def drive(self, context, **run_params):
+        """
+        Cria o run e o conduz até um status final.
+
+        :param context: ConversationContext da requisição.
+        :param run_params: Parâmetros repassados a ``runs.create``.
+        :return: O run final (``context.run``); ``cancelled``/``cancelling`` quando
+            o limite de rodadas ou o orçamento de tempo foi excedido.
+        """
+        deadline = time.monotonic() + self.budget_seconds
+        try:
+            with self._timed(context, "run.create"):
+                context.run = self.run_waiter.create_and_wait(
+                    context, deadline, **run_params
+                )
+            while context.run.status == "requires_action":
+                if context.superseded:
+                    logging.info(f"Run {context.run.id} substituído; cancelando.")
+                    self.cancel(context)
+                    break
+                if not self._can_start_round(context, deadline):
+                    self.cancel(context)
+                    break
+
+                tool_calls = context.run.required_action.submit_tool_outputs.tool_calls
+                round_number = len(context.rounds) + 1
+                round_started = time.monotonic()
+                with context.timer.phase(f"tools.round{round_number}"):
+                    tool_outputs = self.tool_dispatcher.dispatch(context, tool_calls)
+                tools_done = time.monotonic()
+                with self._timed(context, f"run.submit.round{round_number}"):
+                    context.run = self.run_waiter.submit_and_wait(
+                        context, tool_outputs, deadline
+                    )
+                self._record_round(context, tool_calls, round_started, tools_done)
+
+        except RunDeadlineExceeded as e:
+            logging.warning(
+                f"Orçamento de {self.budget_seconds}s excedido; cancelando o run."
+            )
+            context.run = e.run or context.run
+            self.cancel(context)
+        record_run(context)
+        return context.run
+
+    async def adrive(self, context, **run_params):
+        """
+        Versão assíncrona de drive: o run é acompanhado pelos métodos assíncronos
+        do mesmo RunWaiter (RUN_WAIT_MODE), com o cliente AsyncAzureOpenAI.
+        """
+        deadline = time.monotonic() + self.budget_seconds
+        try:
+            with self._timed(context, "run.create"):
+                context.run = await self.run_waiter.acreate_and_wait(
+                    context, deadline, **run_params
+                )
+            while context.run.status == "requires_action":
+                if context.superseded:
+                    logging.info(f"Run {context.run.id} substituído; cancelando.")
+                    await self.acancel(context)
+                    break
+                if not self._can_start_round(context, deadline):
+                    await self.acancel(context)
+                    break
+
+                tool_calls = context.run.required_action.submit_tool_outputs.tool_calls
+                round_number = len(context.rounds) + 1
+                round_started = time.monotonic()
+                with context.timer.phase(f"tools.round{round_number}"):
+                    tool_outputs = await self.tool_dispatcher.adispatch(
+                        context, tool_calls
+                    )
+                tools_done = time.monotonic()
+                with self._timed(context, f"run.submit.round{round_number}"):
+                    context.run = await self.run_waiter.asubmit_and_wait(
+                        context, tool_outputs, deadline
+                    )
+                self._record_round(context, tool_calls, round_started, tools_done)
+
+        except RunDeadlineExceeded as e:
+            logging.warning(
+                f"Orçamento de {self.budget_seconds}s excedido; cancelando o run."
+            )
+            context.run = e.run or context.run
+            await self.acancel(context)
+        record_run(context)
+        return context.run
+
+    async def astream(self, context, **run_params):
+        """
+        Conduz o run em modo streaming, com os mesmos limites de drive: no máximo
+        ``max_rounds`` rodadas de ferramentas e ``budget_seconds`` de tempo de
+        parede. Se algum estoura, o run é cancelado e o stream termina (o run
+        fica em ``cancelling``/``cancelled``).
+
+        :return: Async generator com os trechos de texto da resposta.
+        """
+        runs = self.async_client.beta.threads.runs
+        deadline = time.monotonic() + self.budget_seconds
+        stream_manager = runs.stream(
+            thread_id=context.thread_id, timeout=self._remaining(deadline), **run_params
+        )
+        pending_round = None
+        while stream_manager is not None:
+            next_manager = None
+            # cada stream aberto conta como uma ida ao servidor
+            context.poll_count += 1
+            async with stream_manager as stream:
+                async for event in stream:
+                    if event.event == "thread.message.delta":
+                        for text in delta_texts(event.data.delta):
+                            yield text
+                    elif event.event == "thread.run.requires_action":
+                        context.run = event.data
+                        if pending_round is not None:
+                            self._record_round(context, *pending_round)
+                            pending_round = None
+                        if not self._can_start_round(context, deadline):
+                            await self.acancel(context)
+                            return
+                        tool_calls = (
+                            context.run.required_action.submit_tool_outputs.tool_calls
+                        )
+                        round_started = time.monotonic()
+                        with context.timer.phase(
+                            f"tools.round{len(context.rounds) + 1}"
+                        ):
+                            tool_outputs = await self.tool_dispatcher.adispatch(
+                                context, tool_calls
+                            )
+                        pending_round = (tool_calls, round_started, time.monotonic())
+                        next_manager = runs.submit_tool_outputs_stream(
+                            thread_id=context.thread_id,
+                            run_id=context.run.id,
+                            tool_outputs=tool_outputs,
+                            timeout=self._remaining(deadline),
+                        )
+                    elif event.event.startswith("thread.run."):
+                        context.run = event.data
+                    if time.monotonic() >= deadline and not self._finished(context):
+                        logging.warning(
+                            f"Orçamento de {self.budget_seconds}s excedido; "
+                            "cancelando o run."
+                        )
+                        await self.acancel(context)
+                        return
+            stream_manager = next_manager
+        # a última rodada termina quando o modelo conclui a resposta
+        if pending_round is not None:
+            self._record_round(context, *pending_round)
+
+    @staticmethod
+    def _finished(context):
+        status = getattr(context.run, "status", None)
+        return status is not None and status not in ACTIVE_STATUSES
+
+    @staticmethod
+    def is_active(context):
+        """Indica se o run do contexto ainda ocupa o thread (inclui ``cancelling``)."""
+        status = getattr(context.run, "status", None)
+        return status in ACTIVE_STATUSES or status == "cancelling"
+
+    @staticmethod
+    def _remaining(deadline):
+        return max(deadline - time.monotonic(), 0.001)
+
+    @staticmethod
+    @contextmanager
+    def _timed(context, name):
+        """Fase do run na cascata da requisição, com as consultas feitas nela."""
+        polls_before = context.poll_count
+        with context.timer.phase(name) as details:
+            yield
+            details["polls"] = context.poll_count - polls_before
+            details["status"] = getattr(context.run, "status", None)
+
+    def _can_start_round(self, context, deadline):
+        if len(context.rounds) >= self.max_rounds:
+            logging.warning(
+                f"Limite de {self.max_rounds} rodadas de ferramentas atingido."
+            )
+            return False
+        if time.monotonic() >= deadline:
+            logging.warning(f"Orçamento de {self.budget_seconds}s excedido.")
+            return False
+        return True
+
+    @staticmethod
+    def _record_round(context, tool_calls, round_started, tools_done):
+        finished = time.monotonic()
+        context.rounds.append(
+            {
+                "round": len(context.rounds) + 1,
+                "tools": [tool.function.name for tool in tool_calls],
+                "tools_ms": round((tools_done - round_started) * 1000, 1),
+                "run_ms": round((finished - tools_done) * 1000, 1),
+            }
+        )
+
+    def cancel(self, context):
+        """
+        Cancela o run do contexto, se ativo, e espera o cancelamento terminar.
+        """
+        if context.run is None or self._finished(context):
+            return
+        try:
+            context.run = self.client.beta.threads.runs.cancel(
+                thread_id=context.thread_id, run_id=context.run.id
+            )
+        except Exception as e:
+            logging.error(f"Falha ao cancelar o run {context.run.id}: {e}")
+            return
+        self._wait_cancelled(context)
+
+    async def acancel(self, context):
+        """Versão assíncrona de cancel."""
+        if context.run is None or self._finished(context):
+            return
+        try:
+            context.run = await self.async_client.beta.threads.runs.cancel(
+                thread_id=context.thread_id, run_id=context.run.id
+            )
+        except Exception as e:
+            logging.error(f"Falha ao cancelar o run {context.run.id}: {e}")
+            return
+        await self._await_cancelled(context)
+
+    def _wait_cancelled(self, context):
+        """Espera o run sair de ``cancelling``: até lá o thread não aceita outro run."""
+        logging.info(f"Aguardando o cancelamento do run {context.run.id}.")
+        deadline = time.monotonic() + self.cancel_wait_seconds
+        while self.is_active(context) and time.monotonic() < deadline:
+            time.sleep(CANCEL_POLL_SECONDS)
+            context.poll_count += 1
+            context.run = self.client.beta.threads.runs.retrieve(
+                thread_id=context.thread_id, run_id=context.run.id
+            )
+
+    async def _await_cancelled(self, context):
+        logging.info(f"Aguardando o cancelamento do run {context.run.id}.")
+        deadline = time.monotonic() + self.cancel_wait_seconds
+        while self.is_active(context) and time.monotonic() < deadline:
+            await asyncio.sleep(CANCEL_POLL_SECONDS)
+            context.poll_count += 1
+            context.run = await self.async_client.beta.threads.runs.retrieve(
+                thread_id=context.thread_id, run_id=context.run.id
+            )
+
+
+def delta_texts(delta):
+    """Extrai os trechos de texto de um MessageDelta."""
+    for block in delta.content or []:
+        if block.type == "text" and getattr(block, "text", None) and block.text.value:
+            yield block.text.value
@@ -0,0 +1,339 @@
+import asyncio
+import inspect
+import logging
+import os
+import random
+import time
+
+# status em que o run ainda está em andamento
+PENDING_STATUSES = ("queued", "in_progress", "cancelling")
+
+
+class RunDeadlineExceeded(TimeoutError):
+    """
+    Levantada quando o run não chega a um status final dentro do prazo.
+
+    :param run: Último estado conhecido do run (pode ser None).
+    """
+
+    def __init__(self, run, message="O run excedeu o prazo máximo de espera."):
+        super().__init__(message)
+        self.run = run
+
+
+class RunWaiter:
+    """
+    Estratégia base para criar um run e aguardar até ele sair dos status pendentes.
+
+    Cada estratégia implementa ``_wait`` (ou sobrescreve os dois métodos públicos) e
+    respeita um prazo absoluto (``time.monotonic()``) compartilhado por todas as
+    etapas da requisição. Cada ida ao servidor para acompanhar o run incrementa
+    ``context.poll_count``.
+
+    Os métodos ``acreate_and_wait`` e ``asubmit_and_wait`` fazem o mesmo com o
+    cliente assíncrono (``_await`` em cada estratégia), com os mesmos intervalos
+    e a mesma contagem de consultas.
+    Attributes:
+        client (AzureOpenAI): OpenAI client used to create and follow runs.
+        async_client (AsyncAzureOpenAI): Client used by the async methods, if any.
+        deadline_seconds (float): Default overall deadline (RUN_WAIT_DEADLINE_SECONDS).
+    """
+
+    mode = None
+
+    def __init__(self, client, deadline_seconds=None, async_client=None):
+        self.client = client
+        self.async_client = async_client
+        self.deadline_seconds = deadline_seconds or float(
+            os.getenv("RUN_WAIT_DEADLINE_SECONDS", "60")
+        )
+
+    def new_deadline(self):
+        """Retorna o prazo absoluto para uma nova requisição."""
+        return time.monotonic() + self.deadline_seconds
+
+    def create_and_wait(self, context, deadline=None, **run_params):
+        """
+        Cria um run no thread do contexto e espera até um status não pendente.
+
+        :return: O run no status final (completed, requires_action, failed...).
+        """
+        deadline = deadline or self.new_deadline()
+        run = self.client.beta.threads.runs.create(
+            thread_id=context.thread_id, **run_params
+        )
+        return self._wait(context, run, deadline)
+
+    def submit_and_wait(self, context, tool_outputs, deadline=None):
+        """
+        Envia os tool outputs do run atual e espera até um status não pendente.
+        """
+        deadline = deadline or self.new_deadline()
+        run = self.client.beta.threads.runs.submit_tool_outputs(
+            thread_id=context.thread_id,
+            run_id=context.run.id,
+            tool_outputs=tool_outputs,
+        )
+        return self._wait(context, run, deadline)
+
+    async def acreate_and_wait(self, context, deadline=None, **run_params):
+        """
+        Versão assíncrona de create_and_wait.
+        """
+        deadline = deadline or self.new_deadline()
+        run = await self.async_client.beta.threads.runs.create(
+            thread_id=context.thread_id, **run_params
+        )
+        return await self._await(context, run, deadline)
+
+    async def asubmit_and_wait(self, context, tool_outputs, deadline=None):
+        """
+        Versão assíncrona de submit_and_wait.
+        """
+        deadline = deadline or self.new_deadline()
+        run = await self.async_client.beta.threads.runs.submit_tool_outputs(
+            thread_id=context.thread_id,
+            run_id=context.run.id,
+            tool_outputs=tool_outputs,
+        )
+        return await self._await(context, run, deadline)
+
+    def _wait(self, context, run, deadline):
+        raise NotImplementedError
+
+    async def _await(self, context, run, deadline):
+        raise NotImplementedError
+
+    def _retrieve(self, context, run):
+        context.poll_count += 1
+        return self.client.beta.threads.runs.retrieve(
+            thread_id=context.thread_id, run_id=run.id
+        )
+
+    async def _aretrieve(self, context, run):
+        context.poll_count += 1
+        return await self.async_client.beta.threads.runs.retrieve(
+            thread_id=context.thread_id, run_id=run.id
+        )
+
+    @staticmethod
+    def _check_deadline(run, deadline):
+        if time.monotonic() >= deadline:
+            raise RunDeadlineExceeded(run)
+
+
+class BackoffRunWaiter(RunWaiter):
+    """
+    Consulta o run com backoff exponencial e jitter.
+
+    O intervalo começa em ``RUN_BACKOFF_INITIAL_MS``, cresce pelo fator
+    ``RUN_BACKOFF_MULTIPLIER`` até ``RUN_BACKOFF_MAX_MS`` e recebe um jitter
+    de ±``RUN_BACKOFF_JITTER`` para espalhar as consultas de requisições simultâneas.
+    """
+
+    mode = "backoff"
+
+    def __init__(
+        self,
+        client,
+        deadline_seconds=None,
+        initial_ms=None,
+        max_ms=None,
+        multiplier=None,
+        jitter=None,
+        async_client=None,
+    ):
+        super().__init__(client, deadline_seconds, async_client)
+        self.initial_ms = initial_ms or float(
+            os.getenv("RUN_BACKOFF_INITIAL_MS", "250")
+        )
+        self.max_ms = max_ms or float(os.getenv("RUN_BACKOFF_MAX_MS", "2000"))
+        self.multiplier = multiplier or float(
+            os.getenv("RUN_BACKOFF_MULTIPLIER", "1.5")
+        )
+        self.jitter = (
+            jitter
+            if jitter is not None
+            else float(os.getenv("RUN_BACKOFF_JITTER", "0.2"))
+        )
+
+    def _sleep_seconds(self, run, delay_ms, deadline):
+        """
+        Espera antes da próxima consulta, com jitter e limitada ao prazo.
+        Levanta RunDeadlineExceeded quando o prazo já acabou.
+        """
+        logging.debug(f"Status do run: {run.status}. Aguardando {delay_ms:.0f} ms...")
+        sleep_s = delay_ms / 1000 * random.uniform(1 - self.jitter, 1 + self.jitter)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise RunDeadlineExceeded(run)
+        return min(sleep_s, remaining)
+
+    def _wait(self, context, run, deadline):
+        delay_ms = self.initial_ms
+        while run.status in PENDING_STATUSES:
+            time.sleep(self._sleep_seconds(run, delay_ms, deadline))
+            run = self._retrieve(context, run)
+            delay_ms = min(delay_ms * self.multiplier, self.max_ms)
+        return run
+
+    async def _await(self, context, run, deadline):
+        delay_ms = self.initial_ms
+        while run.status in PENDING_STATUSES:
+            await asyncio.sleep(self._sleep_seconds(run, delay_ms, deadline))
+            run = await self._aretrieve(context, run)
+            delay_ms = min(delay_ms * self.multiplier, self.max_ms)
+        return run
+
+
+class PollRunWaiter(RunWaiter):
+    """
+    Polling no estilo de ``create_and_poll`` do SDK: respeita o header
+    ``openai-poll-after-ms`` enviado pelo servidor e, na falta dele, usa
+    ``RUN_POLL_INTERVAL_MS``. Diferente do SDK, respeita o prazo e conta as consultas.
+    """
+
+    mode = "poll"
+
+    def __init__(
+        self, client, deadline_seconds=None, poll_interval_ms=None, async_client=None
+    ):
+        super().__init__(client, deadline_seconds, async_client)
+        self.poll_interval_ms = poll_interval_ms or int(
+            os.getenv("RUN_POLL_INTERVAL_MS", "500")
+        )
+
+    def _wait(self, context, run, deadline):
+        interval_ms = self.poll_interval_ms
+        while run.status in PENDING_STATUSES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise RunDeadlineExceeded(run)
+            time.sleep(min(interval_ms / 1000, remaining))
+
+            context.poll_count += 1
+            response = self.client.beta.threads.runs.with_raw_response.retrieve(
+                thread_id=context.thread_id, run_id=run.id
+            )
+            run = response.parse()
+            poll_after = response.headers.get("openai-poll-after-ms")
+            interval_ms = int(poll_after) if poll_after else self.poll_interval_ms
+        return run
+
+    async def _await(self, context, run, deadline):
+        interval_ms = self.poll_interval_ms
+        while run.status in PENDING_STATUSES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise RunDeadlineExceeded(run)
+            await asyncio.sleep(min(interval_ms / 1000, remaining))
+
+            context.poll_count += 1
+            runs = self.async_client.beta.threads.runs
+            response = await runs.with_raw_response.retrieve(
+                thread_id=context.thread_id, run_id=run.id
+            )
+            run = response.parse()
+            if inspect.isawaitable(run):
+                run = await run  # AsyncAPIResponse.parse é assíncrono
+            poll_after = response.headers.get("openai-poll-after-ms")
+            interval_ms = int(poll_after) if poll_after else self.poll_interval_ms
+        return run
+
+
+class StreamingRunWaiter(RunWaiter):
+    """
+    Acompanha o run pelos eventos de streaming em vez de consultas periódicas.
+
+    Cada stream aberto conta como uma ida ao servidor. O stream termina sozinho
+    quando o run chega a um status final ou a ``requires_action``.
+    """
+
+    mode = "stream"
+
+    def create_and_wait(self, context, deadline=None, **run_params):
+        deadline = deadline or self.new_deadline()
+        manager = self.client.beta.threads.runs.stream(
+            thread_id=context.thread_id,
+            timeout=max(deadline - time.monotonic(), 0.001),
+            **run_params,
+        )
+        return self._consume(context, manager, deadline)
+
+    def submit_and_wait(self, context, tool_outputs, deadline=None):
+        deadline = deadline or self.new_deadline()
+        manager = self.client.beta.threads.runs.submit_tool_outputs_stream(
+            thread_id=context.thread_id,
+            run_id=context.run.id,
+            tool_outputs=tool_outputs,
+            timeout=max(deadline - time.monotonic(), 0.001),
+        )
+        return self._consume(context, manager, deadline)
+
+    def _consume(self, context, manager, deadline):
+        context.poll_count += 1
+        run = None
+        with manager as stream:
+            for event in stream:
+                if event.event.startswith("thread.run.") and not event.event.startswith(
+                    "thread.run.step"
+                ):
+                    run = event.data
+                self._check_deadline(run, deadline)
+        return self._final_run(run)
+
+    async def acreate_and_wait(self, context, deadline=None, **run_params):
+        deadline = deadline or self.new_deadline()
+        manager = self.async_client.beta.threads.runs.stream(
+            thread_id=context.thread_id,
+            timeout=max(deadline - time.monotonic(), 0.001),
+            **run_params,
+        )
+        return await self._aconsume(context, manager, deadline)
+
+    async def asubmit_and_wait(self, context, tool_outputs, deadline=None):
+        deadline = deadline or self.new_deadline()
+        manager = self.async_client.beta.threads.runs.submit_tool_outputs_stream(
+            thread_id=context.thread_id,
+            run_id=context.run.id,
+            tool_outputs=tool_outputs,
+            timeout=max(deadline - time.monotonic(), 0.001),
+        )
+        return await self._aconsume(context, manager, deadline)
+
+    async def _aconsume(self, context, manager, deadline):
+        context.poll_count += 1
+        run = None
+        async with manager as stream:
+            async for event in stream:
+                if event.event.startswith("thread.run.") and not event.event.startswith(
+                    "thread.run.step"
+                ):
+                    run = event.data
+                self._check_deadline(run, deadline)
+        return self._final_run(run)
+
+    @staticmethod
+    def _final_run(run):
+        if run is None or run.status in PENDING_STATUSES:
+            raise RunDeadlineExceeded(run, "O stream terminou sem status final do run.")
+        return run
+
+
+RUN_WAITERS = {
+    waiter.mode: waiter
+    for waiter in (BackoffRunWaiter, PollRunWaiter, StreamingRunWaiter)
+}
+
+
+def create_run_waiter(client, mode=None, async_client=None):
+    """
+    Cria a estratégia de espera configurada em ``RUN_WAIT_MODE``
+    (backoff, poll ou stream; padrão: backoff). Com ``async_client``, a mesma
+    estratégia atende também os métodos assíncronos.
+    """
+    mode = mode or os.getenv("RUN_WAIT_MODE", BackoffRunWaiter.mode)
+    waiter_cls = RUN_WAITERS.get(mode)
+    if waiter_cls is None:
+        raise ValueError(f"RUN_WAIT_MODE inválido: '{mode}'.")
+    return waiter_cls(client, async_client=async_client)
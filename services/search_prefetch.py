@@ -0,0 +1,157 @@
+import asyncio
+import json
+import logging
+import os
+
+from utils.metrics import SEARCH_PREFETCH
+from utils.text import jaccard_similarity, token_set
+
+# k_results usado pela busca quando o modelo não informa outro
+DEFAULT_K_RESULTS = 3
+
+
+class SearchPrefetch:
+    """
+    Busca especulativa de uma requisição, disparada com a mensagem do usuário.
+    Attributes:
+        query (str): User message the search was started with.
+        pending (Future | Task): The running search (tool return on completion).
+    """
+
+    __slots__ = ("query", "tokens", "pending")
+
+    def __init__(self, query, pending):
+        self.query = query
+        self.tokens = token_set(query)
+        self.pending = pending
+
+    def matches(self, arguments, similarity_threshold):
+        """
+        Indica se a busca adiantada serve para os argumentos da tool call.
+        """
+        if not arguments.get("search_needed", True):
+            return False
+        if arguments.get("k_results", DEFAULT_K_RESULTS) != DEFAULT_K_RESULTS:
+            return False
+        query = token_set(arguments.get("query", ""))
+        return jaccard_similarity(self.tokens, query) >= similarity_threshold
+
+
+def _retrieve_error(task):
+    # uma busca descartada que falhou não deve gerar "exception never retrieved"
+    if not task.cancelled():
+        task.exception()
+
+
+class SearchPrefetcher:
+    """
+    Adianta a busca do RAG enquanto a mensagem e o run são criados.
+
+    Com ``tool_choice="required"``, quase todo turno termina numa chamada da busca
+    cuja query é praticamente a mensagem do usuário. O prefetcher dispara essa
+    busca com a mensagem crua assim que a requisição chega, em paralelo com
+    ``messages.create`` e ``runs.create``. Quando a tool call chega, o
+    ToolDispatcher usa o resultado adiantado se a query do modelo for parecida o
+    bastante com a mensagem (similaridade de palavras maior ou igual a
+    ``SEARCH_PREFETCH_SIMILARITY``); senão, a busca roda normalmente e a
+    adiantada é descartada. Só a primeira busca de cada requisição é adiantada.
+
+    A busca só é adiantada pela requisição que conduz o run (ThreadCoordinator):
+    mensagens que esperam a vez ou são agrupadas no run de outra requisição não
+    consultam o índice. Ela chama a ferramenta direto, sem passar pelas métricas
+    de ferramentas: a tool call que a usa é que conta como chamada.
+
+    Uma busca descartada custa uma consulta a mais ao índice; por isso o modo é
+    desligado por padrão (``SEARCH_PREFETCH_ENABLED``).
+    Attributes:
+        assistant_instance (Assistant): Assistant that owns the search tool.
+        executor (Executor): Pool that runs the sync prefetches.
+        tool_name (str): Name of the search tool.
+        similarity_threshold (float): Minimum Jaccard similarity to reuse a prefetch.
+    """
+
+    def __init__(
+        self,
+        assistant_instance,
+        executor,
+        tool_name="ai_search_tool",
+        similarity_threshold=None,
+    ):
+        self.assistant_instance = assistant_instance
+        self.executor = executor
+        self.tool_name = tool_name
+        self.similarity_threshold = (
+            similarity_threshold
+            if similarity_threshold is not None
+            else float(os.getenv("SEARCH_PREFETCH_SIMILARITY", "0.5"))
+        )
+
+    def _arguments(self, context, content):
+        return {"query": content, "search_needed": True, "context": context}
+
+    @property
+    def tool(self):
+        return self.assistant_instance.tool_map[self.tool_name]
+
+    def start(self, context, content):
+        """
+        Dispara a busca adiantada no pool e a guarda no contexto.
+        """
+        if not content:
+            return
+
+        def search():
+            with context.timer.phase("search.prefetch"):
+                return self.tool.execute(**self._arguments(context, content))
+
+        context.search_prefetch = SearchPrefetch(content, self.executor.submit(search))
+
+    def astart(self, context, content):
+        """
+        Versão assíncrona de start: a busca vira uma task no event loop corrente.
+        """
+        if not content:
+            return
+
+        async def search():
+            with context.timer.phase("search.prefetch"):
+                return await self.tool.aexecute(**self._arguments(context, content))
+
+        task = asyncio.ensure_future(search())
+        task.add_done_callback(_retrieve_error)
+        context.search_prefetch = SearchPrefetch(content, task)
+
+    def claim(self, context, tool):
+        """
+        Retira a busca adiantada do contexto se ela servir para a tool call.
+
+        :return: SearchPrefetch a ser usado no lugar da chamada, ou None.
+        """
+        prefetch = getattr(context, "search_prefetch", None)
+        if prefetch is None or tool.function.name != self.tool_name:
+            return None
+        context.search_prefetch = None
+        try:
+            arguments = json.loads(tool.function.arguments)
+        except ValueError:
+            arguments = None
+        if isinstance(arguments, dict) and prefetch.matches(
+            arguments, self.similarity_threshold
+        ):
+            return prefetch
+        logging.info("Busca adiantada descartada: a query do modelo é outra.")
+        SEARCH_PREFETCH.inc(outcome="discarded")
+        prefetch.pending.cancel()
+        return None
+
+
+def create_search_prefetcher(assistant_instance, executor):
+    """
+    Cria o prefetcher da busca, ou None quando SEARCH_PREFETCH_ENABLED não é
+    "true" ou o assistente não tem a ferramenta de busca.
+    """
+    if os.getenv("SEARCH_PREFETCH_ENABLED", "false").lower() != "true":
+        return None
+    if "ai_search_tool" not in getattr(assistant_instance, "tool_map", {}):
+        return None
+    return SearchPrefetcher(assistant_instance, executor)
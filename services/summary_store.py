@@ -0,0 +1,194 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.cache import TTLCache
+
+SUMMARY_SYSTEM_PROMPT = (
+    "Você é um assistente que resume conversas e extrai somente o que o usuário "
+    "deseja resolver."
+)
+EMPTY_SUMMARY = "Nenhuma mensagem disponível para resumir."
+
+
+class SummaryStore:
+    """
+    Resumo incremental das conversas, por thread.
+
+    Para cada thread guarda o resumo atual e a marca d'água (ID da última mensagem
+    já resumida). Uma atualização lê, com ``messages.list(order="asc", after=...)``
+    paginado, apenas as mensagens posteriores à marca e pede ao modelo para
+    incorporar as novas mensagens do usuário ao resumo anterior. O custo de cada
+    atualização depende só do que mudou, não do tamanho da conversa.
+
+    Os resumos ficam num TTLCache em memória (``SUMMARY_STORE_SIZE`` e
+    ``SUMMARY_STORE_TTL_SECONDS``); se uma entrada expirar, o thread é resumido
+    do início na próxima atualização. O lock de cada thread fica na própria
+    entrada e é despejado com ela.
+    Attributes:
+        client (AzureOpenAI): Client used to list messages and summarize.
+        page_size (int): Page size used when listing new messages.
+    """
+
+    def __init__(self, client, max_size=None, ttl_seconds=None, page_size=100):
+        self.client = client
+        self.page_size = page_size
+        self.max_tokens = int(os.getenv("SUMMARY_MAX_TOKENS", "150"))
+        self._entries = TTLCache(
+            max_size=max_size or int(os.getenv("SUMMARY_STORE_SIZE", "1024")),
+            ttl_seconds=ttl_seconds
+            or float(os.getenv("SUMMARY_STORE_TTL_SECONDS", "86400")),
+        )
+        self._entries_guard = threading.Lock()
+
+    def get(self, thread_id):
+        """Retorna o resumo atual do thread (sem atualizá-lo), ou None."""
+        entry = self._entries.get(thread_id)
+        return entry["summary"] if entry else None
+
+    def summarize(self, thread_id, user_texts=None):
+        """
+        Atualiza o resumo do thread com as mensagens novas e o retorna.
+
+        :param user_texts: Mensagens do usuário de uma conversa guardada fora das
+            threads (engine de chat completions). A marca d'água passa a ser a
+            quantidade de textos já resumidos.
+        """
+        entry = self._entry_for(thread_id)
+        with entry["lock"]:
+            if user_texts is not None:
+                new_texts = user_texts[entry["watermark"] or 0 :]
+                watermark = len(user_texts)
+            else:
+                new_texts, watermark = self._new_user_texts(
+                    thread_id, entry["watermark"]
+                )
+            summary = entry["summary"]
+            if new_texts:
+                summary = self._merge(summary, new_texts)
+            entry["summary"] = summary
+            entry["watermark"] = watermark or entry["watermark"]
+            # renova o TTL (e reinsere a entrada, se ela foi despejada no meio)
+            self._entries.set(thread_id, entry)
+            return summary or EMPTY_SUMMARY
+
+    def forget(self, thread_id):
+        self._entries.pop(thread_id)
+
+    def _entry_for(self, thread_id):
+        with self._entries_guard:
+            entry = self._entries.get(thread_id)
+            if entry is None:
+                entry = {"summary": None, "watermark": None, "lock": threading.Lock()}
+                self._entries.set(thread_id, entry)
+            return entry
+
+    def _new_user_texts(self, thread_id, watermark):
+        """
+        Lê as mensagens posteriores à marca d'água, da mais antiga para a mais nova.
+
+        :return: Tupla (textos das mensagens do usuário, nova marca d'água).
+        """
+        params = {"thread_id": thread_id, "order": "asc", "limit": self.page_size}
+        if watermark:
+            params["after"] = watermark
+
+        texts = []
+        last_id = None
+        # a página do SDK busca as próximas páginas (after=<último id>) ao iterar
+        for message in self.client.beta.threads.messages.list(**params):
+            last_id = message.id
+            if message.role != "user":
+                continue
+            text = "".join(
+                block.text.value
+                for block in message.content
+                if block.type == "text" and hasattr(block, "text")
+            )
+            if text:
+                texts.append(text)
+        logging.debug(
+            f"Resumo do thread {thread_id}: {len(texts)} mensagens novas do usuário."
+        )
+        return texts, last_id
+
+    def _merge(self, summary, new_texts):
+        chat_payload = [{"role": "system", "content": SUMMARY_SYSTEM_PROMPT}]
+        if summary:
+            chat_payload.append(
+                {
+                    "role": "user",
+                    "content": (
+                        f"Resumo até aqui:\n{summary}\n\n"
+                        "Atualize o resumo com as novas mensagens do usuário:"
+                    ),
+                }
+            )
+        else:
+            chat_payload.append(
+                {"role": "user", "content": "Resuma a seguinte conversa:"}
+            )
+        chat_payload += [{"role": "user", "content": text} for text in new_texts]
+
+        resp = self.client.chat.completions.create(
+            model=os.getenv("AZURE_OPENAI_DEPLOYMENT_ID"),
+            messages=chat_payload,
+            max_tokens=self.max_tokens,  # resumos curtos mantêm o custo constante
+        )
+        return resp.choices[0].message.content.strip()
+
+
+class SummaryRefresher:
+    """
+    Atualiza os resumos em segundo plano depois de cada run concluído.
+
+    Assim o hand-off encontra o resumo quase em dia e só incorpora o último
+    turno. Roda numa única thread de fundo e ignora um pedido para um thread que
+    já tem uma atualização na fila (ela vai ler as mensagens novas de qualquer
+    forma). A fila é limitada (``SUMMARY_REFRESH_MAX_PENDING``): com ela cheia,
+    o pedido é descartado. Uma falha ou um descarte não perdem nada: o hand-off
+    resume o que faltar.
+    Attributes:
+        store (SummaryStore): Store whose summaries are refreshed.
+        max_pending (int): Maximum number of queued refreshes.
+    """
+
+    def __init__(self, store, executor=None, max_pending=None):
+        self.store = store
+        self.max_pending = max_pending or int(
+            os.getenv("SUMMARY_REFRESH_MAX_PENDING", "64")
+        )
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="summary-refresh"
+        )
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def schedule(self, thread_id, user_texts=None):
+        """
+        Agenda a atualização do resumo do thread.
+
+        :param user_texts: Mensagens do usuário (engine de chat completions).
+        """
+        if not thread_id:
+            return None
+        with self._lock:
+            if thread_id in self._pending:
+                return None
+            if len(self._pending) >= self.max_pending:
+                logging.warning(
+                    f"Fila de atualização de resumos cheia; thread {thread_id} ignorado."
+                )
+                return None
+            self._pending.add(thread_id)
+        texts = list(user_texts) if user_texts is not None else None
+        return self._executor.submit(self._refresh, thread_id, texts)
+
+    def _refresh(self, thread_id, user_texts):
+        with self._lock:
+            self._pending.discard(thread_id)
+        try:
+            self.store.summarize(thread_id, user_texts=user_texts)
+        except Exception as e:
+            logging.warning(f"Falha ao atualizar o resumo do thread {thread_id}: {e}")
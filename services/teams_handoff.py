@@ -0,0 +1,335 @@
+import json
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+import uuid
+
+from openai import AzureOpenAI
+
+from services.summary_store import SummaryRefresher, SummaryStore
+from utils.http_transport import get_default_transport
+
+# fila do Azure Storage consumida pelo queue trigger de function_app.py
+HANDOFF_QUEUE_NAME = "teams-handoff"
+# para onde o runtime move as mensagens que esgotaram o maxDequeueCount
+HANDOFF_POISON_QUEUE_NAME = f"{HANDOFF_QUEUE_NAME}-poison"
+
+HOST_JSON_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "host.json"
+)
+
+
+def default_max_attempts():
+    """
+    Número de tentativas de um hand-off: ``HANDOFF_MAX_ATTEMPTS`` se definido,
+    senão o ``maxDequeueCount`` das filas em host.json (padrão do runtime: 5).
+    Assim o modo inprocess e o queue trigger usam o mesmo limite.
+    """
+    configured = os.getenv("HANDOFF_MAX_ATTEMPTS")
+    if configured:
+        return int(configured)
+    try:
+        with open(HOST_JSON_PATH, "r", encoding="utf-8") as f:
+            host = json.load(f)
+        return int(host["extensions"]["queues"]["maxDequeueCount"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return 5
+
+
+def create_handoff_job(thread_id, message, user_texts=None):
+    """
+    Monta o job de hand-off. Só leva dados serializáveis: o worker busca o
+    histórico no thread e gera o resumo quando for processá-lo.
+
+    :param user_texts: Mensagens do usuário, quando a conversa não vive numa
+        thread do Assistants (engine de chat completions).
+    """
+    job = {
+        "job_id": uuid.uuid4().hex,
+        "thread_id": thread_id,
+        "message": message,
+        "enqueued_at": time.time(),
+    }
+    if user_texts is not None:
+        job["user_texts"] = list(user_texts)
+    return job
+
+
+class HandoffWorker:
+    """
+    Processa os jobs de hand-off para o Teams: atualiza o resumo incremental da
+    conversa (SummaryStore) e entrega o card no webhook.
+
+    Na fila do Storage, a falha é sempre relançada: na última tentativa o runtime
+    move a mensagem para a fila ``teams-handoff-poison``. Na fila em memória,
+    que não tem fila poison, a falha na última tentativa vira um registro de
+    dead-letter (uma linha JSON em ``HANDOFF_DEAD_LETTER_PATH``; aponte para
+    ``$HOME/data`` para sobreviver a reinícios da instância).
+    Attributes:
+        client (AzureOpenAI): Client used to read the thread and summarize it.
+        transport (HttpTransport): Shared HTTP transport used to post the webhook.
+        webhook_url (str): Teams incoming webhook (TEAMS_WEBHOOK_URL).
+        summary_store (SummaryStore): Rolling per-thread conversation summaries.
+        max_attempts (int): Attempts per job (HANDOFF_MAX_ATTEMPTS or host.json).
+        dead_letter_path (str): JSON lines file with the dead-lettered jobs.
+    """
+
+    def __init__(
+        self,
+        client=None,
+        transport=None,
+        webhook_url=None,
+        max_attempts=None,
+        dead_letter_path=None,
+        summary_store=None,
+    ):
+        self._client = client
+        self._summary_store = summary_store
+        self.transport = transport or get_default_transport()
+        self.webhook_url = webhook_url or os.getenv("TEAMS_WEBHOOK_URL")
+        self.max_attempts = max_attempts or default_max_attempts()
+        self.dead_letter_path = (
+            dead_letter_path
+            or os.getenv("HANDOFF_DEAD_LETTER_PATH")
+            or os.path.join(tempfile.gettempdir(), "teams_handoff_dead_letter.jsonl")
+        )
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        """Cliente Azure OpenAI, criado no primeiro uso quando não injetado."""
+        if self._client is None:
+            self._client = AzureOpenAI(
+                azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+                api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+                api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
+            )
+        return self._client
+
+    @property
+    def summary_store(self):
+        """Resumos incrementais por thread, criados sobre o mesmo cliente."""
+        if self._summary_store is None:
+            self._summary_store = SummaryStore(self.client)
+        return self._summary_store
+
+    def generate_summary(self, thread_id, user_texts=None):
+        """
+        Retorna o resumo do thread, incorporando só as mensagens novas.
+        """
+        return self.summary_store.summarize(thread_id, user_texts=user_texts)
+
+    def deliver(self, job):
+        """
+        Resume a conversa e envia o card para o webhook do Teams.
+
+        :raises Exception: Qualquer falha de resumo ou de entrega (para retry).
+        """
+        summary = self.generate_summary(job["thread_id"], job.get("user_texts"))
+        payload = {
+            "attachments": [
+                {
+                    "contentType": "application/vnd.microsoft.card.adaptive",
+                    "content": f"{summary}\nVocê pode ajudar?",
+                }
+            ]
+        }
+        r = self.transport.post(self.webhook_url, json=payload)
+        r.raise_for_status()
+        logging.info(f"Hand-off {job['job_id']} enviado para o Teams.")
+
+    def process(self, job, attempt, dead_letter=True):
+        """
+        Executa uma tentativa de entrega do job.
+
+        :param attempt: Número da tentativa, começando em 1.
+        :param dead_letter: False relança a falha também na última tentativa
+            (queue trigger: o runtime move a mensagem para a fila poison).
+        :raises Exception: Se a tentativa falhar e ainda houver tentativas
+            restantes, ou sempre que falhar com ``dead_letter=False``.
+        :return: True se entregue; False se foi para o dead-letter.
+        """
+        try:
+            self.deliver(job)
+            return True
+        except Exception as e:
+            if attempt < self.max_attempts:
+                logging.warning(
+                    f"Hand-off {job.get('job_id')} falhou na tentativa "
+                    f"{attempt}/{self.max_attempts}: {e}"
+                )
+                raise
+            if not dead_letter:
+                logging.error(
+                    f"Hand-off {job.get('job_id')} falhou na última tentativa "
+                    f"({attempt}); a mensagem vai para {HANDOFF_POISON_QUEUE_NAME}: {e}"
+                )
+                raise
+            self.dead_letter(job, e, attempt)
+            return False
+
+    def dead_letter(self, job, error, attempts):
+        """Registra o job que esgotou as tentativas."""
+        logging.error(
+            f"Hand-off {job.get('job_id')} enviado ao dead-letter após "
+            f"{attempts} tentativas: {error}"
+        )
+        record = {
+            **job,
+            "attempts": attempts,
+            "error": str(error),
+            "failed_at": time.time(),
+        }
+        try:
+            with self._lock, open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logging.error(f"Falha ao gravar o dead-letter do hand-off: {e}")
+
+
+class InProcessHandoffQueue:
+    """
+    Fila em memória com uma thread de worker: substituto local da fila do Azure
+    Storage. Os retries são feitos aqui, com backoff exponencial
+    (``HANDOFF_BACKOFF_SECONDS``).
+    """
+
+    mode = "inprocess"
+
+    def __init__(self, worker, backoff_seconds=None):
+        self.worker = worker
+        self.backoff_seconds = (
+            backoff_seconds
+            if backoff_seconds is not None
+            else float(os.getenv("HANDOFF_BACKOFF_SECONDS", "2"))
+        )
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def enqueue(self, job):
+        self._ensure_worker()
+        self._queue.put(job)
+
+    def join(self):
+        """Aguarda o processamento de todos os jobs enfileirados."""
+        self._queue.join()
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="teams-handoff", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self._process_with_retries(job)
+            except Exception as e:
+                logging.error(f"Erro inesperado no worker de hand-off: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _process_with_retries(self, job):
+        for attempt in range(1, self.worker.max_attempts + 1):
+            try:
+                self.worker.process(job, attempt)
+                return
+            except Exception:
+                time.sleep(self.backoff_seconds * 2 ** (attempt - 1))
+
+
+class StorageHandoffQueue:
+    """
+    Envia os jobs para a fila ``teams-handoff`` do Azure Storage; o queue trigger
+    de function_app.py os processa. Os retries ficam a cargo da plataforma
+    (``dequeue_count`` até o ``maxDequeueCount`` de host.json); depois disso a
+    mensagem vai para a fila ``teams-handoff-poison``.
+
+    Requer o pacote azure-storage-queue e a connection string em AzureWebJobsStorage.
+    """
+
+    mode = "storage"
+
+    def __init__(self, connection_string=None, queue_name=HANDOFF_QUEUE_NAME):
+        from azure.storage.queue import QueueClient, TextBase64EncodePolicy
+
+        self.queue_client = QueueClient.from_connection_string(
+            connection_string or os.getenv("AzureWebJobsStorage"),
+            queue_name,
+            # o queue trigger espera mensagens em base64
+            message_encode_policy=TextBase64EncodePolicy(),
+        )
+
+    def enqueue(self, job):
+        self.queue_client.send_message(json.dumps(job, ensure_ascii=False))
+
+
+HANDOFF_QUEUES = {
+    handoff_queue.mode: handoff_queue
+    for handoff_queue in (InProcessHandoffQueue, StorageHandoffQueue)
+}
+
+_default_queue = None
+_default_worker = None
+_default_lock = threading.Lock()
+_worker_lock = threading.Lock()
+
+
+def get_handoff_worker(client=None):
+    """
+    Retorna o worker de hand-off do processo, criando-o no primeiro uso. Ele é
+    compartilhado pela fila em memória, pelo queue trigger e pela atualização
+    dos resumos, que assim usam o mesmo SummaryStore.
+
+    :param client: Cliente Azure OpenAI usado se o worker ainda não existir.
+    """
+    global _default_worker
+    with _worker_lock:
+        if _default_worker is None:
+            _default_worker = HandoffWorker(client=client)
+        return _default_worker
+
+
+def create_summary_refresher(client=None):
+    """
+    Cria a atualização dos resumos depois de cada run concluído, ou None.
+
+    Desligada por padrão (``SUMMARY_REFRESH_ENABLED=true`` liga): custa uma
+    chamada ao modelo por turno de toda conversa, inclusive as que nunca vão
+    para o Teams, e o hand-off já roda fora da requisição e resume só o que é
+    novo. Só faz sentido com a fila inprocess: no modo storage o queue trigger
+    pode rodar em outra instância, com outro SummaryStore.
+    """
+    if os.getenv("SUMMARY_REFRESH_ENABLED", "false").lower() != "true":
+        return None
+    return SummaryRefresher(get_handoff_worker(client).summary_store)
+
+
+def create_handoff_queue(mode=None, worker=None):
+    """
+    Cria a fila configurada em ``HANDOFF_QUEUE_MODE`` (inprocess ou storage;
+    padrão: inprocess).
+    """
+    mode = mode or os.getenv("HANDOFF_QUEUE_MODE", InProcessHandoffQueue.mode)
+    queue_cls = HANDOFF_QUEUES.get(mode)
+    if queue_cls is None:
+        raise ValueError(f"HANDOFF_QUEUE_MODE inválido: '{mode}'.")
+    if queue_cls is InProcessHandoffQueue:
+        return queue_cls(worker or get_handoff_worker())
+    return queue_cls()
+
+
+def get_handoff_queue():
+    """Retorna a fila de hand-off do processo, criando-a no primeiro uso."""
+    global _default_queue
+    with _default_lock:
+        if _default_queue is None:
+            _default_queue = create_handoff_queue()
+        return _default_queue
@@ -0,0 +1,61 @@
+import logging
+import os
+
+from utils.cache import TTLCache
+
+
+class ThreadCache:
+    """
+    Threads sabidamente válidos, com o id do último run concluído em cada um.
+
+    Um follow-up só chamava ``threads.retrieve`` para confirmar que o thread
+    existe. Threads criados aqui, recuperados uma vez ou que acabaram de concluir
+    um run entram no cache (``THREAD_CACHE_SIZE`` e ``THREAD_CACHE_TTL_SECONDS``),
+    e os follow-ups seguintes pulam essa chamada. A validação passa a ser
+    preguiçosa: se uma chamada posterior responder que o thread não existe, a
+    entrada é descartada e o erro segue como antes.
+
+    O cache é do processo e compartilhado entre os serviços síncrono e assíncrono.
+    Attributes:
+        max_size (int): Maximum number of threads kept.
+        ttl_seconds (float): Time a thread stays trusted without a new run.
+    """
+
+    def __init__(self, max_size=None, ttl_seconds=None):
+        self.max_size = max_size or int(os.getenv("THREAD_CACHE_SIZE", "4096"))
+        self.ttl_seconds = ttl_seconds or float(
+            os.getenv("THREAD_CACHE_TTL_SECONDS", "3600")
+        )
+        self._entries = TTLCache(max_size=self.max_size, ttl_seconds=self.ttl_seconds)
+
+    def remember(self, thread_id, last_run_id=None):
+        """
+        Marca o thread como válido, opcionalmente com o último run concluído.
+        """
+        if thread_id:
+            self._entries.set(thread_id, {"last_run_id": last_run_id})
+
+    def lookup(self, thread_id):
+        """
+        :return: Metadados do thread (``last_run_id``) ou None se ele não for conhecido.
+        """
+        return self._entries.get(thread_id)
+
+    def forget(self, thread_id):
+        if self._entries.pop(thread_id) is not None:
+            logging.info(f"Thread {thread_id} removido do cache de threads.")
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        return self._entries.stats()
+
+
+def create_thread_cache():
+    """
+    Cria o cache de threads (THREAD_CACHE_ENABLED=false desliga).
+    """
+    if os.getenv("THREAD_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    return ThreadCache()
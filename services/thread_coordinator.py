@@ -0,0 +1,344 @@
+import asyncio
+import logging
+import os
+import threading
+
+from services.run_driver import ACTIVE_STATUSES
+
+# status de um run cancelado (o cancelamento é assíncrono no servidor)
+CANCELLED_STATUSES = ("cancelled", "cancelling")
+
+
+def _log_release_error(task):
+    if not task.cancelled() and task.exception() is not None:
+        logging.error(
+            f"Falha ao cancelar o run de um stream interrompido: {task.exception()}"
+        )
+
+
+class _Submission:
+    """Uma mensagem do usuário aguardando a vez no thread."""
+
+    __slots__ = ("context", "content", "added", "lead", "result", "error", "wake")
+
+    def __init__(self, context, content, wake):
+        self.context = context
+        self.content = content
+        self.added = False  # mensagem já gravada no thread
+        self.lead = False  # recebeu a vez de conduzir o próximo run
+        self.result = None
+        self.error = None
+        self.wake = wake
+
+
+class _ThreadSlot:
+    __slots__ = ("busy", "pending", "running")
+
+    def __init__(self):
+        self.busy = False
+        self.pending = []
+        self.running = None  # contexto do run em andamento
+
+
+class ThreadCoordinator:
+    """
+    Serializa as requisições de um mesmo thread no processo.
+
+    O thread não aceita mensagens nem runs novos enquanto há um run ativo; sem
+    coordenação, um duplo envio ou duas mensagens seguidas no mesmo threadId
+    falham e o cliente repete o trabalho. Aqui, a primeira requisição conduz o
+    run; as que chegam durante ele ficam na fila e são agrupadas no próximo run,
+    cuja resposta vale para todas. Threads diferentes seguem em paralelo.
+
+    Com ``THREAD_CANCEL_SUPERSEDED_RUNS=true``, uma mensagem nova também pede o
+    cancelamento do run em andamento (verificado pelo RunDriver entre as rodadas
+    de ferramentas); as mensagens dele entram no run seguinte.
+    Só o líder adianta a busca do RAG (``services.prefetch_search``), com as
+    mensagens do lote; quem espera na fila não consulta o índice à toa.
+    Attributes:
+        services (ChatServices): Provides add_user_message, execute_assistant and
+            prefetch_search.
+        cancel_superseded (bool): Cancel a run once a newer message is queued.
+    """
+
+    def __init__(self, services, cancel_superseded=None):
+        self.services = services
+        self.cancel_superseded = (
+            cancel_superseded
+            if cancel_superseded is not None
+            else os.getenv("THREAD_CANCEL_SUPERSEDED_RUNS", "false").lower() == "true"
+        )
+        self._slots = {}
+        self._lock = threading.Lock()
+
+    def _new_wake(self):
+        return threading.Event()
+
+    def _enqueue(self, context, content):
+        """
+        Coloca a mensagem na fila do thread.
+
+        :return: Tupla (submission, leader): ``leader`` indica que a requisição
+            deve conduzir o run agora.
+        """
+        submission = _Submission(context, content, self._new_wake())
+        with self._lock:
+            slot = self._slots.setdefault(context.thread_id, _ThreadSlot())
+            slot.pending.append(submission)
+            if not slot.busy:
+                slot.busy = True
+                return submission, True
+            if self.cancel_superseded and slot.running is not None:
+                slot.running.superseded = True
+        logging.info(f"Thread {context.thread_id} ocupado; mensagem na fila.")
+        return submission, False
+
+    def _take_batch(self, context, carry):
+        """Retira as mensagens pendentes para o próximo run do líder."""
+        with self._lock:
+            slot = self._slots[context.thread_id]
+            batch = carry + slot.pending
+            slot.pending = []
+            slot.running = context
+            # citações, rodadas e run do run substituído não valem para o novo
+            context.start_run()
+        return batch
+
+    def _finish_run(self, context, may_carry=True):
+        """
+        Encerra o run do líder.
+
+        :param may_carry: Falso quando o lote falhou e não pode ser adiado.
+        :return: True se o run foi substituído e as mensagens do lote devem ir
+            para o próximo run; senão, passa a vez ao primeiro da fila (ou libera
+            o thread) e devolve False.
+        """
+        with self._lock:
+            slot = self._slots[context.thread_id]
+            slot.running = None
+            run_status = getattr(context.run, "status", None)
+            if (
+                may_carry
+                and context.superseded
+                and slot.pending
+                and run_status in CANCELLED_STATUSES
+            ):
+                logging.info(
+                    f"Run {context.run.id} substituído por mensagens mais novas."
+                )
+                return True
+            if slot.pending:
+                successor = slot.pending[0]
+                successor.lead = True
+                successor.wake.set()
+            else:
+                del self._slots[context.thread_id]
+        return False
+
+    def _prefetch(self, context, batch):
+        """Adianta a busca com as mensagens do lote (o run responde todas)."""
+        contents = [submission.content for submission in batch]
+        if contents:
+            self.services.prefetch_search(context, "\n".join(contents))
+
+    @staticmethod
+    def _resolve(batch, own, result, error):
+        for submission in batch:
+            if submission is own:
+                continue
+            submission.result = result
+            submission.error = error
+            submission.wake.set()
+
+    @staticmethod
+    def _queue_details(details, submission):
+        details["coalesced"] = not submission.lead
+
+    def submit(self, context, content):
+        """
+        Adiciona a mensagem ao thread do contexto e executa o assistente,
+        respeitando a vez do thread.
+
+        :return: Tupla (answer, citations) do run que respondeu a mensagem.
+        """
+        submission, leader = self._enqueue(context, content)
+        if not leader:
+            with context.timer.phase("thread.queue") as details:
+                submission.wake.wait()
+                self._queue_details(details, submission)
+            if not submission.lead:
+                if submission.error is not None:
+                    raise submission.error
+                return submission.result
+        return self._lead(context, submission)
+
+    def _lead(self, context, own):
+        carry = []
+        while True:
+            batch = self._take_batch(context, carry)
+            result = error = None
+            try:
+                self._prefetch(context, batch)
+                for submission in batch:
+                    if not submission.added:
+                        self.services.add_user_message(context, submission.content)
+                        submission.added = True
+                result = self.services.execute_assistant(context)
+            except Exception as e:
+                error = e
+            if self._finish_run(context, may_carry=error is None):
+                carry = batch
+                continue
+            self._resolve(batch, own, result, error)
+            if error is not None:
+                raise error
+            return result
+
+
+class AsyncThreadCoordinator(ThreadCoordinator):
+    """
+    Versão assíncrona do ThreadCoordinator, para o AsyncChatServices. A fila
+    continua protegida por um lock de threads (as seções críticas não têm await);
+    a espera é feita com asyncio.Event. ``stream`` faz o mesmo para o endpoint
+    de streaming.
+    """
+
+    def _new_wake(self):
+        return asyncio.Event()
+
+    async def submit(self, context, content):
+        submission, leader = self._enqueue(context, content)
+        if not leader:
+            with context.timer.phase("thread.queue") as details:
+                await submission.wake.wait()
+                self._queue_details(details, submission)
+            if not submission.lead:
+                if submission.error is not None:
+                    raise submission.error
+                return submission.result
+        return await self._alead(context, submission)
+
+    async def _alead(self, context, own):
+        carry = []
+        while True:
+            batch = self._take_batch(context, carry)
+            result = error = None
+            try:
+                self._prefetch(context, batch)
+                for submission in batch:
+                    if not submission.added:
+                        await self.services.add_user_message(
+                            context, submission.content
+                        )
+                        submission.added = True
+                result = await self.services.execute_assistant(context)
+            except Exception as e:
+                error = e
+            if self._finish_run(context, may_carry=error is None):
+                carry = batch
+                continue
+            self._resolve(batch, own, result, error)
+            if error is not None:
+                raise error
+            return result
+
+    async def stream(self, context, content):
+        """
+        Versão em streaming de submit: gera os eventos (evento, dados) de
+        ``services.stream_assistant`` quando a requisição conduz o run. Se a
+        mensagem foi agrupada no run de outra requisição, a resposta dele sai
+        inteira num único ``delta``.
+
+        Um run em streaming não é adiado: o texto já enviado ao cliente não
+        pode ser retirado, então mensagens que chegam durante ele esperam o run
+        seguinte. Se o stream for interrompido com o run ainda ativo (cliente
+        desconectado), o run é cancelado (``services.cancel_run``) antes de a
+        vez passar adiante.
+        """
+        submission, leader = self._enqueue(context, content)
+        if not leader:
+            try:
+                with context.timer.phase("thread.queue") as details:
+                    await submission.wake.wait()
+                    self._queue_details(details, submission)
+            except BaseException:
+                self._abandon(context, submission)
+                raise
+            if not submission.lead:
+                if submission.error is not None:
+                    raise submission.error
+                answer, citations = submission.result
+                yield "delta", {"text": answer}
+                yield "citations", {"citations": citations}
+                return
+        batch = self._take_batch(context, [])
+        texts = []
+        result = (None, [])
+        error = None
+        release = True
+        try:
+            self._prefetch(context, batch)
+            for queued in batch:
+                if not queued.added:
+                    await self.services.add_user_message(context, queued.content)
+                    queued.added = True
+            async for event, data in self.services.stream_assistant(context):
+                if event == "delta":
+                    texts.append(data["text"])
+                elif event == "citations":
+                    result = ("".join(texts), data["citations"])
+                elif event == "error":
+                    result = (data["message"], [])
+                yield event, data
+        except BaseException as e:
+            # inclui o cancelamento do stream: os agrupados não podem ficar presos
+            error = (
+                e
+                if isinstance(e, Exception)
+                else RuntimeError("Stream interrompido antes do fim do run.")
+            )
+            if self._run_active(context):
+                # cliente desconectado no meio do run: ele continua no servidor.
+                # O cancelamento roda numa task própria (este stream já foi
+                # cancelado) e só ela passa a vez adiante.
+                release = False
+                task = asyncio.ensure_future(
+                    self._release_after_cancel(context, batch, submission, error)
+                )
+                task.add_done_callback(_log_release_error)
+            raise
+        finally:
+            if release:
+                self._finish_run(context, may_carry=False)
+                self._resolve(batch, submission, result, error)
+
+    @staticmethod
+    def _run_active(context):
+        status = getattr(context.run, "status", None)
+        return status in ACTIVE_STATUSES or status == "cancelling"
+
+    async def _release_after_cancel(self, context, batch, own, error):
+        try:
+            await self.services.cancel_run(context)
+        finally:
+            self._finish_run(context, may_carry=False)
+            self._resolve(batch, own, None, error)
+
+    def _abandon(self, context, submission):
+        """
+        Retira da fila a mensagem de um stream encerrado antes da sua vez; se a
+        vez já tinha sido passada a ela, passa adiante.
+        """
+        with self._lock:
+            slot = self._slots.get(context.thread_id)
+            if slot is None or submission not in slot.pending:
+                return  # já entrou no lote de outro run
+            slot.pending.remove(submission)
+            if not submission.lead:
+                return
+            if slot.pending:
+                successor = slot.pending[0]
+                successor.lead = True
+                successor.wake.set()
+            else:
+                del self._slots[context.thread_id]
@@ -0,0 +1,222 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from services.search_prefetch import create_search_prefetcher
+from utils.metrics import SEARCH_PREFETCH, TOOL_CALLS, TOOL_ERRORS, TOOL_LATENCY
+
+
+def serialize_tool_output(tool_output):
+    """
+    Serializa o output de uma ferramenta para o prompt: textos passam direto e
+    estruturas viram JSON compacto (mais enxuto em tokens que ``str()``).
+    """
+    if isinstance(tool_output, str):
+        return tool_output
+    return json.dumps(
+        tool_output, ensure_ascii=False, separators=(",", ":"), default=str
+    )
+
+
+class ToolDispatcher:
+    """
+    Executa as tool calls de uma rodada ``requires_action`` em paralelo.
+
+    As chamadas são disparadas num pool de threads limitado (ou via asyncio no
+    caminho assíncrono), cada uma com seu próprio timeout. Uma ferramenta que falha
+    ou estoura o tempo gera um output de erro apenas para a sua chamada, sem derrubar
+    as demais. Os outputs voltam na ordem das tool calls, prontos para um único
+    ``submit_tool_outputs``.
+
+    Com ``SEARCH_PREFETCH_ENABLED=true``, a busca do RAG pode ser adiantada com a
+    mensagem do usuário (ver SearchPrefetcher) e a primeira chamada da busca usa
+    esse resultado quando a query bate.
+    Attributes:
+        assistant_instance (Assistant): Assistant used to resolve and call tools.
+        timeout (float): Default per-tool timeout, in seconds (TOOL_TIMEOUT_SECONDS).
+        tool_timeouts (dict): Per-tool timeout overrides, keyed by function name.
+        prefetcher (SearchPrefetcher): Speculative search, or None when disabled.
+    """
+
+    def __init__(
+        self, assistant_instance, max_workers=None, timeout=None, tool_timeouts=None
+    ):
+        self.assistant_instance = assistant_instance
+        self.max_workers = max_workers or int(os.getenv("TOOL_MAX_WORKERS", "8"))
+        self.timeout = timeout or float(os.getenv("TOOL_TIMEOUT_SECONDS", "30"))
+        self.tool_timeouts = tool_timeouts or {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="tool"
+        )
+        self.prefetcher = create_search_prefetcher(assistant_instance, self._executor)
+
+    def timeout_for(self, name):
+        return self.tool_timeouts.get(name, self.timeout)
+
+    def prefetch(self, context, content):
+        """
+        Adianta a busca do RAG com a mensagem do usuário, se habilitado.
+        """
+        if self.prefetcher is not None:
+            self.prefetcher.start(context, content)
+
+    def aprefetch(self, context, content):
+        """
+        Versão assíncrona de prefetch (chamar dentro do event loop).
+        """
+        if self.prefetcher is not None:
+            self.prefetcher.astart(context, content)
+
+    def _claim(self, context, tool):
+        if self.prefetcher is None:
+            return None
+        return self.prefetcher.claim(context, tool)
+
+    def dispatch(self, context, tool_calls):
+        """
+        Executa as tool calls concorrentemente e monta os tool outputs.
+
+        :param context: ConversationContext da requisição (recebe as citações).
+        :param tool_calls: Lista de tool calls do run.
+        :return: Lista de dicionários {tool_call_id, output}, na ordem das chamadas.
+        """
+        started = time.monotonic()
+        # a busca adiantada é reivindicada aqui, antes de as chamadas irem ao pool
+        futures = [
+            self._executor.submit(
+                self._timed_call, context, tool, self._claim(context, tool)
+            )
+            for tool in tool_calls
+        ]
+
+        results = []
+        for tool, future in zip(tool_calls, futures):
+            # o timeout de cada ferramenta conta a partir do disparo da rodada
+            deadline = started + self.timeout_for(tool.function.name)
+            remaining = deadline - time.monotonic()
+            try:
+                results.append(future.result(timeout=max(remaining, 0)))
+            except FutureTimeoutError:
+                future.cancel()
+                results.append(self._timeout_return(tool))
+            except Exception as e:
+                results.append(self._error_return(tool, e))
+        return self._collect(context, tool_calls, results)
+
+    async def adispatch(self, context, tool_calls):
+        """
+        Versão assíncrona de dispatch, usando asyncio.gather.
+        """
+
+        async def timed_call(tool, prefetch):
+            with context.timer.phase(f"tool.{tool.function.name}") as details:
+                if prefetch is not None:
+                    started = time.perf_counter()
+                    try:
+                        result = await prefetch.pending
+                        return self._prefetched(details, tool, result, started)
+                    except Exception as e:
+                        self._prefetch_failed(e)
+                return await self.assistant_instance.acall_tool_by_name(
+                    context=context,
+                    name=tool.function.name,
+                    arguments=tool.function.arguments,
+                )
+
+        async def call(tool, prefetch):
+            try:
+                return await asyncio.wait_for(
+                    timed_call(tool, prefetch),
+                    timeout=self.timeout_for(tool.function.name),
+                )
+            except asyncio.TimeoutError:
+                return self._timeout_return(tool)
+            except Exception as e:
+                return self._error_return(tool, e)
+
+        results = await asyncio.gather(
+            *(call(tool, self._claim(context, tool)) for tool in tool_calls)
+        )
+        return self._collect(context, tool_calls, results)
+
+    def _timed_call(self, context, tool, prefetch=None):
+        """
+        Executa a ferramenta registrando sua duração na cascata da requisição.
+        Com uma busca adiantada que sirva, só espera o resultado dela.
+        """
+        with context.timer.phase(f"tool.{tool.function.name}") as details:
+            if prefetch is not None:
+                started = time.perf_counter()
+                try:
+                    return self._prefetched(
+                        details, tool, prefetch.pending.result(), started
+                    )
+                except Exception as e:
+                    self._prefetch_failed(e)
+            return self.assistant_instance.call_tool_by_name(
+                context=context,
+                name=tool.function.name,
+                arguments=tool.function.arguments,
+            )
+
+    @staticmethod
+    def _prefetched(details, tool, result, started):
+        # a busca adiantada não passa pelas métricas: a tool call atendida conta aqui
+        details["prefetched"] = True
+        SEARCH_PREFETCH.inc(outcome="used")
+        TOOL_CALLS.inc(tool=tool.function.name)
+        TOOL_LATENCY.observe(time.perf_counter() - started, tool=tool.function.name)
+        return result
+
+    @staticmethod
+    def _prefetch_failed(error):
+        # a busca adiantada falhou: repete a chamada normalmente
+        SEARCH_PREFETCH.inc(outcome="failed")
+        logging.warning(f"Busca adiantada falhou; buscando de novo: {error}")
+
+    def _collect(self, context, tool_calls, results):
+        """Monta os tool outputs e acumula as citações na ordem das chamadas."""
+        tool_outputs = []
+        for tool, tool_return in zip(tool_calls, results):
+            logging.info(
+                f"Function Name {tool.function.name}\nArguments:{tool.function.arguments}"
+            )
+            if tool.function.name == "ai_search_tool":
+                context.citations += tool_return.get("citations", [])
+            tool_outputs.append(
+                {
+                    "tool_call_id": tool.id,
+                    "output": serialize_tool_output(
+                        tool_return.get("tool_output", "No output")
+                    ),
+                }
+            )
+        return tool_outputs
+
+    def _timeout_return(self, tool):
+        # erros de execução já são contados no Assistant; o timeout é daqui
+        TOOL_ERRORS.inc(tool=self.assistant_instance.metric_label(tool.function.name))
+        logging.error(
+            f"Ferramenta '{tool.function.name}' excedeu o timeout de "
+            f"{self.timeout_for(tool.function.name)}s."
+        )
+        return {
+            "tool_output": {
+                "error": f"A ferramenta '{tool.function.name}' não respondeu a tempo."
+            }
+        }
+
+    def _error_return(self, tool, error):
+        logging.error(
+            f"Erro ao executar a ferramenta '{tool.function.name}': {error}",
+            exc_info=error,
+        )
+        return {
+            "tool_output": {
+                "error": f"Falha ao executar a ferramenta '{tool.function.name}': {error}"
+            }
+        }
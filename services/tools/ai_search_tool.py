@@ -1,7 +1,12 @@
 import os
+import time
 from interfaces.tool_base import AssistantToolBase
 from azure.search.documents import SearchClient
+from azure.search.documents.aio import SearchClient as AsyncSearchClient
 from azure.core.credentials import AzureKeyCredential
+from utils.context_packing import pack_context
+from utils.metrics import SEARCH_LATENCY, SEARCH_RESULTS
+from utils.search_cache import SearchResultCache
 
 
 class AISearchTool(AssistantToolBase):
@@ -13,6 +18,12 @@ class AISearchTool(AssistantToolBase):
     para ser usada como uma ferramenta auxiliar em assistentes baseados em IA.
     """
 
+    required_env = (
+        "AZURE_AI_SEARCH_API_KEY",
+        "AZURE_AI_SEARCH_ENDPOINT",
+        "AZURE_AI_SEARCH_INDEX",
+    )
+
     def __init__(self):
         """
         Inicializa a classe AISearchTool carregando variáveis de ambiente,
@@ -26,6 +37,23 @@ class AISearchTool(AssistantToolBase):
 
         self.credential = self._create_credential()
         self.client = self._create_search_client()
+        self._async_client = None  # criado sob demanda pelo caminho assíncrono
+
+        # Empacotamento do contexto: busca mais candidatos do que o necessário,
+        # remove quase-duplicatas, reordena com MMR e respeita um orçamento de tokens
+        self.candidate_multiplier = int(
+            os.getenv("AI_SEARCH_CANDIDATE_MULTIPLIER", "3")
+        )
+        self.token_budget = int(os.getenv("AI_SEARCH_TOKEN_BUDGET", "600"))
+        self.mmr_lambda = float(os.getenv("AI_SEARCH_MMR_LAMBDA", "0.7"))
+        self.dedup_threshold = float(os.getenv("AI_SEARCH_DEDUP_THRESHOLD", "0.85"))
+
+        # Cache de resultados (AI_SEARCH_CACHE_ENABLED=false desliga)
+        self.cache = (
+            SearchResultCache()
+            if os.getenv("AI_SEARCH_CACHE_ENABLED", "true").lower() == "true"
+            else None
+        )
 
         # Variáveis do dicionário get_tool_infos
         self.tool_type = "function"
@@ -72,6 +100,21 @@ class AISearchTool(AssistantToolBase):
             credential=self.credential,
         )
 
+    @property
+    def async_client(self):
+        """
+        Cliente de busca assíncrono, criado no primeiro uso para não pesar no cold start.
+
+        :return: Instância de azure.search.documents.aio.SearchClient.
+        """
+        if self._async_client is None:
+            self._async_client = AsyncSearchClient(
+                endpoint=self.endpoint,
+                index_name=self.ai_search_index,
+                credential=self.credential,
+            )
+        return self._async_client
+
     def ai_search_tool(self, **kwargs):
         """
         Realiza uma busca vetorizada no índice configurado no Azure Cognitive Search.
@@ -92,29 +135,103 @@ class AISearchTool(AssistantToolBase):
                 "citations": [],
             }
 
+        cached = self._get_cached(query, k_results)
+        if cached is not None:
+            return cached
+
         # 🔍 Realiza a busca vetorizada
-        results = self.client.search(
-            vector_queries=[
+        started = time.perf_counter()
+        results = self.client.search(**self._build_search_kwargs(query, k_results))
+
+        # 📦 Processa os resultados
+        processed_results = self._process_results(results, k_results)
+        self._observe_search(started, processed_results)
+        return self._store_cached(
+            query,
+            k_results,
+            {
+                "tool_output": processed_results,
+                "citations": self._format_citation(processed_results),
+            },
+        )
+
+    async def aai_search_tool(self, **kwargs):
+        """
+        Versão assíncrona de ai_search_tool, usando o SearchClient assíncrono.
+
+        :param kwargs: Mesmos parâmetros de ai_search_tool.
+        :return: Dicionário com tool_output e citations.
+        """
+        search_needed = kwargs.get("search_needed", True)
+        query = kwargs.get("query", "")
+        k_results = kwargs.get("k_results", 3)
+
+        if not search_needed:
+            return {
+                "tool_output": None,
+                "citations": [],
+            }
+
+        cached = self._get_cached(query, k_results)
+        if cached is not None:
+            return cached
+
+        started = time.perf_counter()
+        results = await self.async_client.search(
+            **self._build_search_kwargs(query, k_results)
+        )
+        processed_results = self._process_results(
+            [result async for result in results], k_results
+        )
+        self._observe_search(started, processed_results)
+        return self._store_cached(
+            query,
+            k_results,
+            {
+                "tool_output": processed_results,
+                "citations": self._format_citation(processed_results),
+            },
+        )
+
+    @staticmethod
+    def _observe_search(started, processed_results):
+        """Registra a latência (busca + leitura dos resultados) e a quantidade de trechos."""
+        SEARCH_LATENCY.observe(time.perf_counter() - started)
+        SEARCH_RESULTS.observe(len(processed_results))
+
+    def _get_cached(self, query, k_results):
+        """Consulta o cache de resultados, se habilitado."""
+        if self.cache is None:
+            return None
+        return self.cache.get(query, k_results, self.ai_search_index)
+
+    def _store_cached(self, query, k_results, result):
+        """Grava o resultado no cache, se habilitado, e o devolve."""
+        if self.cache is not None:
+            self.cache.set(query, k_results, self.ai_search_index, result)
+        return result
+
+    def _build_search_kwargs(self, query, k_results):
+        """
+        Monta os parâmetros da busca vetorizada, comuns aos clientes síncrono e assíncrono.
+        Pede ``k_results * AI_SEARCH_CANDIDATE_MULTIPLIER`` candidatos para o empacotamento.
+        """
+        candidates = max(k_results, k_results * self.candidate_multiplier)
+        return {
+            "vector_queries": [
                 {
                     "kind": "text",
                     "text": query,
                     "fields": self.campo_vetorial,
-                    "k": k_results,
+                    "k": candidates,
                 }
             ],
-            top=k_results,
-            select=[
+            "top": candidates,
+            "select": [
                 "chunk",
                 "title",
                 "metadata_storage_path",
             ],  # Campos que deseja retornar
-        )
-
-        # 📦 Processa os resultados
-        processed_results = self._process_results(results)
-        return {
-            "tool_output": processed_results,
-            "citations": self._format_citation(processed_results),
         }
 
     def _format_citation(self, results):
@@ -130,18 +247,18 @@ class AISearchTool(AssistantToolBase):
             )
         return citations
 
-    def _process_results(self, results):
+    def _process_results(self, results, k_results=3):
         """
-        Processa os resultados da busca e os formata como uma lista de tuplas.
+        Processa os resultados da busca e empacota os melhores no orçamento de tokens.
 
         :param results: Resultados retornados pelo cliente de busca.
-        :return: Lista de tuplas no formato (chunk, title, metadata_storage_path).
+        :param k_results: Número máximo de chunks a manter.
+        :return: Lista de dicionários (chunk, title, metadata_storage_path, score),
+            com os chunks cortados em fim de sentença.
         """
-        processed_results = [
+        candidates = [
             {
-                "chunk": result.get("chunk", "")[
-                    :300
-                ],  # Limita o chunk a 300 caracteres
+                "chunk": result.get("chunk", ""),
                 "title": result.get("title", "sem título"),
                 "metadata_storage_path": result.get(
                     "metadata_storage_path", "sem nome"
@@ -152,7 +269,13 @@ class AISearchTool(AssistantToolBase):
             }
             for result in results
         ]
-        return processed_results
+        return pack_context(
+            candidates,
+            k=k_results,
+            token_budget=self.token_budget,
+            mmr_lambda=self.mmr_lambda,
+            dedup_threshold=self.dedup_threshold,
+        )
 
     def get_tool_infos(self):
         """
@@ -185,3 +308,20 @@ class AISearchTool(AssistantToolBase):
         return self.ai_search_tool(
             query=query, k_results=k_results, search_needed=search_needed
         )
+
+    async def aexecute(self, **kwargs):
+        """
+        Executa a busca vetorizada de forma assíncrona.
+
+        :param query: Texto a ser pesquisado.
+        :param k_results: Número de resultados a serem retornados (padrão: 3).
+        :return: Resultados da busca no mesmo formato de execute.
+        """
+        query = kwargs.get("query", "")
+        k_results = kwargs.get("k_results", 3)
+        search_needed = kwargs.get("search_needed", True)
+        if not query:
+            raise ValueError("O parâmetro 'query' é obrigatório.")
+        return await self.aai_search_tool(
+            query=query, k_results=k_results, search_needed=search_needed
+        )
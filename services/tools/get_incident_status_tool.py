@@ -1,7 +1,17 @@
 import os
+import re
 import time
 import requests
 from interfaces.tool_base import AssistantToolBase
+from utils.cache import TTLCache
+from utils.http_transport import get_default_transport
+
+INCIDENT_NUMBER_RE = re.compile(r"^INC\d{8}$")
+
+# campos retornados pela Table API (sysparm_fields); u_number é sempre incluído
+DEFAULT_INCIDENT_FIELDS = (
+    "u_number,u_short_description,u_state,u_priority,u_assigned_to,sys_updated_on"
+)
 
 class GetIncidentStatusTool(AssistantToolBase):
     """
@@ -9,15 +19,34 @@ class GetIncidentStatusTool(AssistantToolBase):
     com base no número do incidente fornecido pelo usuário.
     """
 
-    def __init__(self):
+    def __init__(self, transport=None):
         """
         Inicializa a classe GetIncidentStatusTool.
+
+        :param transport: HttpTransport usado nas chamadas (padrão: o compartilhado).
         """
         # Configurações da API (pode passar por environment vars)
         self.instance_url = os.getenv("SN_INSTANCE_URL")
         self.user = os.getenv("SN_USER")
         self.pwd = os.getenv("SN_PWD")
-        
+        self.transport = transport or get_default_transport()
+        # pool e limite de concorrência próprios da instância (padrão: os do transporte)
+        if self.instance_url:
+            self.transport.configure_host(
+                self.instance_url,
+                pool_maxsize=int(os.getenv("SN_POOL_MAXSIZE", "0")) or None,
+                max_concurrency=int(os.getenv("SN_MAX_CONCURRENCY", "0")) or None,
+            )
+        self.fields = self._parse_fields(
+            os.getenv("SN_INCIDENT_FIELDS", DEFAULT_INCIDENT_FIELDS)
+        )
+        self.max_batch = int(os.getenv("SN_MAX_BATCH", "20"))
+        # cache curto: o status de um ticket muda, mas não a cada pergunta
+        self.cache = TTLCache(
+            max_size=int(os.getenv("SN_CACHE_SIZE", "256")),
+            ttl_seconds=float(os.getenv("SN_CACHE_TTL_SECONDS", "60")),
+        )
+
         # Configurações do tool_info
         self.tool_type = "function"
         self.tool_name = "get_incident_status"
@@ -32,9 +61,13 @@ class GetIncidentStatusTool(AssistantToolBase):
                     "type": "string",
                     "description": "Número do incidente.",
                     "pattern": "^INC\\d{8}$",
-                }
+                },
+                "incident_numbers": {
+                    "type": "array",
+                    "description": "Números de vários incidentes, consultados de uma vez.",
+                    "items": {"type": "string", "pattern": "^INC\\d{8}$"},
+                },
             },
-            "required": ["incident_number"],
         }
 
     def get_tool_infos(self):
@@ -50,48 +83,117 @@ class GetIncidentStatusTool(AssistantToolBase):
             },
         }
 
+    @staticmethod
+    def _parse_fields(fields):
+        fields = [field.strip() for field in fields.split(",") if field.strip()]
+        if "u_number" not in fields:
+            fields.insert(0, "u_number")
+        return fields
+
     def get_incident_status(self, incident_number: str):
         """
-        Realiza chamada HTTP à ServiceNow Table API para buscar o incidente.
+        Busca um único incidente (mesmo caminho em lote de get_incidents).
+        """
+        return self.get_incidents([incident_number])
+
+    def get_incidents(self, incident_numbers):
+        """
+        Busca vários incidentes numa única chamada à ServiceNow Table API.
+
+        Os registros já vistos há menos de ``SN_CACHE_TTL_SECONDS`` vêm do cache; os
+        demais são resolvidos com ``sysparm_query=u_numberIN...``, trazendo apenas
+        os campos de ``SN_INCIDENT_FIELDS``.
+
+        :param incident_numbers: Lista de números no formato INC########.
+        :return: Para um único número, o registro (como antes); para vários,
+            ``{"incidents": {...}, "not_found": [...]}``.
+        """
+        # remove duplicatas preservando a ordem
+        numbers = list(dict.fromkeys(n.strip().upper() for n in incident_numbers))
+        invalid = [n for n in numbers if not INCIDENT_NUMBER_RE.match(n)]
+        if invalid:
+            return {"tool_output": {
+                "error": f"Número(s) de incidente inválido(s): {', '.join(invalid)}."
+            }}
+        if len(numbers) > self.max_batch:
+            return {"tool_output": {
+                "error": f"Informe no máximo {self.max_batch} incidentes por consulta."
+            }}
+
+        records = {}
+        missing = []
+        for number in numbers:
+            record = self.cache.get(number)
+            if record is None:
+                missing.append(number)
+            else:
+                records[number] = record
+
+        if missing:
+            try:
+                fetched = self._fetch_records(missing)
+            except requests.RequestException as e:
+                return {"tool_output": {
+                    "error": f"Falha na comunicação com o ServiceNow: {e}"
+                }}
+            except ValueError as e:
+                return {"tool_output": {"error": str(e)}}
+            for number, record in fetched.items():
+                self.cache.set(number, record)
+            records.update(fetched)
+
+        not_found = [n for n in numbers if n not in records]
+        if len(numbers) == 1:
+            if not_found:
+                return {"tool_output": {
+                    "message": f"Nenhum incidente encontrado com o número {numbers[0]}."
+                }}
+            return {"tool_output": records[numbers[0]]}
+        return {"tool_output": {
+            "incidents": {n: records[n] for n in numbers if n in records},
+            "not_found": not_found,
+        }}
+
+    def _fetch_records(self, incident_numbers):
+        """
+        Realiza chamada HTTP à ServiceNow Table API para buscar os incidentes.
+
+        :raises ValueError: Se a API responder com status diferente de 200.
+        :return: Dicionário {número: registro} com os incidentes encontrados.
         """
         # Monta URL e parâmetros de consulta
         url = f"{self.instance_url}/api/now/table/u_mock_incident"
         params = {
-            "sysparm_query": f"u_number={incident_number}",
-            "sysparm_limit": 1
+            "sysparm_query": f"u_numberIN{','.join(incident_numbers)}",
+            "sysparm_fields": ",".join(self.fields),
+            "sysparm_exclude_reference_link": "true",
+            "sysparm_limit": len(incident_numbers)
         }
         headers = {
             "Content-Type": "application/json",
             "Accept": "application/json"
         }
 
-        # Faz a requisição
-        response = requests.get(url, auth=(self.user, self.pwd), headers=headers, params=params)
+        # Faz a requisição (pool compartilhado, com timeout e retry)
+        response = self.transport.get(url, auth=(self.user, self.pwd), headers=headers, params=params)
         if response.status_code != 200:
-            return {"tool_output": {
-                "error": f"Falha na requisição ({response.status_code}): {response.text}"
-            }}
+            raise ValueError(f"Falha na requisição ({response.status_code}): {response.text}")
 
         result = response.json().get("result", [])
-        if not result:
-            return {"tool_output": {
-                "message": f"Nenhum incidente encontrado com o número {incident_number}."
-            }}
-
-        # Retorna o primeiro registro encontrado
-        record = result[0]
-        return {"tool_output": record}
+        return {record.get("u_number"): record for record in result}
 
     def execute(self, **kwargs):
         """
         Entry-point para o tool: valida e dispara a busca.
         """
-        incident_number = kwargs.get("incident_number")
-        if not incident_number:
+        incident_numbers = list(kwargs.get("incident_numbers") or [])
+        if kwargs.get("incident_number"):
+            incident_numbers.insert(0, kwargs["incident_number"])
+        if not incident_numbers:
             return {
                 "tool_output": {
                     "error": "Por favor, informe o número do incidente."
                 }
             }
-        return self.get_incident_status(incident_number=incident_number)
+        return self.get_incidents(incident_numbers)
 
@@ -1,3 +1,4 @@
+import asyncio
 import time
 from interfaces.tool_base import AssistantToolBase
 
@@ -38,8 +39,22 @@ class WeatherSimulationTool(AssistantToolBase):
         """
         # Simula um atraso para imitar o tempo de resposta de uma API real
         time.sleep(2)
+        return self._simulated_weather(city)
 
-        # Dados climáticos simulados
+    async def aget_weather(self, city: str):
+        """
+        Versão assíncrona de get_weather: o atraso simulado não bloqueia o event loop.
+
+        :param city: Nome da cidade para a qual o clima será simulado.
+        :return: Dicionário contendo informações simuladas do clima.
+        """
+        await asyncio.sleep(2)
+        return self._simulated_weather(city)
+
+    def _simulated_weather(self, city: str):
+        """
+        Monta os dados climáticos simulados para a cidade.
+        """
         simulated_weather = {
             "tool_output": {
                 "city": city,
@@ -78,3 +93,15 @@ class WeatherSimulationTool(AssistantToolBase):
         if not city:
             raise ValueError("O parâmetro 'city' é obrigatório.")
         return self.get_weather(city=city)
+
+    async def aexecute(self, **kwargs):
+        """
+        Executa a simulação de forma assíncrona.
+
+        :param city: Nome da cidade para a qual o clima será simulado.
+        :return: Dados simulados do clima no formato de dicionário.
+        """
+        city = kwargs.get("city")
+        if not city:
+            raise ValueError("O parâmetro 'city' é obrigatório.")
+        return await self.aget_weather(city=city)
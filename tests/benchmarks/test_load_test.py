@@ -0,0 +1,70 @@
+import json
+
+from benchmarks.fakes import FakeAssistantsBackend, FakeTransport, LatencyModel
+from benchmarks.load_test import percentile, run_benchmark
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([7], 99) == 7
+    assert percentile([], 50) == 0.0
+
+
+def test_latency_model_parse():
+    model = LatencyModel.parse("100,400")
+
+    assert model.median_ms == 100
+    assert model.p95_ms == 400
+    assert LatencyModel.parse("0").sample_seconds() == 0.0
+
+
+def test_backend_run_lifecycle_with_tool_round():
+    backend = FakeAssistantsBackend()
+    thread = backend.create_thread()
+    backend.create_message(thread.id, "user", "Como configuro a VPN?")
+
+    run = backend.create_run(thread.id, assistant_id="asst_1")
+    assert run.status == "requires_action"
+    tool_call = run.required_action.submit_tool_outputs.tool_calls[0]
+    assert tool_call.function.name == "ai_search_tool"
+    assert json.loads(tool_call.function.arguments)["query"] == "Como configuro a VPN?"
+
+    backend.submit_tool_outputs(
+        thread.id, run.id, [{"tool_call_id": tool_call.id, "output": "ok"}]
+    )
+    run = backend.retrieve_run(thread.id, run.id)
+    assert run.status == "completed"
+    answer = backend.list_messages(thread.id, run_id=run.id)[0]
+    assert answer.role == "assistant"
+
+
+def test_fake_transport_answers_batched_table_api_query():
+    transport = FakeTransport()
+
+    response = transport.get(
+        "https://servicenow.local/api/now/table/u_mock_incident",
+        params={"sysparm_query": "u_numberININC00000001,INC00000002"},
+    )
+
+    numbers = [record["u_number"] for record in response.json()["result"]]
+    assert numbers == ["INC00000001", "INC00000002"]
+
+
+def test_run_benchmark_smoke(monkeypatch, tmp_path):
+    monkeypatch.setenv("ASSISTANT_REGISTRY_PATH", str(tmp_path / "registry.json"))
+    monkeypatch.setenv("RUN_BACKOFF_INITIAL_MS", "5")
+    no_latency = {
+        name: LatencyModel()
+        for name in ("openai", "run", "search", "servicenow", "webhook")
+    }
+
+    results = run_benchmark(
+        concurrency_levels=(1, 2), requests_per_level=4, latencies=no_latency
+    )
+
+    assert [r["concurrency"] for r in results] == [1, 2]
+    assert all(r["requests"] == 4 and r["errors"] == 0 for r in results)
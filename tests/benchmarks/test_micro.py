@@ -0,0 +1,67 @@
+import os
+
+import pytest
+
+from benchmarks import micro
+
+
+def test_compare_normalizes_by_calibration_and_flags_regressions():
+    baseline = {"calibration_ns": 100.0, "results": {"a": 1000.0, "b": 1000.0}}
+    # máquina 2x mais lenta: "a" ficou igual, "b" regrediu 50%
+    current = {
+        "calibration_ns": 200.0,
+        "results": {"a": 2000.0, "b": 3000.0, "c": 10.0},
+    }
+
+    rows = {row["name"]: row for row in micro.compare(current, baseline, 0.25)}
+
+    assert rows["a"]["ratio"] == 1.0 and not rows["a"]["regressed"]
+    assert rows["b"]["ratio"] == 1.5 and rows["b"]["regressed"]
+    assert rows["c"]["ratio"] is None and not rows["c"]["regressed"]
+
+
+def test_check_remeasures_suspected_regressions(monkeypatch):
+    baseline = {"calibration_ns": 100.0, "results": {"a": 1000.0, "b": 1000.0}}
+    runs = iter(
+        [
+            {"calibration_ns": 100.0, "results": {"a": 2000.0, "b": 1000.0}},
+            {"calibration_ns": 100.0, "results": {"a": 1050.0}},
+        ]
+    )
+    requested = []
+
+    def fake_run(names, **_):
+        requested.append(names)
+        return next(runs)
+
+    monkeypatch.setattr(micro, "run_benchmarks", fake_run)
+
+    rows = micro.check(baseline, threshold=0.25, retries=2)
+
+    assert requested == [None, ["a"]]
+    assert not any(row["regressed"] for row in rows)
+
+
+@pytest.mark.parametrize("name", sorted(micro.BENCHMARKS))
+def test_benchmark_scenarios_run(name):
+    with micro.BENCHMARKS[name]() as func:
+        func()
+
+
+def test_every_benchmark_has_a_baseline():
+    baseline = micro.load_baselines()
+
+    assert baseline is not None
+    assert set(baseline["results"]) == set(micro.BENCHMARKS)
+
+
+@pytest.mark.skipif(
+    os.getenv("MICRO_BENCH_CHECK", "false").lower() != "true",
+    reason="gate de desempenho: MICRO_BENCH_CHECK=true para rodar",
+)
+def test_no_regressions_against_baseline():
+    threshold = float(os.getenv("MICRO_BENCH_THRESHOLD", "0.25"))
+
+    rows = micro.check(micro.load_baselines(), threshold=threshold)
+
+    assert [row["name"] for row in rows if row["regressed"]] == []
@@ -0,0 +1,101 @@
+import asyncio
+import json
+
+from benchmarks.replay import (
+    group_conversations,
+    load_traces,
+    replay,
+    summarize_replay,
+)
+
+
+def trace(ts, content, thread_id, request_thread_id=None):
+    return {
+        "ts": ts,
+        "route": "chatbotapi",
+        "request": {"role": "user", "content": content, "threadId": request_thread_id},
+        "threadId": thread_id,
+        "status": 200,
+        "duration_ms": 100.0,
+    }
+
+
+class RecordingTarget:
+    """Alvo fake: cria um thread novo por conversa e guarda os bodies enviados."""
+
+    def __init__(self, fail_on=None):
+        self.bodies = []
+        self.fail_on = fail_on
+        self.created = 0
+
+    async def send(self, body):
+        self.bodies.append(body)
+        if body["content"] == self.fail_on:
+            return 500, None
+        if "threadId" not in body:
+            self.created += 1
+            return 200, {"threadId": f"replay_{self.created}"}
+        return 200, {"threadId": body["threadId"]}
+
+
+def test_load_traces_orders_and_filters_by_route(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    lines = [
+        trace(2.0, "b", "t1", "t1"),
+        trace(1.0, "a", "t1"),
+        {**trace(1.5, "x", "t2"), "route": "chatbotapi_async"},
+    ]
+    path.write_text("\n".join(json.dumps(line) for line in lines) + "\n")
+
+    traces = load_traces(str(path), route="chatbotapi")
+
+    assert [t["request"]["content"] for t in traces] == ["a", "b"]
+
+
+def test_replay_chains_follow_ups_to_the_new_thread():
+    traces = [
+        trace(0.0, "primeira A", "tA"),
+        trace(0.1, "primeira B", "tB"),
+        trace(0.2, "follow-up A", "tA", "tA"),
+        trace(0.3, "follow-up B", "tB", "tB"),
+    ]
+    conversations = group_conversations(traces)
+    target = RecordingTarget()
+
+    results = asyncio.run(replay(conversations, target, speedup=0, concurrency=2))
+
+    bodies = {body["content"]: body for body in target.bodies}
+    assert "threadId" not in bodies["primeira A"]
+    assert bodies["follow-up A"]["threadId"] == "replay_1"
+    assert bodies["follow-up B"]["threadId"] == "replay_2"
+    assert sorted(r["turn"] for r in results) == [
+        "first",
+        "first",
+        "follow_up",
+        "follow_up",
+    ]
+
+
+def test_conversation_recorded_mid_way_starts_a_new_thread():
+    conversations = group_conversations([trace(0.0, "continuação", "real", "real")])
+    target = RecordingTarget()
+
+    asyncio.run(replay(conversations, target, speedup=0))
+
+    assert target.bodies == [{"role": "user", "content": "continuação"}]
+
+
+def test_failed_turn_skips_the_rest_of_the_conversation():
+    conversations = group_conversations(
+        [
+            trace(0.0, "falha", "tA"),
+            trace(0.1, "follow-up", "tA", "tA"),
+        ]
+    )
+
+    results = asyncio.run(replay(conversations, RecordingTarget(fail_on="falha")))
+    rows = {row["group"]: row for row in summarize_replay(results)}
+
+    assert rows["total"]["errors"] == 1
+    assert rows["total"]["skipped"] == 1
+    assert rows["follow_up"]["requests"] == 0
@@ -0,0 +1,50 @@
+from unittest.mock import MagicMock
+from services.answer_cache import AnswerCache
+from services.conversation_context import ConversationContext
+from utils.cache_generation import CacheGeneration
+
+
+def _context(status="completed", tools=("ai_search_tool",), answered=True):
+    context = ConversationContext(MagicMock(), thread_id="thread_1")
+    context.answered = answered
+    context.run = MagicMock(status=status)
+    context.rounds = [{"round": 1, "tools": list(tools)}]
+    return context
+
+
+def test_lookup_is_scoped_by_fingerprint():
+    cache = AnswerCache("fp1", max_size=8, ttl_seconds=60)
+    cache.store("Qual o horário?", "Das 8h às 18h.", [{"id": 1}])
+
+    assert cache.lookup("qual o horario") == ("Das 8h às 18h.", [{"id": 1}])
+    other = AnswerCache("fp2", max_size=8, ttl_seconds=60)
+    other._cache = cache._cache
+    assert other.lookup("qual o horario") is None
+
+
+def test_only_completed_runs_with_cacheable_tools_are_cached():
+    cache = AnswerCache("fp", max_size=8, ttl_seconds=60)
+
+    assert cache.is_cacheable(_context())
+    assert not cache.is_cacheable(_context(status="cancelled"))
+    assert not cache.is_cacheable(_context(tools=("transfer_to_teams_agent",)))
+    assert not cache.is_cacheable(_context(answered=False))
+
+
+def test_invalidate_drops_all_answers():
+    cache = AnswerCache("fp", max_size=8, ttl_seconds=60)
+    cache.store("pergunta", "resposta", [])
+
+    cache.invalidate()
+
+    assert cache.lookup("pergunta") is None
+
+
+def test_lookup_is_scoped_by_cache_generation(tmp_path):
+    generation = CacheGeneration(path=str(tmp_path / "generation"), check_seconds=0)
+    cache = AnswerCache("fp", max_size=8, ttl_seconds=60, generation=generation)
+    cache.store("Qual o horário?", "Das 8h às 18h.", [])
+
+    generation.bump()
+
+    assert cache.lookup("Qual o horário?") is None
@@ -1,10 +1,12 @@
 import pytest
 from unittest.mock import MagicMock, patch
+from openai import NotFoundError
 from services.assistant import Assistant
 
 
 @pytest.fixture
-def mock_environment_variables(monkeypatch):
+def mock_environment_variables(monkeypatch, tmp_path):
+    monkeypatch.setenv("ASSISTANT_REGISTRY_PATH", str(tmp_path / "registry.json"))
     monkeypatch.setenv("AZURE_OPENAI_ENDPOINT", "https://example.com")
     monkeypatch.setenv("AZURE_OPENAI_API_KEY", "test_api_key")
     monkeypatch.setenv("AZURE_OPENAI_API_VERSION", "2023-03-15-preview")
@@ -62,20 +64,67 @@ def test_map_tools(assistant_instance):
 def test_call_tool_by_name_success(assistant_instance):
     mock_tool = assistant_instance.tool_map["mock_tool_function"]
     mock_tool.execute.return_value = "success"
+    context = MagicMock()
     result = assistant_instance.call_tool_by_name(
-        "mock_tool_function", '{"arg1": "value1"}'
+        context, "mock_tool_function", '{"arg1": "value1"}'
     )
-    mock_tool.execute.assert_called_once_with(arg1="value1")
+    mock_tool.execute.assert_called_once_with(arg1="value1", context=context)
     assert result == "success"
 
 
 def test_call_tool_by_name_invalid_arguments(assistant_instance):
     with pytest.raises(ValueError, match="Erro ao processar os argumentos"):
-        assistant_instance.call_tool_by_name("mock_tool_function", "invalid_json")
+        assistant_instance.call_tool_by_name(
+            MagicMock(), "mock_tool_function", "invalid_json"
+        )
 
 
 def test_call_tool_by_name_tool_not_found(assistant_instance):
     with pytest.raises(
         ValueError, match="Ferramenta 'non_existent_tool' não encontrada."
     ):
-        assistant_instance.call_tool_by_name("non_existent_tool", '{"arg1": "value1"}')
+        assistant_instance.call_tool_by_name(
+            MagicMock(), "non_existent_tool", '{"arg1": "value1"}'
+        )
+
+
+def test_call_tool_by_name_records_metrics(assistant_instance):
+    from utils.metrics import TOOL_CALLS, TOOL_ERRORS, TOOL_LATENCY
+
+    calls = TOOL_CALLS.value(tool="mock_tool_function")
+    latency = TOOL_LATENCY.count(tool="mock_tool_function")
+    unknown_errors = TOOL_ERRORS.value(tool="unknown")
+
+    assistant_instance.call_tool_by_name(MagicMock(), "mock_tool_function", "{}")
+    with pytest.raises(ValueError):
+        assistant_instance.call_tool_by_name(MagicMock(), "hallucinated_tool", "{}")
+
+    assert TOOL_CALLS.value(tool="mock_tool_function") == calls + 1
+    assert TOOL_LATENCY.count(tool="mock_tool_function") == latency + 1
+    assert TOOL_ERRORS.value(tool="unknown") == unknown_errors + 1
+
+
+def _not_found():
+    return NotFoundError("not found", response=MagicMock(status_code=404), body=None)
+
+
+def test_refresh_assistant_resolves_again_when_deleted(assistant_instance):
+    client = assistant_instance.client
+    stale_id = assistant_instance.assistant.id
+    client.beta.assistants.retrieve.side_effect = _not_found()
+    client.beta.assistants.create.return_value = MagicMock(id="asst_new")
+
+    assert assistant_instance.refresh_assistant(stale_id) is True
+    assert assistant_instance.assistant.id == "asst_new"
+
+    # outra requisição com o ID antigo não resolve de novo
+    client.beta.assistants.create.reset_mock()
+    assert assistant_instance.refresh_assistant(stale_id) is True
+    client.beta.assistants.create.assert_not_called()
+
+
+def test_refresh_assistant_keeps_existing_assistant(assistant_instance):
+    current = assistant_instance.assistant
+
+    assert assistant_instance.refresh_assistant(current.id) is False
+    assert assistant_instance.assistant is current
@@ -0,0 +1,150 @@
+import json
+import pytest
+from unittest.mock import MagicMock
+from services.assistant_registry import AssistantRegistry
+
+TOOLS = [{"type": "function", "function": {"name": "mock_tool"}}]
+
+
+@pytest.fixture
+def mock_client():
+    client = MagicMock()
+    client.beta.assistants.list.return_value = []
+    client.beta.assistants.create.return_value = MagicMock(id="asst_new")
+    return client
+
+
+@pytest.fixture
+def registry(mock_client, tmp_path):
+    return AssistantRegistry(
+        mock_client,
+        cache_path=str(tmp_path / "registry.json"),
+        endpoint="https://aoai-a.openai.azure.com/",
+    )
+
+
+def _resolve(registry, tools=TOOLS):
+    return registry.resolve(
+        model="gpt", instructions="prompt", tools=tools, temperature=1, top_p=1
+    )
+
+
+def _assistant(assistant_id, name, metadata):
+    # "name" é argumento do próprio MagicMock; precisa ser atribuído depois
+    assistant = MagicMock(id=assistant_id, metadata=metadata)
+    assistant.name = name
+    return assistant
+
+
+def test_resolve_creates_assistant_and_caches_id(registry, mock_client):
+    ref = _resolve(registry)
+
+    assert ref.id == "asst_new"
+    mock_client.beta.assistants.create.assert_called_once()
+    metadata = mock_client.beta.assistants.create.call_args.kwargs["metadata"]
+    assert metadata[AssistantRegistry.CONFIG_KEY] == ref.fingerprint
+    with open(registry.cache_path) as file:
+        assert json.load(file) == {registry.cache_key(ref.fingerprint): "asst_new"}
+
+
+def test_resolve_uses_local_cache_without_network(registry, mock_client):
+    _resolve(registry)
+    mock_client.reset_mock()
+
+    ref = _resolve(registry)
+
+    assert ref.id == "asst_new"
+    mock_client.beta.assistants.list.assert_not_called()
+    mock_client.beta.assistants.create.assert_not_called()
+
+
+def test_resolve_reuses_existing_assistant(registry, mock_client):
+    config_fp, base_fp = registry.fingerprints("gpt", "prompt", TOOLS, 1, 1)
+    existing = _assistant(
+        "asst_existing",
+        registry.name,
+        {"config_fingerprint": config_fp, "base_fingerprint": base_fp},
+    )
+    mock_client.beta.assistants.list.return_value = [existing]
+
+    ref = _resolve(registry)
+
+    assert ref.id == "asst_existing"
+    mock_client.beta.assistants.create.assert_not_called()
+    mock_client.beta.assistants.update.assert_not_called()
+
+
+def test_resolve_updates_tools_when_only_tools_changed(registry, mock_client):
+    old_config_fp, base_fp = registry.fingerprints("gpt", "prompt", [], 1, 1)
+    existing = _assistant(
+        "asst_old",
+        registry.name,
+        {"config_fingerprint": old_config_fp, "base_fingerprint": base_fp},
+    )
+    mock_client.beta.assistants.list.return_value = [existing]
+
+    ref = _resolve(registry)
+
+    assert ref.id == "asst_old"
+    mock_client.beta.assistants.update.assert_called_once_with(
+        "asst_old",
+        tools=TOOLS,
+        metadata={"config_fingerprint": ref.fingerprint, "base_fingerprint": base_fp},
+    )
+    mock_client.beta.assistants.create.assert_not_called()
+
+
+def test_invalidate_forces_new_lookup(registry, mock_client):
+    ref = _resolve(registry)
+    registry.invalidate(ref.fingerprint)
+    mock_client.reset_mock()
+    mock_client.beta.assistants.list.return_value = []
+    mock_client.beta.assistants.create.return_value = MagicMock(id="asst_other")
+
+    assert _resolve(registry).id == "asst_other"
+    mock_client.beta.assistants.list.assert_called_once()
+
+
+def test_cache_is_scoped_by_endpoint(registry, mock_client):
+    _resolve(registry)
+    other = AssistantRegistry(
+        mock_client,
+        cache_path=registry.cache_path,
+        endpoint="https://aoai-b.openai.azure.com/",
+    )
+    mock_client.beta.assistants.create.return_value = MagicMock(id="asst_b")
+
+    assert _resolve(other).id == "asst_b"
+    assert _resolve(registry).id == "asst_new"
+
+
+def test_assistants_with_other_name_are_never_reused_or_updated(mock_client, tmp_path):
+    staging = AssistantRegistry(
+        mock_client, cache_path=str(tmp_path / "registry.json"), name="rag-staging"
+    )
+    config_fp, base_fp = staging.fingerprints("gpt", "prompt", TOOLS, 1, 1)
+    mock_client.beta.assistants.list.return_value = [
+        _assistant(
+            "asst_prod",
+            "rag-prod",
+            {"config_fingerprint": config_fp, "base_fingerprint": base_fp},
+        )
+    ]
+
+    ref = _resolve(staging)
+
+    assert ref.id == "asst_new"
+    mock_client.beta.assistants.update.assert_not_called()
+    assert mock_client.beta.assistants.create.call_args.kwargs["name"] == "rag-staging"
+
+
+def test_fingerprints_depend_on_the_name(mock_client, tmp_path):
+    path = str(tmp_path / "registry.json")
+    staging = AssistantRegistry(mock_client, cache_path=path, name="rag-staging")
+    prod = AssistantRegistry(mock_client, cache_path=path, name="rag-prod")
+
+    staging_fps = staging.fingerprints("gpt", "prompt", TOOLS, 1, 1)
+    prod_fps = prod.fingerprints("gpt", "prompt", TOOLS, 1, 1)
+
+    assert staging_fps[0] != prod_fps[0]
+    assert staging_fps[1] != prod_fps[1]
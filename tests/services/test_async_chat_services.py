@@ -0,0 +1,239 @@
+import asyncio
+import pytest
+from unittest.mock import ANY, AsyncMock, MagicMock
+from services.async_chat_services import AsyncChatServices
+
+
+class AsyncIter:
+    def __init__(self, items):
+        self.items = items
+
+    def __aiter__(self):
+        self._iter = iter(self.items)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+@pytest.fixture
+def async_chat_services():
+    assistant_instance = MagicMock()
+    assistant_instance.async_client = MagicMock()
+    assistant_instance.acall_tool_by_name = AsyncMock()
+    async_client = assistant_instance.async_client
+    async_client.beta.threads.create = AsyncMock(return_value=MagicMock(id="thread_1"))
+    async_client.beta.threads.messages.create = AsyncMock()
+    async_client.beta.threads.runs.create = AsyncMock()
+    async_client.beta.threads.runs.retrieve = AsyncMock()
+    async_client.beta.threads.runs.submit_tool_outputs = AsyncMock()
+    mock_message = MagicMock(role="assistant")
+    mock_message.content = [
+        MagicMock(type="text", text=MagicMock(value="Async answer"))
+    ]
+    async_client.beta.threads.messages.list = MagicMock(
+        return_value=AsyncIter([mock_message])
+    )
+    return AsyncChatServices(assistant_instance)
+
+
+def test_create_new_thread(async_chat_services):
+    context = async_chat_services.new_context()
+
+    thread_id = asyncio.run(async_chat_services.create_new_thread(context))
+
+    assert thread_id == "thread_1"
+    assert context.thread_id == "thread_1"
+
+
+def test_retrieve_old_thread_uses_thread_cache(async_chat_services):
+    threads = async_chat_services.async_client.beta.threads
+    threads.retrieve = AsyncMock()
+    asyncio.run(
+        async_chat_services.create_new_thread(async_chat_services.new_context())
+    )
+
+    known = async_chat_services.new_context()
+    asyncio.run(async_chat_services.retrieve_old_thread(known, "thread_1"))
+    unknown = async_chat_services.new_context()
+    asyncio.run(async_chat_services.retrieve_old_thread(unknown, "thread_2"))
+
+    assert known.thread_id == "thread_1"
+    threads.retrieve.assert_awaited_once_with(thread_id="thread_2")
+    assert async_chat_services.thread_cache.lookup("thread_2") is not None
+
+
+def test_execute_assistant_completed(async_chat_services):
+    context = async_chat_services.new_context(thread_id="thread_1")
+    runs = async_chat_services.async_client.beta.threads.runs
+    runs.create.return_value = MagicMock(status="queued", id="run_1")
+    runs.retrieve.return_value = MagicMock(status="completed", id="run_1")
+
+    answer, citations = asyncio.run(async_chat_services.execute_assistant(context))
+
+    assert answer == "Async answer"
+    assert citations == []
+    runs.submit_tool_outputs.assert_not_called()
+    # cada consulta ao run é contada (não um poll() do SDK com várias consultas)
+    assert context.poll_count == runs.retrieve.await_count == 1
+
+
+def test_execute_assistant_requires_action(async_chat_services):
+    context = async_chat_services.new_context(thread_id="thread_1")
+    runs = async_chat_services.async_client.beta.threads.runs
+    mock_tool_call = MagicMock(id="call_1")
+    mock_tool_call.function.name = "ai_search_tool"
+    mock_tool_call.function.arguments = '{"query": "test"}'
+    mock_run = MagicMock(status="requires_action", id="run_1")
+    mock_run.required_action.submit_tool_outputs.tool_calls = [mock_tool_call]
+    runs.create.return_value = mock_run
+    runs.submit_tool_outputs.return_value = MagicMock(status="completed", id="run_1")
+    async_chat_services.assistant_instance.acall_tool_by_name.return_value = {
+        "tool_output": "Tool output",
+        "citations": [{"id": 1, "filename": "doc1", "url": "http://example.com/doc1"}],
+    }
+
+    answer, citations = asyncio.run(async_chat_services.execute_assistant(context))
+
+    assert answer == "Async answer"
+    assert citations == [
+        {"id": 1, "filename": "doc1", "url": "http://example.com/doc1"}
+    ]
+    assert [r["tools"] for r in context.rounds] == [["ai_search_tool"]]
+    runs.submit_tool_outputs.assert_awaited_once_with(
+        thread_id="thread_1",
+        run_id="run_1",
+        tool_outputs=[{"tool_call_id": "call_1", "output": "Tool output"}],
+    )
+
+
+class FakeStreamManager:
+    def __init__(self, events):
+        self.events = events
+
+    async def __aenter__(self):
+        return AsyncIter(self.events)
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def _event(name, data):
+    event = MagicMock()
+    event.event = name
+    event.data = data
+    return event
+
+
+def _text_delta(text):
+    delta = MagicMock()
+    delta.delta.content = [MagicMock(type="text", text=MagicMock(value=text))]
+    return _event("thread.message.delta", delta)
+
+
+def _collect(async_gen):
+    async def consume():
+        return [item async for item in async_gen]
+
+    return asyncio.run(consume())
+
+
+def test_stream_assistant_handles_tool_round(async_chat_services):
+    context = async_chat_services.new_context(thread_id="thread_1")
+    runs = async_chat_services.async_client.beta.threads.runs
+    mock_tool_call = MagicMock(id="call_1")
+    mock_tool_call.function.name = "ai_search_tool"
+    mock_tool_call.function.arguments = '{"query": "test"}'
+    requires_action_run = MagicMock(status="requires_action", id="run_1")
+    requires_action_run.required_action.submit_tool_outputs.tool_calls = [
+        mock_tool_call
+    ]
+    runs.stream = MagicMock(
+        return_value=FakeStreamManager(
+            [_event("thread.run.requires_action", requires_action_run)]
+        )
+    )
+    runs.submit_tool_outputs_stream = MagicMock(
+        return_value=FakeStreamManager(
+            [
+                _text_delta("Olá"),
+                _text_delta(" mundo"),
+                _event("thread.run.completed", MagicMock(status="completed")),
+            ]
+        )
+    )
+    async_chat_services.assistant_instance.acall_tool_by_name.return_value = {
+        "tool_output": "Tool output",
+        "citations": [{"id": 1}],
+    }
+
+    events = _collect(async_chat_services.stream_assistant(context))
+
+    assert events == [
+        ("delta", {"text": "Olá"}),
+        ("delta", {"text": " mundo"}),
+        ("citations", {"citations": [{"id": 1}]}),
+    ]
+    runs.submit_tool_outputs_stream.assert_called_once_with(
+        thread_id="thread_1",
+        run_id="run_1",
+        tool_outputs=[{"tool_call_id": "call_1", "output": "Tool output"}],
+        timeout=ANY,
+    )
+    assert [entry["round"] for entry in context.rounds] == [1]
+
+
+def test_stream_assistant_reports_failed_run(async_chat_services):
+    context = async_chat_services.new_context(thread_id="thread_1")
+    runs = async_chat_services.async_client.beta.threads.runs
+    runs.stream = MagicMock(
+        return_value=FakeStreamManager(
+            [_event("thread.run.failed", MagicMock(status="failed"))]
+        )
+    )
+
+    events = _collect(async_chat_services.stream_assistant(context))
+
+    assert [event for event, _ in events] == ["error"]
+
+
+def test_stream_assistant_cancels_when_round_limit_reached(
+    async_chat_services, monkeypatch
+):
+    context = async_chat_services.new_context(thread_id="thread_1")
+    runs = async_chat_services.async_client.beta.threads.runs
+    mock_tool_call = MagicMock(id="call_1")
+    mock_tool_call.function.name = "get_weather"
+    mock_tool_call.function.arguments = "{}"
+    requires_action_run = MagicMock(status="requires_action", id="run_1")
+    requires_action_run.required_action.submit_tool_outputs.tool_calls = [
+        mock_tool_call
+    ]
+    # o modelo pede ferramentas a cada rodada, indefinidamente
+    runs.stream = MagicMock(
+        return_value=FakeStreamManager(
+            [_event("thread.run.requires_action", requires_action_run)]
+        )
+    )
+    runs.submit_tool_outputs_stream = MagicMock(
+        side_effect=lambda **_: FakeStreamManager(
+            [_event("thread.run.requires_action", requires_action_run)]
+        )
+    )
+    runs.cancel = AsyncMock(return_value=MagicMock(status="cancelling", id="run_1"))
+    runs.retrieve = AsyncMock(return_value=MagicMock(status="cancelled", id="run_1"))
+    async_chat_services.assistant_instance.acall_tool_by_name.return_value = {
+        "tool_output": "ok"
+    }
+    async_chat_services.run_driver.max_rounds = 2
+    monkeypatch.setattr("services.run_driver.CANCEL_POLL_SECONDS", 0)
+
+    events = _collect(async_chat_services.stream_assistant(context))
+
+    assert [event for event, _ in events] == ["error"]
+    assert runs.submit_tool_outputs_stream.call_count == 2
+    runs.cancel.assert_awaited_once_with(thread_id="thread_1", run_id="run_1")
+    assert context.run.status == "cancelled"
@@ -1,61 +1,68 @@
+import threading
+import time
 import unittest
 import pytest
 from unittest.mock import MagicMock, patch
-from services.chat_services import ChatServices
+from openai import NotFoundError
+from services.chat_services import ERROR_ANSWER, ChatServices
 
 
 @pytest.fixture
 def chat_services():
-    with patch("services.chat_services.Assistant") as MockAssistant, patch(
-        "services.chat_services.AISearchTool"
-    ) as MockAISearchTool:
+    with patch("services.chat_services.Assistant") as MockAssistant:
         mock_assistant_instance = MockAssistant.return_value
         mock_client = MagicMock()
         mock_assistant_instance.client = mock_client
         mock_assistant_instance.assistant = MagicMock()
-        mock_search_tool = MockAISearchTool.return_value
 
         chat_service = ChatServices()
         chat_service.assistant_instance = mock_assistant_instance
         chat_service.client = mock_client
-        chat_service.search_tool = mock_search_tool
         yield chat_service
 
 
+@pytest.fixture
+def context(chat_services):
+    return chat_services.new_context(thread_id="test_thread_id")
+
+
 def test_create_new_thread(chat_services):
     mock_thread = MagicMock()
     mock_thread.id = "test_thread_id"
     chat_services.client.beta.threads.create.return_value = mock_thread
 
-    thread_id = chat_services.create_new_thread()
+    context = chat_services.new_context()
+
+    thread_id = chat_services.create_new_thread(context)
 
     assert thread_id == "test_thread_id"
+    assert context.thread_id == "test_thread_id"
     chat_services.client.beta.threads.create.assert_called_once()
 
 
 def test_retrieve_old_thread(chat_services):
     thread_id = "existing_thread_id"
+    context = chat_services.new_context()
 
-    chat_services.retrieve_old_thread(thread_id)
+    chat_services.retrieve_old_thread(context, thread_id)
 
     chat_services.client.beta.threads.retrieve.assert_called_once_with(
         thread_id=thread_id
     )
+    assert context.thread_id == thread_id
 
 
-def test_add_user_message(chat_services):
-    chat_services.thread_id = "test_thread_id"
+def test_add_user_message(chat_services, context):
     user_message = "Hello, this is a test message."
 
-    chat_services.add_user_message(user_message)
+    chat_services.add_user_message(context, user_message)
 
     chat_services.client.beta.threads.messages.create.assert_called_once_with(
         thread_id="test_thread_id", role="user", content=user_message
     )
 
 
-def test_execute_assistant_completed(chat_services):
-    chat_services.thread_id = "test_thread_id"
+def test_execute_assistant_completed(chat_services, context):
     mock_run = MagicMock()
     mock_run.status = "completed"
     chat_services.client.beta.threads.runs.create.return_value = mock_run
@@ -67,7 +74,7 @@ def test_execute_assistant_completed(chat_services):
     ]
     chat_services.client.beta.threads.messages.list.return_value = [mock_message]
 
-    answer, citations = chat_services.execute_assistant()
+    answer, citations = chat_services.execute_assistant(context)
 
     assert answer == "Test response"
     assert citations == []
@@ -80,8 +87,7 @@ def test_execute_assistant_completed(chat_services):
     chat_services.client.beta.threads.messages.list.assert_called()
 
 
-def test_execute_assistant_requires_action(chat_services):
-    chat_services.thread_id = "test_thread_id"
+def test_execute_assistant_requires_action(chat_services, context):
     mock_run = MagicMock()
     mock_run.status = "requires_action"
     mock_tool_call = MagicMock()
@@ -90,17 +96,237 @@ def test_execute_assistant_requires_action(chat_services):
     mock_run.required_action.submit_tool_outputs.tool_calls = [mock_tool_call]
     chat_services.client.beta.threads.runs.create.return_value = mock_run
     chat_services.client.beta.threads.runs.retrieve.return_value = mock_run
+    chat_services.client.beta.threads.runs.submit_tool_outputs.return_value = MagicMock(
+        status="completed"
+    )
     chat_services.assistant_instance.call_tool_by_name.return_value = {
         "tool_output": "Tool output",
         "citations": [{"id": 1, "filename": "doc1", "url": "http://example.com/doc1"}],
     }
 
-    answer, citations = chat_services.execute_assistant()
+    answer, citations = chat_services.execute_assistant(context)
 
     assert citations == [
         {"id": 1, "filename": "doc1", "url": "http://example.com/doc1"}
     ]
     chat_services.assistant_instance.call_tool_by_name.assert_called_once_with(
-        name="ai_search_tool", arguments={"query": "test"}
+        context=context, name="ai_search_tool", arguments={"query": "test"}
+    )
+    assert [p["name"] for p in context.timer.as_dict()["phases"]] == [
+        "run.create",
+        "tools.round1",
+        "tool.ai_search_tool",
+        "run.submit.round1",
+        "messages.list",
+    ]
+    chat_services.client.beta.threads.runs.submit_tool_outputs.assert_called()
+
+
+def test_citations_are_scoped_to_each_context(chat_services):
+    mock_run = MagicMock()
+    mock_run.status = "requires_action"
+    mock_tool_call = MagicMock()
+    mock_tool_call.function.name = "ai_search_tool"
+    mock_run.required_action.submit_tool_outputs.tool_calls = [mock_tool_call]
+    chat_services.client.beta.threads.runs.create.return_value = mock_run
+    chat_services.client.beta.threads.runs.submit_tool_outputs.return_value = MagicMock(
+        status="completed"
     )
-    chat_services.client.beta.threads.runs.submit_tool_outputs_and_poll.assert_called()
+    chat_services.assistant_instance.call_tool_by_name.return_value = {
+        "tool_output": "Tool output",
+        "citations": [{"id": 1}],
+    }
+
+    first = chat_services.new_context(thread_id="thread_a")
+    second = chat_services.new_context(thread_id="thread_b")
+    _, first_citations = chat_services.execute_assistant(first)
+    _, second_citations = chat_services.execute_assistant(second)
+
+    assert first_citations == [{"id": 1}]
+    assert second_citations == [{"id": 1}]
+    assert first.citations is not second.citations
+
+
+def test_answer_from_cache_seeds_new_thread(chat_services):
+    chat_services.client.beta.threads.create.return_value = MagicMock(id="seeded")
+    chat_services.answer_cache.store("Qual o horário?", "Das 8h.", [{"id": 1}])
+    context = chat_services.new_context()
+
+    answer, citations = chat_services.answer_from_cache(context, "qual o horario?")
+
+    assert answer == "Das 8h."
+    assert citations == [{"id": 1}]
+    assert context.thread_id == "seeded"
+    chat_services.client.beta.threads.create.assert_called_once_with(
+        messages=[
+            {"role": "user", "content": "qual o horario?"},
+            {"role": "assistant", "content": "Das 8h."},
+        ]
+    )
+    chat_services.client.beta.threads.runs.create.assert_not_called()
+
+
+def test_remember_answer_skips_non_cacheable_runs(chat_services, context):
+    context.run = MagicMock(status="completed")
+    context.rounds = [{"round": 1, "tools": ["get_incident_status"]}]
+
+    chat_services.remember_answer(context, "status do INC00000001", "Aberto")
+
+    assert chat_services.answer_cache.lookup("status do INC00000001") is None
+
+
+def test_error_after_completed_run_is_not_cached(chat_services, context):
+    mock_run = MagicMock(id="run_1", status="completed")
+    chat_services.client.beta.threads.runs.create.return_value = mock_run
+    chat_services.client.beta.threads.messages.list.side_effect = RuntimeError("503")
+
+    answer, _ = chat_services.execute_assistant(context)
+    chat_services.remember_answer(context, "qual o horario", answer)
+
+    assert answer == ERROR_ANSWER
+    assert chat_services.answer_cache.lookup("qual o horario") is None
+
+
+def test_error_answer_is_never_cached(chat_services, context):
+    context.run = MagicMock(status="completed")
+    context.answered = True
+
+    chat_services.remember_answer(context, "qual o horario", ERROR_ANSWER)
+    chat_services.remember_answer(context, "qual o horario", "")
+
+    assert chat_services.answer_cache.lookup("qual o horario") is None
+
+
+def test_follow_up_skips_retrieve_for_known_thread(chat_services):
+    chat_services.client.beta.threads.create.return_value = MagicMock(id="thread_1")
+    chat_services.create_new_thread(chat_services.new_context())
+
+    context = chat_services.new_context()
+    chat_services.retrieve_old_thread(context, "thread_1")
+
+    assert context.thread_id == "thread_1"
+    chat_services.client.beta.threads.retrieve.assert_not_called()
+    lookup = next(
+        entry
+        for entry in context.timer.entries
+        if entry["name"] == "thread_cache.lookup"
+    )
+    assert lookup["hit"] is True
+
+
+def test_completed_run_records_last_run_id(chat_services, context):
+    mock_run = MagicMock(id="run_1", status="completed")
+    chat_services.client.beta.threads.runs.create.return_value = mock_run
+    chat_services.client.beta.threads.messages.list.return_value = []
+
+    chat_services.execute_assistant(context)
+
+    assert chat_services.thread_cache.lookup("test_thread_id") == {
+        "last_run_id": "run_1"
+    }
+
+
+def test_completed_run_schedules_summary_refresh(chat_services, context):
+    chat_services.summary_refresher = MagicMock()
+    mock_run = MagicMock(id="run_1", status="completed")
+    chat_services.client.beta.threads.runs.create.return_value = mock_run
+    chat_services.client.beta.threads.messages.list.return_value = []
+
+    chat_services.execute_assistant(context)
+
+    chat_services.summary_refresher.schedule.assert_called_once_with(
+        "test_thread_id", None
+    )
+
+
+def test_missing_thread_is_forgotten(chat_services, context):
+    chat_services.remember_thread("test_thread_id")
+    chat_services.client.beta.threads.messages.create.side_effect = NotFoundError(
+        "No thread found",
+        response=MagicMock(status_code=404),
+        body=None,
+    )
+
+    with pytest.raises(NotFoundError):
+        chat_services.add_user_message(context, "Oi")
+
+    assert chat_services.thread_cache.lookup("test_thread_id") is None
+    chat_services.retrieve_old_thread(context, "test_thread_id")
+    chat_services.client.beta.threads.retrieve.assert_called_once_with(
+        thread_id="test_thread_id"
+    )
+
+
+def test_execute_assistant_retries_with_refreshed_assistant(chat_services, context):
+    runs = chat_services.client.beta.threads.runs
+    completed = MagicMock(id="run_1", status="completed")
+    runs.create.side_effect = [
+        NotFoundError(
+            "No assistant found", response=MagicMock(status_code=404), body=None
+        ),
+        completed,
+    ]
+    runs.retrieve.return_value = completed
+    chat_services.client.beta.threads.messages.list.return_value = []
+    chat_services.assistant = MagicMock(id="asst_deleted")
+    chat_services.assistant_instance.refresh_assistant.return_value = True
+    chat_services.assistant_instance.assistant = MagicMock(id="asst_new")
+
+    chat_services.execute_assistant(context)
+
+    chat_services.assistant_instance.refresh_assistant.assert_called_once_with(
+        "asst_deleted"
+    )
+    assert runs.create.call_args.kwargs["assistant_id"] == "asst_new"
+    assert context.run.status == "completed"
+
+
+def test_superseded_run_state_is_not_carried_into_the_next_run(chat_services):
+    in_tool, queued = threading.Event(), threading.Event()
+    runs = chat_services.client.beta.threads.runs
+    chat_services.thread_coordinator.cancel_superseded = True
+
+    def search_run(run_id):
+        run = MagicMock(id=run_id, status="requires_action")
+        tool_call = MagicMock(id=f"call_{run_id}")
+        tool_call.function.name = "ai_search_tool"
+        tool_call.function.arguments = "{}"
+        run.required_action.submit_tool_outputs.tool_calls = [tool_call]
+        return run
+
+    def search(context, name, arguments):
+        if not in_tool.is_set():
+            in_tool.set()
+            queued.wait(timeout=5)
+            return {"tool_output": "r1", "citations": [{"id": 1, "src": "search1"}]}
+        return {"tool_output": "r2", "citations": [{"id": 1, "src": "search2"}]}
+
+    runs.create.side_effect = [search_run("run_1"), search_run("run_2")]
+    # o primeiro run pede outra rodada: é aí que o driver vê a substituição
+    runs.submit_tool_outputs.side_effect = [
+        search_run("run_1"),
+        MagicMock(id="run_2", status="completed"),
+    ]
+    runs.cancel.return_value = MagicMock(id="run_1", status="cancelled")
+    chat_services.client.beta.threads.messages.list.return_value = []
+    chat_services.assistant_instance.call_tool_by_name.side_effect = search
+    contexts = [chat_services.new_context(thread_id="t1") for _ in range(2)]
+    results = {}
+
+    def answer(index, content):
+        results[index] = chat_services.answer(contexts[index], content)
+
+    first = threading.Thread(target=answer, args=(0, "primeira"))
+    first.start()
+    in_tool.wait(timeout=5)
+    second = threading.Thread(target=answer, args=(1, "segunda"))
+    second.start()
+    while not chat_services.thread_coordinator._slots["t1"].pending:
+        time.sleep(0.005)
+    queued.set()
+    first.join(timeout=5)
+    second.join(timeout=5)
+
+    assert runs.cancel.call_count == 1
+    assert results[0][1] == results[1][1] == [{"id": 1, "src": "search2"}]
+    assert [r["round"] for r in contexts[0].rounds] == [1]
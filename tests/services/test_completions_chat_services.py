@@ -0,0 +1,199 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from services.chat_services import ERROR_ANSWER
+from services.completions_chat_services import (
+    AsyncCompletionsChatServices,
+    CompletionsChatServices,
+    create_chat_services,
+)
+
+
+def _tool_call(call_id, name, arguments):
+    return SimpleNamespace(
+        id=call_id,
+        type="function",
+        function=SimpleNamespace(name=name, arguments=json.dumps(arguments)),
+    )
+
+
+def _completion(content=None, tool_calls=None, completion_id="chatcmpl_1"):
+    return SimpleNamespace(
+        id=completion_id,
+        choices=[
+            SimpleNamespace(
+                message=SimpleNamespace(content=content, tool_calls=tool_calls)
+            )
+        ],
+    )
+
+
+@pytest.fixture
+def assistant_instance():
+    assistant = MagicMock()
+    assistant.deployment = "gpt-test"
+    assistant.role_prompt = "Você é o assistente de TI."
+    assistant.tools_schemas = [
+        {"type": "function", "function": {"name": "ai_search_tool"}}
+    ]
+    assistant.call_tool_by_name.return_value = {
+        "tool_output": "Trecho sobre VPN",
+        "citations": [{"id": 1, "filename": "vpn.pdf"}],
+    }
+    return assistant
+
+
+@pytest.fixture
+def chat_services(assistant_instance, monkeypatch):
+    monkeypatch.setenv("ANSWER_CACHE_ENABLED", "false")
+    return CompletionsChatServices(assistant_instance)
+
+
+def test_tool_round_and_answer_cost_one_model_call_each(chat_services):
+    create = chat_services.client.chat.completions.create
+    create.side_effect = [
+        _completion(
+            tool_calls=[_tool_call("call_1", "ai_search_tool", {"query": "vpn"})]
+        ),
+        _completion("Configure a VPN assim [1]."),
+    ]
+    context = chat_services.new_context()
+    chat_services.create_new_thread(context)
+
+    answer, citations = chat_services.answer(context, "Como configuro a VPN?")
+
+    assert answer == "Configure a VPN assim [1]."
+    assert citations == [{"id": 1, "filename": "vpn.pdf"}]
+    assert create.call_count == 2
+    first, second = (c.kwargs for c in create.call_args_list)
+    assert first["tool_choice"] == "required"
+    assert first["tools"] == chat_services.assistant_instance.tools_schemas
+    assert first["messages"][0]["role"] == "system"
+    assert "assistente de TI" in first["messages"][0]["content"]
+    assert second["tool_choice"] == "auto"
+    assert second["messages"][-1] == {
+        "role": "tool",
+        "tool_call_id": "call_1",
+        "content": "Trecho sobre VPN",
+    }
+    chat_services.client.beta.threads.create.assert_not_called()
+    chat_services.client.beta.threads.runs.create.assert_not_called()
+    assert context.run.status == "completed"
+    assert [r["tools"] for r in context.rounds] == [["ai_search_tool"]]
+    assert context.poll_count == 2
+
+
+def test_follow_up_sends_the_stored_history(chat_services):
+    create = chat_services.client.chat.completions.create
+    create.side_effect = [
+        _completion(tool_calls=[_tool_call("c1", "ai_search_tool", {})]),
+        _completion("Primeira resposta"),
+        _completion(tool_calls=[_tool_call("c2", "ai_search_tool", {})]),
+        _completion("Segunda resposta"),
+    ]
+    context = chat_services.new_context()
+    thread_id = chat_services.create_new_thread(context)
+    chat_services.answer(context, "Primeira pergunta")
+
+    follow_up = chat_services.new_context()
+    chat_services.retrieve_old_thread(follow_up, thread_id)
+    answer, _ = chat_services.answer(follow_up, "Segunda pergunta")
+
+    assert answer == "Segunda resposta"
+    sent = create.call_args_list[2].kwargs["messages"]
+    assert [m["role"] for m in sent] == [
+        "system",
+        "user",
+        "assistant",
+        "tool",
+        "assistant",
+        "user",
+    ]
+    assert follow_up.transcript == ["Primeira pergunta", "Segunda pergunta"]
+
+
+def test_round_limit_forces_a_final_answer(assistant_instance, monkeypatch):
+    monkeypatch.setenv("ANSWER_CACHE_ENABLED", "false")
+    monkeypatch.setenv("RUN_MAX_TOOL_ROUNDS", "1")
+    chat_services = CompletionsChatServices(assistant_instance)
+    create = chat_services.client.chat.completions.create
+    create.side_effect = [
+        _completion(tool_calls=[_tool_call("c1", "ai_search_tool", {})]),
+        _completion("Resposta final"),
+    ]
+    context = chat_services.new_context()
+    chat_services.create_new_thread(context)
+
+    answer, _ = chat_services.answer(context, "Pergunta")
+
+    assert answer == "Resposta final"
+    assert create.call_args_list[1].kwargs["tool_choice"] == "none"
+
+
+def test_model_error_returns_error_answer_and_keeps_history(chat_services):
+    chat_services.client.chat.completions.create.side_effect = RuntimeError("429")
+    context = chat_services.new_context()
+    thread_id = chat_services.create_new_thread(context)
+
+    answer, citations = chat_services.answer(context, "Pergunta")
+
+    assert (answer, citations) == (ERROR_ANSWER, [])
+    # só a pergunta fica no histórico; nenhuma tool call sem resultado
+    assert chat_services.engine.store.history(thread_id) == [
+        {"role": "user", "content": "Pergunta"}
+    ]
+    # a falha volta ao loop de rodadas, que fecha a fase do modelo
+    assert [entry["name"] for entry in context.timer.entries] == ["completion.round0"]
+
+
+def test_answer_from_cache_seeds_a_stored_conversation(assistant_instance):
+    chat_services = CompletionsChatServices(assistant_instance)
+    chat_services.answer_cache.store("Qual o horário?", "Das 8h às 18h.", [{"id": 1}])
+    context = chat_services.new_context()
+
+    answer, citations = chat_services.answer_from_cache(context, "qual o horario")
+
+    assert (answer, citations) == ("Das 8h às 18h.", [{"id": 1}])
+    assert chat_services.engine.store.history(context.thread_id) == [
+        {"role": "user", "content": "qual o horario"},
+        {"role": "assistant", "content": "Das 8h às 18h."},
+    ]
+    chat_services.client.beta.threads.create.assert_not_called()
+
+
+def test_async_services_share_the_store(assistant_instance, monkeypatch):
+    monkeypatch.setenv("ANSWER_CACHE_ENABLED", "false")
+    assistant_instance.acall_tool_by_name = AsyncMock(
+        return_value={"tool_output": "ok", "citations": []}
+    )
+    assistant_instance.async_client.chat.completions.create = AsyncMock(
+        side_effect=[
+            _completion(tool_calls=[_tool_call("c1", "ai_search_tool", {})]),
+            _completion("Resposta async"),
+        ]
+    )
+    chat_services, async_chat_services = create_chat_services(
+        assistant_instance, mode="completions"
+    )
+    assert isinstance(async_chat_services, AsyncCompletionsChatServices)
+    context = chat_services.new_context()
+    thread_id = chat_services.create_new_thread(context)
+
+    async def follow_up():
+        context = async_chat_services.new_context()
+        await async_chat_services.retrieve_old_thread(context, thread_id)
+        return await async_chat_services.answer(context, "Pergunta async")
+
+    answer, _ = asyncio.run(follow_up())
+
+    assert answer == "Resposta async"
+    assert chat_services.engine.store.user_texts(thread_id) == ["Pergunta async"]
+
+
+def test_invalid_engine_mode(assistant_instance):
+    with pytest.raises(ValueError):
+        create_chat_services(assistant_instance, mode="batch")
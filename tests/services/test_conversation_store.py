@@ -0,0 +1,43 @@
+from services.conversation_store import ConversationStore
+
+
+def test_create_append_and_history():
+    store = ConversationStore()
+    thread_id = store.create([{"role": "user", "content": "Oi"}])
+
+    store.append(thread_id, {"role": "assistant", "content": "Olá!"})
+
+    assert thread_id.startswith("chat_")
+    assert store.history(thread_id) == [
+        {"role": "user", "content": "Oi"},
+        {"role": "assistant", "content": "Olá!"},
+    ]
+    assert store.user_texts(thread_id) == ["Oi"]
+
+
+def test_history_is_trimmed_at_a_user_turn():
+    store = ConversationStore(max_messages=4)
+    thread_id = store.create()
+    for turn in range(3):
+        store.append(
+            thread_id,
+            {"role": "user", "content": f"pergunta {turn}"},
+            {"role": "assistant", "content": None, "tool_calls": [{"id": "c"}]},
+            {"role": "tool", "tool_call_id": "c", "content": "ok"},
+            {"role": "assistant", "content": f"resposta {turn}"},
+        )
+
+    history = store.history(thread_id)
+
+    # nunca começa por uma tool call ou resultado de ferramenta órfão
+    assert history[0] == {"role": "user", "content": "pergunta 2"}
+    assert len(history) == 4
+
+
+def test_unknown_thread_starts_empty():
+    store = ConversationStore()
+
+    store.ensure("chat_expirado")
+
+    assert "chat_expirado" in store
+    assert store.history("chat_expirado") == []
@@ -0,0 +1,110 @@
+import pytest
+from unittest.mock import MagicMock
+from services.conversation_context import ConversationContext
+from services.run_driver import RunDriver
+from services.run_waiter import RunDeadlineExceeded
+
+
+def _requires_action_run(run_id="run_1", tool_name="get_weather"):
+    run = MagicMock(status="requires_action", id=run_id)
+    tool_call = MagicMock(id="call_1")
+    tool_call.function.name = tool_name
+    run.required_action.submit_tool_outputs.tool_calls = [tool_call]
+    return run
+
+
+@pytest.fixture
+def run_waiter():
+    waiter = MagicMock()
+    waiter.deadline_seconds = 60
+    return waiter
+
+
+@pytest.fixture
+def tool_dispatcher():
+    dispatcher = MagicMock()
+    dispatcher.dispatch.return_value = [{"tool_call_id": "call_1", "output": "ok"}]
+    return dispatcher
+
+
+@pytest.fixture
+def context():
+    return ConversationContext(MagicMock(), thread_id="thread_1")
+
+
+def test_drive_handles_multiple_tool_rounds(run_waiter, tool_dispatcher, context):
+    run_waiter.create_and_wait.return_value = _requires_action_run()
+    run_waiter.submit_and_wait.side_effect = [
+        _requires_action_run(tool_name="ai_search_tool"),
+        MagicMock(status="completed", id="run_1"),
+    ]
+    driver = RunDriver(run_waiter, tool_dispatcher)
+
+    run = driver.drive(context, assistant_id="asst_1")
+
+    assert run.status == "completed"
+    assert tool_dispatcher.dispatch.call_count == 2
+    assert [r["tools"] for r in context.rounds] == [["get_weather"], ["ai_search_tool"]]
+    assert all("tools_ms" in r and "run_ms" in r for r in context.rounds)
+
+
+def test_drive_cancels_when_round_limit_reached(
+    run_waiter, tool_dispatcher, context, monkeypatch
+):
+    monkeypatch.setattr("services.run_driver.CANCEL_POLL_SECONDS", 0)
+    run_waiter.create_and_wait.return_value = _requires_action_run()
+    run_waiter.submit_and_wait.return_value = _requires_action_run()
+    runs = run_waiter.client.beta.threads.runs
+    runs.cancel.return_value = MagicMock(status="cancelling", id="run_1")
+    runs.retrieve.side_effect = [
+        MagicMock(status="cancelling", id="run_1"),
+        MagicMock(status="cancelled", id="run_1"),
+    ]
+    driver = RunDriver(run_waiter, tool_dispatcher, max_rounds=2)
+
+    run = driver.drive(context, assistant_id="asst_1")
+
+    # o thread só é liberado depois que o cancelamento termina
+    assert run.status == "cancelled"
+    assert runs.retrieve.call_count == 2
+    assert len(context.rounds) == 2
+    run_waiter.client.beta.threads.runs.cancel.assert_called_once_with(
+        thread_id="thread_1", run_id="run_1"
+    )
+
+
+def test_drive_cancels_when_budget_exceeded(
+    run_waiter, tool_dispatcher, context, monkeypatch
+):
+    monkeypatch.setattr("services.run_driver.CANCEL_POLL_SECONDS", 0)
+    run_waiter.create_and_wait.return_value = _requires_action_run()
+    run_waiter.submit_and_wait.side_effect = RunDeadlineExceeded(
+        MagicMock(status="in_progress", id="run_1")
+    )
+    runs = run_waiter.client.beta.threads.runs
+    runs.cancel.return_value = MagicMock(status="cancelling", id="run_1")
+    runs.retrieve.return_value = MagicMock(status="cancelled", id="run_1")
+    driver = RunDriver(run_waiter, tool_dispatcher, budget_seconds=0.5)
+
+    run = driver.drive(context, assistant_id="asst_1")
+
+    assert run.status == "cancelled"
+    run_waiter.client.beta.threads.runs.cancel.assert_called_once()
+
+
+def test_drive_cancels_superseded_run_and_waits_for_cancellation(
+    run_waiter, tool_dispatcher, context, monkeypatch
+):
+    monkeypatch.setattr("services.run_driver.CANCEL_POLL_SECONDS", 0)
+    run_waiter.create_and_wait.return_value = _requires_action_run()
+    runs = run_waiter.client.beta.threads.runs
+    runs.cancel.return_value = MagicMock(status="cancelling", id="run_1")
+    runs.retrieve.return_value = MagicMock(status="cancelled", id="run_1")
+    context.superseded = True
+    driver = RunDriver(run_waiter, tool_dispatcher)
+
+    run = driver.drive(context, assistant_id="asst_1")
+
+    assert run.status == "cancelled"
+    tool_dispatcher.dispatch.assert_not_called()
+    runs.retrieve.assert_called_once_with(thread_id="thread_1", run_id="run_1")
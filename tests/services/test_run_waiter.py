@@ -0,0 +1,128 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from services.conversation_context import ConversationContext
+from services.run_waiter import (
+    BackoffRunWaiter,
+    PollRunWaiter,
+    RunDeadlineExceeded,
+    StreamingRunWaiter,
+    create_run_waiter,
+)
+
+
+def _run(status, run_id="run_1"):
+    return MagicMock(status=status, id=run_id)
+
+
+@pytest.fixture
+def client():
+    return MagicMock()
+
+
+@pytest.fixture
+def context(client):
+    return ConversationContext(client, thread_id="thread_1")
+
+
+def test_backoff_waiter_polls_until_final_status(client, context):
+    client.beta.threads.runs.create.return_value = _run("queued")
+    client.beta.threads.runs.retrieve.side_effect = [
+        _run("in_progress"),
+        _run("completed"),
+    ]
+    waiter = BackoffRunWaiter(client, initial_ms=1, max_ms=2)
+
+    run = waiter.create_and_wait(context, assistant_id="asst_1")
+
+    assert run.status == "completed"
+    assert context.poll_count == 2
+    client.beta.threads.runs.create.assert_called_once_with(
+        thread_id="thread_1", assistant_id="asst_1"
+    )
+
+
+def test_backoff_waiter_respects_deadline(client, context):
+    client.beta.threads.runs.create.return_value = _run("queued")
+    client.beta.threads.runs.retrieve.return_value = _run("in_progress")
+    waiter = BackoffRunWaiter(client, deadline_seconds=0.05, initial_ms=10, max_ms=10)
+
+    with pytest.raises(RunDeadlineExceeded) as exc_info:
+        waiter.create_and_wait(context, assistant_id="asst_1")
+
+    assert exc_info.value.run.status == "in_progress"
+    assert 1 <= context.poll_count <= 6
+
+
+def test_poll_waiter_honors_poll_after_header(client, context):
+    client.beta.threads.runs.create.return_value = _run("queued")
+    response = MagicMock()
+    response.parse.side_effect = [_run("in_progress"), _run("requires_action")]
+    response.headers = {"openai-poll-after-ms": "1"}
+    client.beta.threads.runs.with_raw_response.retrieve.return_value = response
+    waiter = PollRunWaiter(client, poll_interval_ms=1)
+
+    run = waiter.create_and_wait(context, assistant_id="asst_1")
+
+    assert run.status == "requires_action"
+    assert context.poll_count == 2
+
+
+def test_streaming_waiter_returns_last_run_event(client, context):
+    events = [
+        MagicMock(event="thread.run.created", data=_run("queued")),
+        MagicMock(event="thread.run.step.created", data=MagicMock(status="x")),
+        MagicMock(event="thread.message.delta", data=MagicMock()),
+        MagicMock(event="thread.run.completed", data=_run("completed")),
+    ]
+    manager = MagicMock()
+    manager.__enter__.return_value = iter(events)
+    client.beta.threads.runs.stream.return_value = manager
+    context.run = _run("requires_action")
+    client.beta.threads.runs.submit_tool_outputs_stream.return_value = manager
+    waiter = StreamingRunWaiter(client)
+
+    run = waiter.submit_and_wait(context, [{"tool_call_id": "c", "output": "o"}])
+
+    assert run.status == "completed"
+    assert context.poll_count == 1
+
+
+def test_create_run_waiter_modes(client, monkeypatch):
+    assert isinstance(create_run_waiter(client), BackoffRunWaiter)
+    monkeypatch.setenv("RUN_WAIT_MODE", "stream")
+    assert isinstance(create_run_waiter(client), StreamingRunWaiter)
+    with pytest.raises(ValueError):
+        create_run_waiter(client, mode="busy")
+
+
+def test_async_backoff_waiter_counts_each_retrieve(client, context):
+    async_client = MagicMock()
+    runs = async_client.beta.threads.runs
+    runs.create = AsyncMock(return_value=_run("queued"))
+    runs.retrieve = AsyncMock(side_effect=[_run("in_progress"), _run("completed")])
+    waiter = BackoffRunWaiter(client, initial_ms=1, max_ms=2, async_client=async_client)
+
+    run = asyncio.run(waiter.acreate_and_wait(context, assistant_id="asst_1"))
+
+    assert run.status == "completed"
+    assert context.poll_count == 2
+    client.beta.threads.runs.retrieve.assert_not_called()
+
+
+def test_async_poll_waiter_respects_deadline(client, context):
+    async_client = MagicMock()
+    runs = async_client.beta.threads.runs
+    runs.create = AsyncMock(return_value=_run("queued"))
+    response = MagicMock()
+    response.parse.return_value = _run("in_progress")
+    response.headers = {}
+    runs.with_raw_response.retrieve = AsyncMock(return_value=response)
+    waiter = PollRunWaiter(
+        client, deadline_seconds=0.05, poll_interval_ms=10, async_client=async_client
+    )
+
+    with pytest.raises(RunDeadlineExceeded):
+        asyncio.run(waiter.acreate_and_wait(context, assistant_id="asst_1"))
+
+    assert 1 <= context.poll_count <= 6
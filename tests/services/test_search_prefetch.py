@@ -0,0 +1,169 @@
+import asyncio
+import json
+import time
+import pytest
+from unittest.mock import MagicMock
+from services.conversation_context import ConversationContext
+from services.search_prefetch import SearchPrefetch, create_search_prefetcher
+from services.tool_dispatcher import ToolDispatcher
+from utils.metrics import TOOL_CALLS
+
+
+def _search_call(call_id, query, search_needed=True):
+    tool_call = MagicMock(id=call_id)
+    tool_call.function.name = "ai_search_tool"
+    tool_call.function.arguments = json.dumps(
+        {"query": query, "search_needed": search_needed}
+    )
+    return tool_call
+
+
+class SearchTool:
+    """Busca lenta que registra as queries recebidas."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.queries = []
+
+    def _result(self, query):
+        self.queries.append(query)
+        return {"tool_output": f"resultados de {query}", "citations": [{"id": 1}]}
+
+    def execute(self, query, context=None, **kwargs):
+        time.sleep(self.delay)
+        return self._result(query)
+
+    async def aexecute(self, query, context=None, **kwargs):
+        await asyncio.sleep(self.delay)
+        return self._result(query)
+
+
+class SearchAssistant:
+    """Assistente só com a ferramenta de busca."""
+
+    def __init__(self, delay=0.2):
+        self.tool = SearchTool(delay)
+        self.tool_map = {"ai_search_tool": self.tool}
+        self.tool_calls = 0
+
+    @property
+    def queries(self):
+        return self.tool.queries
+
+    def metric_label(self, name):
+        return name
+
+    def call_tool_by_name(self, context, name, arguments):
+        self.tool_calls += 1
+        return self.tool.execute(context=context, **json.loads(arguments))
+
+    async def acall_tool_by_name(self, context, name, arguments):
+        self.tool_calls += 1
+        return await self.tool.aexecute(context=context, **json.loads(arguments))
+
+
+@pytest.fixture
+def context():
+    return ConversationContext(MagicMock(), thread_id="thread_1")
+
+
+@pytest.fixture
+def prefetch_enabled(monkeypatch):
+    monkeypatch.setenv("SEARCH_PREFETCH_ENABLED", "true")
+    monkeypatch.setenv("SEARCH_PREFETCH_SIMILARITY", "0.5")
+
+
+def test_prefetch_matches_similar_queries_only():
+    prefetch = SearchPrefetch("Como configuro a VPN no notebook?", MagicMock())
+
+    assert prefetch.matches({"query": "como configurar a VPN no notebook"}, 0.5)
+    assert not prefetch.matches({"query": "status do incidente INC0012"}, 0.5)
+    assert not prefetch.matches(
+        {"query": "Como configuro a VPN no notebook?", "search_needed": False}, 0.5
+    )
+    assert not prefetch.matches(
+        {"query": "Como configuro a VPN no notebook?", "k_results": 10}, 0.5
+    )
+
+
+def test_create_search_prefetcher_is_disabled_by_default(monkeypatch):
+    monkeypatch.delenv("SEARCH_PREFETCH_ENABLED", raising=False)
+    assert create_search_prefetcher(SearchAssistant(), MagicMock()) is None
+
+    monkeypatch.setenv("SEARCH_PREFETCH_ENABLED", "true")
+    assert create_search_prefetcher(SearchAssistant(), MagicMock()) is not None
+    assert create_search_prefetcher(MagicMock(), MagicMock()) is None
+
+
+def test_dispatch_uses_matching_prefetch(prefetch_enabled, context):
+    assistant = SearchAssistant(delay=0.2)
+    dispatcher = ToolDispatcher(assistant)
+    calls = TOOL_CALLS.value(tool="ai_search_tool")
+
+    dispatcher.prefetch(context, "Como configuro a VPN?")
+    time.sleep(0.2)  # messages.create e runs.create acontecem aqui
+    started = time.monotonic()
+    outputs = dispatcher.dispatch(
+        context, [_search_call("call_1", "como configuro a VPN")]
+    )
+
+    assert time.monotonic() - started < 0.15
+    assert assistant.queries == ["Como configuro a VPN?"]
+    # a busca adiantada não passa pelas métricas de ferramentas do assistente
+    assert assistant.tool_calls == 0
+    # a tool call atendida pela busca adiantada conta uma vez
+    assert TOOL_CALLS.value(tool="ai_search_tool") == calls + 1
+    assert outputs == [
+        {"tool_call_id": "call_1", "output": "resultados de Como configuro a VPN?"}
+    ]
+    assert context.citations == [{"id": 1}]
+    tool_phase = next(
+        entry
+        for entry in context.timer.entries
+        if entry["name"] == "tool.ai_search_tool"
+    )
+    assert tool_phase["prefetched"] is True
+
+
+def test_dispatch_searches_again_when_query_differs(prefetch_enabled, context):
+    assistant = SearchAssistant(delay=0.05)
+    dispatcher = ToolDispatcher(assistant)
+
+    dispatcher.prefetch(context, "Oi, tudo bem?")
+    outputs = dispatcher.dispatch(
+        context, [_search_call("call_1", "política de férias da empresa")]
+    )
+
+    assert outputs[0]["output"] == "resultados de política de férias da empresa"
+    assert "política de férias da empresa" in assistant.queries
+    assert context.search_prefetch is None
+
+
+def test_only_first_search_uses_the_prefetch(prefetch_enabled, context):
+    assistant = SearchAssistant(delay=0.05)
+    dispatcher = ToolDispatcher(assistant)
+
+    dispatcher.prefetch(context, "reset de senha")
+    dispatcher.dispatch(
+        context,
+        [_search_call("call_1", "reset de senha"), _search_call("call_2", "senha")],
+    )
+
+    assert sorted(assistant.queries) == ["reset de senha", "senha"]
+
+
+def test_adispatch_uses_matching_prefetch(prefetch_enabled, context):
+    assistant = SearchAssistant(delay=0.2)
+    dispatcher = ToolDispatcher(assistant)
+
+    async def scenario():
+        dispatcher.aprefetch(context, "Como configuro a VPN?")
+        await asyncio.sleep(0.2)
+        return await dispatcher.adispatch(
+            context, [_search_call("call_1", "como configuro a VPN")]
+        )
+
+    outputs = asyncio.run(scenario())
+
+    assert assistant.queries == ["Como configuro a VPN?"]
+    assert outputs[0]["output"] == "resultados de Como configuro a VPN?"
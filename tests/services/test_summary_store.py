@@ -0,0 +1,140 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from services.summary_store import EMPTY_SUMMARY, SummaryRefresher, SummaryStore
+
+
+def _message(message_id, role, text):
+    block = SimpleNamespace(type="text", text=SimpleNamespace(value=text))
+    return SimpleNamespace(id=message_id, role=role, content=[block])
+
+
+def _completion(text):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=text))]
+    )
+
+
+@pytest.fixture
+def client():
+    client = MagicMock()
+    client.chat.completions.create.side_effect = [
+        _completion("Resumo 1"),
+        _completion("Resumo 2"),
+    ]
+    return client
+
+
+@pytest.fixture
+def store(client):
+    return SummaryStore(client)
+
+
+def test_first_summary_reads_thread_from_the_start(store, client):
+    client.beta.threads.messages.list.return_value = [
+        _message("msg_1", "user", "Minha VPN não conecta"),
+        _message("msg_2", "assistant", "Já tentou reiniciar?"),
+    ]
+
+    assert store.summarize("thread_1") == "Resumo 1"
+
+    client.beta.threads.messages.list.assert_called_once_with(
+        thread_id="thread_1", order="asc", limit=100
+    )
+    messages = client.chat.completions.create.call_args.kwargs["messages"]
+    assert [m["content"] for m in messages[2:]] == ["Minha VPN não conecta"]
+
+
+def test_update_reads_only_messages_after_watermark(store, client):
+    client.beta.threads.messages.list.return_value = [
+        _message("msg_1", "user", "Minha VPN não conecta"),
+        _message("msg_2", "assistant", "Já tentou reiniciar?"),
+    ]
+    store.summarize("thread_1")
+
+    client.beta.threads.messages.list.return_value = [
+        _message("msg_3", "user", "Sim, continua sem conectar"),
+    ]
+    assert store.summarize("thread_1") == "Resumo 2"
+
+    assert client.beta.threads.messages.list.call_args.kwargs["after"] == "msg_2"
+    messages = client.chat.completions.create.call_args.kwargs["messages"]
+    assert "Resumo 1" in messages[1]["content"]
+    assert [m["content"] for m in messages[2:]] == ["Sim, continua sem conectar"]
+
+
+def test_no_new_user_messages_reuses_summary(store, client):
+    client.beta.threads.messages.list.return_value = [
+        _message("msg_1", "user", "Minha VPN não conecta"),
+    ]
+    store.summarize("thread_1")
+
+    client.beta.threads.messages.list.return_value = [
+        _message("msg_2", "assistant", "Vou transferir."),
+    ]
+    assert store.summarize("thread_1") == "Resumo 1"
+    assert client.chat.completions.create.call_count == 1
+
+    client.beta.threads.messages.list.return_value = []
+    store.summarize("thread_1")
+    assert client.beta.threads.messages.list.call_args.kwargs["after"] == "msg_2"
+
+
+def test_empty_thread(store, client):
+    client.beta.threads.messages.list.return_value = []
+
+    assert store.summarize("thread_1") == EMPTY_SUMMARY
+    assert store.get("thread_1") is None
+    client.chat.completions.create.assert_not_called()
+
+
+def test_local_transcript_is_summarized_incrementally(store, client):
+    store.summarize("chat_1", user_texts=["Minha VPN não conecta"])
+    summary = store.summarize(
+        "chat_1", user_texts=["Minha VPN não conecta", "Já reiniciei"]
+    )
+
+    assert summary == "Resumo 2"
+    client.beta.threads.messages.list.assert_not_called()
+    second_payload = client.chat.completions.create.call_args.kwargs["messages"]
+    assert second_payload[-1] == {"role": "user", "content": "Já reiniciei"}
+    assert "Resumo 1" in second_payload[1]["content"]
+
+
+def test_lock_is_evicted_with_the_entry(client):
+    store = SummaryStore(client, max_size=1)
+    store.summarize("chat_1", user_texts=["Minha VPN não conecta"])
+    store.summarize("chat_2", user_texts=["Preciso de acesso ao SAP"])
+
+    assert store.get("chat_1") is None
+    assert len(store._entries._data) == 1
+
+
+def test_refresher_updates_summary_in_background(store, client):
+    refresher = SummaryRefresher(store)
+
+    refresher.schedule("chat_1", ["Minha VPN não conecta"]).result(timeout=5)
+
+    assert store.get("chat_1") == "Resumo 1"
+
+
+def test_refresher_skips_thread_already_queued(store):
+    executor = MagicMock()
+    refresher = SummaryRefresher(store, executor=executor)
+
+    refresher.schedule("thread_1")
+    refresher.schedule("thread_1")
+
+    executor.submit.assert_called_once()
+
+
+def test_refresher_drops_requests_when_queue_is_full(store):
+    executor = MagicMock()
+    refresher = SummaryRefresher(store, executor=executor, max_pending=2)
+
+    for thread_id in ("thread_1", "thread_2", "thread_3"):
+        refresher.schedule(thread_id)
+
+    assert executor.submit.call_count == 2
@@ -0,0 +1,146 @@
+import json
+import os
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from services.conversation_context import ConversationContext
+from services.teams_handoff import (
+    HOST_JSON_PATH,
+    HandoffWorker,
+    InProcessHandoffQueue,
+    create_handoff_job,
+    create_handoff_queue,
+    create_summary_refresher,
+    default_max_attempts,
+    get_handoff_worker,
+)
+from services.tools.transfer_to_teams_agent_tool import CallTeamsAgentTool
+
+
+def _message(message_id, role, text):
+    block = SimpleNamespace(type="text", text=SimpleNamespace(value=text))
+    return SimpleNamespace(id=message_id, role=role, content=[block])
+
+
+@pytest.fixture
+def client():
+    client = MagicMock()
+    client.beta.threads.messages.list.return_value = [
+        _message("msg_1", "user", "Minha VPN não conecta"),
+        _message("msg_2", "assistant", "Posso ajudar?"),
+    ]
+    client.chat.completions.create.return_value.choices = [
+        SimpleNamespace(message=SimpleNamespace(content=" Usuário sem VPN. "))
+    ]
+    return client
+
+
+@pytest.fixture
+def worker(client, tmp_path):
+    return HandoffWorker(
+        client=client,
+        transport=MagicMock(),
+        webhook_url="https://teams.example.com/hook",
+        max_attempts=2,
+        dead_letter_path=str(tmp_path / "dead_letter.jsonl"),
+    )
+
+
+def test_tool_enqueues_without_calling_external_services(client):
+    handoff_queue = MagicMock()
+    tool = CallTeamsAgentTool(handoff_queue=handoff_queue)
+    context = ConversationContext(client, thread_id="thread_1")
+
+    result = tool.execute(message="Quero falar com um agente", context=context)
+
+    job = handoff_queue.enqueue.call_args.args[0]
+    assert job["thread_id"] == "thread_1"
+    assert job["message"] == "Quero falar com um agente"
+    assert job["job_id"][:8] in result["tool_output"]
+    client.chat.completions.create.assert_not_called()
+
+
+def test_worker_summarizes_only_user_messages_and_posts(worker, client):
+    worker.process(create_handoff_job("thread_1", "agente"), attempt=1)
+
+    client.beta.threads.messages.list.assert_called_once_with(
+        thread_id="thread_1", order="asc", limit=100
+    )
+    payload = worker.transport.post.call_args.kwargs["json"]
+    assert payload["attachments"][0]["content"].startswith("Usuário sem VPN.")
+
+
+def test_worker_raises_before_last_attempt(worker):
+    worker.transport.post.side_effect = RuntimeError("webhook fora do ar")
+
+    with pytest.raises(RuntimeError):
+        worker.process(create_handoff_job("thread_1", "agente"), attempt=1)
+
+
+def test_worker_dead_letters_on_last_attempt(worker):
+    worker.transport.post.side_effect = RuntimeError("webhook fora do ar")
+    job = create_handoff_job("thread_1", "agente")
+
+    assert worker.process(job, attempt=2) is False
+
+    with open(worker.dead_letter_path, encoding="utf-8") as f:
+        record = json.loads(f.readline())
+    assert record["job_id"] == job["job_id"]
+    assert record["attempts"] == 2
+    assert "webhook fora do ar" in record["error"]
+
+
+def test_worker_reraises_on_last_attempt_without_dead_letter(worker):
+    worker.transport.post.side_effect = RuntimeError("webhook fora do ar")
+
+    with pytest.raises(RuntimeError):
+        worker.process(
+            create_handoff_job("thread_1", "agente"), attempt=2, dead_letter=False
+        )
+
+    assert not os.path.exists(worker.dead_letter_path)
+
+
+def test_max_attempts_follows_host_json(monkeypatch):
+    monkeypatch.delenv("HANDOFF_MAX_ATTEMPTS", raising=False)
+    with open(HOST_JSON_PATH, encoding="utf-8") as f:
+        host = json.load(f)
+
+    assert default_max_attempts() == host["extensions"]["queues"]["maxDequeueCount"]
+    monkeypatch.setenv("HANDOFF_MAX_ATTEMPTS", "3")
+    assert default_max_attempts() == 3
+
+
+def test_in_process_queue_retries_then_delivers(worker):
+    worker.transport.post.side_effect = [RuntimeError("falha"), MagicMock()]
+    handoff_queue = InProcessHandoffQueue(worker, backoff_seconds=0)
+
+    handoff_queue.enqueue(create_handoff_job("thread_1", "agente"))
+    handoff_queue.join()
+
+    assert worker.transport.post.call_count == 2
+
+
+def test_create_handoff_queue_rejects_unknown_mode():
+    with pytest.raises(ValueError):
+        create_handoff_queue(mode="kafka")
+
+
+def test_queue_and_summary_refresher_share_the_worker_store(monkeypatch):
+    monkeypatch.delenv("HANDOFF_QUEUE_MODE", raising=False)
+    monkeypatch.setenv("SUMMARY_REFRESH_ENABLED", "true")
+
+    refresher = create_summary_refresher(MagicMock())
+
+    assert create_handoff_queue().worker is get_handoff_worker()
+    assert refresher.store is get_handoff_worker().summary_store
+
+
+def test_summary_refresher_is_off_by_default(monkeypatch):
+    monkeypatch.setenv("TEAMS_WEBHOOK_URL", "https://teams.example.com/hook")
+    monkeypatch.delenv("HANDOFF_QUEUE_MODE", raising=False)
+    monkeypatch.delenv("SUMMARY_REFRESH_ENABLED", raising=False)
+
+    assert create_summary_refresher(MagicMock()) is None
@@ -0,0 +1,34 @@
+from services.thread_cache import ThreadCache, create_thread_cache
+
+
+def test_remember_lookup_and_forget():
+    cache = ThreadCache(max_size=10, ttl_seconds=60)
+
+    cache.remember("thread_1")
+    cache.remember("thread_2", "run_9")
+
+    assert cache.lookup("thread_1") == {"last_run_id": None}
+    assert cache.lookup("thread_2") == {"last_run_id": "run_9"}
+    assert cache.lookup("thread_3") is None
+
+    cache.forget("thread_2")
+    assert cache.lookup("thread_2") is None
+
+
+def test_cache_is_bounded():
+    cache = ThreadCache(max_size=2, ttl_seconds=60)
+
+    for thread_id in ("thread_1", "thread_2", "thread_3"):
+        cache.remember(thread_id)
+
+    assert cache.lookup("thread_1") is None
+    assert cache.lookup("thread_3") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_create_thread_cache_can_be_disabled(monkeypatch):
+    monkeypatch.setenv("THREAD_CACHE_ENABLED", "false")
+    assert create_thread_cache() is None
+
+    monkeypatch.setenv("THREAD_CACHE_ENABLED", "true")
+    assert isinstance(create_thread_cache(), ThreadCache)
@@ -0,0 +1,383 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from services.conversation_context import ConversationContext
+from services.thread_coordinator import AsyncThreadCoordinator, ThreadCoordinator
+
+
+class FakeServices:
+    """
+    Registra as mensagens e os runs. Cada run responde com as mensagens que
+    estavam no thread; ``gate`` segura o primeiro run até ser liberado.
+    """
+
+    def __init__(self, gate=None, supersede_aware=False):
+        self.messages = {}
+        self.runs = []
+        self.gate = gate
+        self.started = threading.Event()
+        self.supersede_aware = supersede_aware
+        self.active = set()
+        self.overlaps = []
+        self.prefetches = []
+
+    def prefetch_search(self, context, content):
+        self.prefetches.append(content)
+
+    def add_user_message(self, context, content):
+        assert context.thread_id not in self.active, "mensagem com run ativo"
+        self.messages.setdefault(context.thread_id, []).append(content)
+
+    def execute_assistant(self, context):
+        thread_id = context.thread_id
+        assert thread_id not in self.active, "dois runs no mesmo thread"
+        self.active.add(thread_id)
+        self.overlaps.append(len(self.active))
+        try:
+            first_run = not self.runs
+            self.runs.append(thread_id)
+            self.started.set()
+            if self.gate is not None and first_run:
+                self.gate.wait(timeout=5)
+            status = "completed"
+            if self.supersede_aware and context.superseded:
+                status = "cancelled"
+            context.run = SimpleNamespace(id=f"run_{len(self.runs)}", status=status)
+            answer = " | ".join(self.messages[thread_id])
+            return answer, [len(self.runs)]
+        finally:
+            self.active.discard(thread_id)
+
+
+def submit_in_thread(coordinator, thread_id, content, results):
+    def target():
+        context = ConversationContext(None, thread_id=thread_id)
+        results[content] = coordinator.submit(context, content)
+
+    worker = threading.Thread(target=target)
+    worker.start()
+    return worker
+
+
+def wait_for_queue(coordinator, thread_id, size):
+    for _ in range(500):
+        slot = coordinator._slots.get(thread_id)
+        if slot is not None and len(slot.pending) >= size:
+            return
+        threading.Event().wait(0.005)
+    raise AssertionError("mensagens não chegaram à fila")
+
+
+def test_single_request_adds_message_and_runs_once():
+    services = FakeServices()
+    coordinator = ThreadCoordinator(services, cancel_superseded=False)
+
+    result = coordinator.submit(ConversationContext(None, thread_id="t1"), "Oi")
+
+    assert result == ("Oi", [1])
+    assert services.runs == ["t1"]
+    assert coordinator._slots == {}
+
+
+def test_messages_during_active_run_are_coalesced_into_next_run():
+    gate = threading.Event()
+    services = FakeServices(gate=gate)
+    coordinator = ThreadCoordinator(services, cancel_superseded=False)
+    results = {}
+
+    first = submit_in_thread(coordinator, "t1", "primeira", results)
+    services.started.wait(timeout=5)
+    second = submit_in_thread(coordinator, "t1", "segunda", results)
+    third = submit_in_thread(coordinator, "t1", "terceira", results)
+    wait_for_queue(coordinator, "t1", 2)
+    gate.set()
+    for worker in (first, second, third):
+        worker.join(timeout=5)
+
+    assert services.runs == ["t1", "t1"]
+    assert results["primeira"] == ("primeira", [1])
+    # as duas mensagens da fila entraram no mesmo run e recebem a mesma resposta
+    assert results["segunda"] == results["terceira"]
+    assert results["segunda"][1] == [2]
+    # só os líderes adiantam a busca: uma por run
+    assert len(services.prefetches) == 2
+    assert sorted(services.prefetches[1].split("\n")) == ["segunda", "terceira"]
+    assert coordinator._slots == {}
+
+
+def test_different_threads_run_in_parallel():
+    barrier = threading.Barrier(2, timeout=5)
+
+    class ParallelServices(FakeServices):
+        def execute_assistant(self, context):
+            barrier.wait()  # só passa se os dois runs estiverem ativos juntos
+            return super().execute_assistant(context)
+
+    services = ParallelServices()
+    coordinator = ThreadCoordinator(services, cancel_superseded=False)
+    results = {}
+
+    workers = [
+        submit_in_thread(coordinator, "t1", "a", results),
+        submit_in_thread(coordinator, "t2", "b", results),
+    ]
+    for worker in workers:
+        worker.join(timeout=5)
+
+    assert results["a"][0] == "a" and results["b"][0] == "b"
+    assert sorted(services.runs) == ["t1", "t2"]
+
+
+def test_superseded_run_is_folded_into_the_next_run():
+    gate = threading.Event()
+    services = FakeServices(gate=gate, supersede_aware=True)
+    coordinator = ThreadCoordinator(services, cancel_superseded=True)
+    results = {}
+
+    first = submit_in_thread(coordinator, "t1", "primeira", results)
+    services.started.wait(timeout=5)
+    second = submit_in_thread(coordinator, "t1", "segunda", results)
+    wait_for_queue(coordinator, "t1", 1)
+    gate.set()
+    for worker in (first, second):
+        worker.join(timeout=5)
+
+    # o primeiro run foi cancelado; o segundo responde as duas mensagens
+    assert services.messages["t1"] == ["primeira", "segunda"]
+    assert results["primeira"] == results["segunda"] == ("primeira | segunda", [2])
+
+
+def test_errors_reach_coalesced_requests():
+    gate = threading.Event()
+
+    class FailingServices(FakeServices):
+        def add_user_message(self, context, content):
+            if content == "segunda":
+                raise RuntimeError("thread indisponível")
+            super().add_user_message(context, content)
+
+    services = FailingServices(gate=gate)
+    coordinator = ThreadCoordinator(services, cancel_superseded=False)
+    results, errors = {}, []
+
+    def submit(content):
+        try:
+            results[content] = coordinator.submit(
+                ConversationContext(None, thread_id="t1"), content
+            )
+        except RuntimeError as e:
+            errors.append((content, str(e)))
+
+    first = threading.Thread(target=submit, args=("primeira",))
+    first.start()
+    services.started.wait(timeout=5)
+    queued = [
+        threading.Thread(target=submit, args=(c,)) for c in ("segunda", "terceira")
+    ]
+    for worker in queued:
+        worker.start()
+    wait_for_queue(coordinator, "t1", 2)
+    gate.set()
+    for worker in [first, *queued]:
+        worker.join(timeout=5)
+
+    assert results["primeira"] == ("primeira", [1])
+    assert sorted(errors) == [
+        ("segunda", "thread indisponível"),
+        ("terceira", "thread indisponível"),
+    ]
+    assert coordinator._slots == {}
+
+
+def test_async_coordinator_coalesces_queued_messages():
+    class AsyncServices:
+        def __init__(self):
+            self.messages = []
+            self.runs = 0
+            self.release = None
+
+        async def add_user_message(self, context, content):
+            self.messages.append(content)
+
+        def prefetch_search(self, context, content):
+            pass
+
+        async def execute_assistant(self, context):
+            self.runs += 1
+            if self.runs == 1:
+                await self.release.wait()
+            context.run = SimpleNamespace(id=f"run_{self.runs}", status="completed")
+            return " | ".join(self.messages), []
+
+    async def scenario():
+        services = AsyncServices()
+        services.release = asyncio.Event()
+        coordinator = AsyncThreadCoordinator(services, cancel_superseded=False)
+
+        def submit(content):
+            context = ConversationContext(None, thread_id="t1")
+            return asyncio.create_task(coordinator.submit(context, content))
+
+        first = submit("primeira")
+        await asyncio.sleep(0)
+        queued = [submit("segunda"), submit("terceira")]
+        await asyncio.sleep(0)
+        services.release.set()
+        return services, await first, await asyncio.gather(*queued)
+
+    services, first, queued = asyncio.run(scenario())
+
+    assert services.runs == 2
+    assert first == ("primeira", [])
+    assert queued[0] == queued[1] == ("primeira | segunda | terceira", [])
+
+
+class StreamingServices:
+    """Serviços async em que o primeiro run em streaming espera ``release``."""
+
+    def __init__(self):
+        self.messages = []
+        self.runs = 0
+        self.release = asyncio.Event()
+
+    async def add_user_message(self, context, content):
+        self.messages.append(content)
+
+    def prefetch_search(self, context, content):
+        pass
+
+    async def stream_assistant(self, context):
+        self.runs += 1
+        answer = " | ".join(self.messages)
+        yield "delta", {"text": answer[:4]}
+        if self.runs == 1:
+            await self.release.wait()
+        context.run = SimpleNamespace(id=f"run_{self.runs}", status="completed")
+        yield "delta", {"text": answer[4:]}
+        yield "citations", {"citations": [self.runs]}
+
+    async def execute_assistant(self, context):
+        self.runs += 1
+        context.run = SimpleNamespace(id=f"run_{self.runs}", status="completed")
+        return " | ".join(self.messages), [self.runs]
+
+
+def _collect_stream(coordinator, content):
+    async def collect():
+        context = ConversationContext(None, thread_id="t1")
+        return [event async for event in coordinator.stream(context, content)]
+
+    return asyncio.create_task(collect())
+
+
+def test_stream_waits_for_the_active_run():
+    async def scenario():
+        services = StreamingServices()
+        coordinator = AsyncThreadCoordinator(services, cancel_superseded=False)
+
+        first = _collect_stream(coordinator, "primeira")
+        await asyncio.sleep(0)
+        second = _collect_stream(coordinator, "segunda")
+        await asyncio.sleep(0)
+        services.release.set()
+        return services, coordinator, await first, await second
+
+    services, coordinator, first, second = asyncio.run(scenario())
+
+    assert services.runs == 2
+    assert first == [
+        ("delta", {"text": "prim"}),
+        ("delta", {"text": "eira"}),
+        ("citations", {"citations": [1]}),
+    ]
+    assert second[-1] == ("citations", {"citations": [2]})
+    assert "".join(d["text"] for e, d in second if e == "delta") == (
+        "primeira | segunda"
+    )
+    assert coordinator._slots == {}
+
+
+def test_request_queued_behind_stream_gets_the_streamed_answer():
+    async def scenario():
+        services = StreamingServices()
+        coordinator = AsyncThreadCoordinator(services, cancel_superseded=False)
+
+        first = _collect_stream(coordinator, "primeira")
+        await asyncio.sleep(0)
+        queued = [
+            asyncio.create_task(
+                coordinator.submit(ConversationContext(None, thread_id="t1"), c)
+            )
+            for c in ("segunda", "terceira")
+        ]
+        await asyncio.sleep(0)
+        services.release.set()
+        await first
+        return services, await asyncio.gather(*queued)
+
+    services, queued = asyncio.run(scenario())
+
+    assert services.runs == 2
+    assert queued[0] == queued[1] == ("primeira | segunda | terceira", [2])
+
+
+def test_stream_closed_while_queued_releases_its_turn():
+    async def scenario():
+        services = StreamingServices()
+        coordinator = AsyncThreadCoordinator(services, cancel_superseded=False)
+
+        first = _collect_stream(coordinator, "primeira")
+        await asyncio.sleep(0)
+        second = _collect_stream(coordinator, "segunda")
+        await asyncio.sleep(0)
+        second.cancel()
+        services.release.set()
+        await first
+        return services, coordinator
+
+    services, coordinator = asyncio.run(scenario())
+
+    assert services.messages == ["primeira"]
+    assert coordinator._slots == {}
+
+
+def test_interrupted_stream_cancels_active_run_before_passing_the_turn():
+    class ActiveRunServices(StreamingServices):
+        def __init__(self):
+            super().__init__()
+            self.events = []
+
+        async def add_user_message(self, context, content):
+            self.events.append(f"add:{content}")
+            await super().add_user_message(context, content)
+
+        async def stream_assistant(self, context):
+            context.run = SimpleNamespace(id="run_1", status="in_progress")
+            yield "delta", {"text": "parcial"}
+            await asyncio.Event().wait()  # o run segue até o cliente desistir
+
+        async def cancel_run(self, context):
+            await asyncio.sleep(0.01)
+            context.run = SimpleNamespace(id="run_1", status="cancelled")
+            self.events.append("cancel")
+
+    async def scenario():
+        services = ActiveRunServices()
+        coordinator = AsyncThreadCoordinator(services, cancel_superseded=False)
+
+        first = _collect_stream(coordinator, "primeira")
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(
+            coordinator.submit(ConversationContext(None, thread_id="t1"), "segunda")
+        )
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+        await queued
+        return services, coordinator
+
+    services, coordinator = asyncio.run(scenario())
+
+    assert services.events == ["add:primeira", "cancel", "add:segunda"]
+    assert coordinator._slots == {}
@@ -0,0 +1,117 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import MagicMock
+from services.conversation_context import ConversationContext
+from services.tool_dispatcher import ToolDispatcher
+
+
+def _tool_call(call_id, name, arguments="{}"):
+    tool_call = MagicMock(id=call_id)
+    tool_call.function.name = name
+    tool_call.function.arguments = arguments
+    return tool_call
+
+
+class FakeAssistant:
+    def __init__(self, delays=None, failures=()):
+        self.delays = delays or {}
+        self.failures = failures
+
+    def _result(self, name):
+        if name in self.failures:
+            raise RuntimeError("boom")
+        citations = [{"id": 1}] if name == "ai_search_tool" else []
+        return {"tool_output": f"{name} ok", "citations": citations}
+
+    def metric_label(self, name):
+        return name
+
+    def call_tool_by_name(self, context, name, arguments):
+        time.sleep(self.delays.get(name, 0))
+        return self._result(name)
+
+    async def acall_tool_by_name(self, context, name, arguments):
+        await asyncio.sleep(self.delays.get(name, 0))
+        return self._result(name)
+
+
+@pytest.fixture
+def context():
+    return ConversationContext(MagicMock(), thread_id="thread_1")
+
+
+def test_dispatch_runs_tool_calls_concurrently(context):
+    dispatcher = ToolDispatcher(
+        FakeAssistant(delays={"get_weather": 0.3, "ai_search_tool": 0.3})
+    )
+    calls = [
+        _tool_call("call_1", "get_weather"),
+        _tool_call("call_2", "ai_search_tool"),
+    ]
+
+    started = time.monotonic()
+    outputs = dispatcher.dispatch(context, calls)
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 0.55
+    assert outputs == [
+        {"tool_call_id": "call_1", "output": "get_weather ok"},
+        {"tool_call_id": "call_2", "output": "ai_search_tool ok"},
+    ]
+    assert context.citations == [{"id": 1}]
+
+
+def test_dispatch_isolates_errors_and_timeouts(context):
+    dispatcher = ToolDispatcher(
+        FakeAssistant(delays={"slow_tool": 0.5}, failures=("broken_tool",)),
+        tool_timeouts={"slow_tool": 0.05},
+    )
+    calls = [
+        _tool_call("call_1", "slow_tool"),
+        _tool_call("call_2", "broken_tool"),
+        _tool_call("call_3", "get_weather"),
+    ]
+
+    outputs = dispatcher.dispatch(context, calls)
+
+    assert [output["tool_call_id"] for output in outputs] == [
+        "call_1",
+        "call_2",
+        "call_3",
+    ]
+    assert "não respondeu a tempo" in outputs[0]["output"]
+    assert "Falha ao executar" in outputs[1]["output"]
+    assert outputs[2]["output"] == "get_weather ok"
+
+
+def test_adispatch_runs_concurrently_with_timeout(context):
+    dispatcher = ToolDispatcher(
+        FakeAssistant(delays={"get_weather": 0.2, "slow_tool": 1}),
+        tool_timeouts={"slow_tool": 0.1},
+    )
+    calls = [
+        _tool_call("call_1", "get_weather"),
+        _tool_call("call_2", "get_weather"),
+        _tool_call("call_3", "slow_tool"),
+    ]
+
+    started = time.monotonic()
+    outputs = asyncio.run(dispatcher.adispatch(context, calls))
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 0.4
+    assert outputs[0]["output"] == "get_weather ok"
+    assert "não respondeu a tempo" in outputs[2]["output"]
+
+
+def test_structured_outputs_are_serialized_as_compact_json(context):
+    assistant = MagicMock()
+    assistant.call_tool_by_name.return_value = {
+        "tool_output": [{"chunk": "Olá", "score": 1.5}]
+    }
+    dispatcher = ToolDispatcher(assistant)
+
+    outputs = dispatcher.dispatch(context, [_tool_call("call_1", "ai_search_tool")])
+
+    assert outputs[0]["output"] == '[{"chunk":"Olá","score":1.5}]'
@@ -1,6 +1,7 @@
+import asyncio
 import os
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from services.tools.ai_search_tool import AISearchTool
 
 
@@ -59,8 +60,72 @@ def test_search_documents(mock_env_vars, mock_search_client):
     }
     mock_search_client.search.assert_called_once_with(
         vector_queries=[
-            {"kind": "text", "text": "test query", "fields": "text_vector", "k": 1}
+            {"kind": "text", "text": "test query", "fields": "text_vector", "k": 3}
         ],
-        top=1,
+        top=3,
         select=["chunk", "title", "metadata_storage_path"],
     )
+
+
+def test_search_documents_async(mock_env_vars, mock_search_client):
+    class AsyncResults:
+        def __init__(self, items):
+            self.items = iter(items)
+
+        def __aiter__(self):
+            return self
+
+        async def __anext__(self):
+            try:
+                return next(self.items)
+            except StopIteration:
+                raise StopAsyncIteration
+
+    with patch("services.tools.ai_search_tool.AsyncSearchClient") as MockAsyncClient:
+        mock_async_client = MockAsyncClient.return_value
+        mock_async_client.search = AsyncMock(
+            return_value=AsyncResults(
+                [{"chunk": "Async chunk.", "title": "T", "metadata_storage_path": "p"}]
+            )
+        )
+        tool = AISearchTool()
+        results = asyncio.run(tool.aexecute(query="test query", k_results=1))
+
+    assert results["tool_output"][0]["chunk"] == "Async chunk."
+    assert results["citations"][0]["filename"] == "T"
+    mock_search_client.search.assert_not_called()
+
+
+def test_repeated_query_is_served_from_cache(mock_env_vars, mock_search_client):
+    mock_search_client.search.return_value = [
+        {"chunk": "Chunk.", "title": "T", "metadata_storage_path": "p"}
+    ]
+    tool = AISearchTool()
+
+    first = tool.execute(query="Test query", k_results=1)
+    second = tool.execute(query="test  query?", k_results=1)
+
+    assert first == second
+    mock_search_client.search.assert_called_once()
+    assert tool.cache.stats()["hits"] == 1
+
+
+def test_results_are_deduplicated_and_packed(mock_env_vars, mock_search_client):
+    long_chunk = "Primeira frase relevante. " + "Texto de preenchimento. " * 200
+    mock_search_client.search.return_value = [
+        {"chunk": long_chunk, "title": "A", "@search.score": 3.0},
+        {"chunk": long_chunk, "title": "A copy", "@search.score": 2.9},
+        {"chunk": "Outro assunto diferente.", "title": "B", "@search.score": 1.0},
+    ]
+    tool = AISearchTool()
+    tool.token_budget = 100
+
+    results = tool.execute(query="pergunta", k_results=3)
+
+    titles = [r["title"] for r in results["tool_output"]]
+    assert titles == ["A", "B"]
+    first_chunk = results["tool_output"][0]["chunk"]
+    assert first_chunk.startswith("Primeira frase relevante.")
+    assert first_chunk.endswith(".")
+    assert len(first_chunk) < len(long_chunk)
+    assert [c["id"] for c in results["citations"]] == [1, 2]
@@ -0,0 +1,127 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from services.tools.get_incident_status_tool import GetIncidentStatusTool
+
+
+def _response(records, status_code=200):
+    response = MagicMock()
+    response.status_code = status_code
+    response.json.return_value = {"result": records}
+    response.text = "erro"
+    return response
+
+
+@pytest.fixture
+def transport():
+    return MagicMock()
+
+
+@pytest.fixture
+def tool(transport):
+    with patch.dict(
+        "os.environ",
+        {
+            "SN_INSTANCE_URL": "https://sn.example.com",
+            "SN_INCIDENT_FIELDS": "u_state,u_priority",
+        },
+    ):
+        return GetIncidentStatusTool(transport=transport)
+
+
+def test_single_incident_keeps_record_output(tool, transport):
+    record = {"u_number": "INC00000001", "u_state": "Aberto"}
+    transport.get.return_value = _response([record])
+
+    result = tool.execute(incident_number="INC00000001")
+
+    assert result == {"tool_output": record}
+    params = transport.get.call_args.kwargs["params"]
+    assert params["sysparm_query"] == "u_numberININC00000001"
+    assert params["sysparm_fields"] == "u_number,u_state,u_priority"
+
+
+def test_multiple_incidents_resolved_in_one_call(tool, transport):
+    transport.get.return_value = _response(
+        [
+            {"u_number": "INC00000001", "u_state": "Aberto"},
+            {"u_number": "INC00000003", "u_state": "Fechado"},
+        ]
+    )
+
+    result = tool.execute(
+        incident_numbers=["INC00000001", "INC00000002", "INC00000003", "INC00000001"]
+    )
+
+    transport.get.assert_called_once()
+    params = transport.get.call_args.kwargs["params"]
+    assert params["sysparm_query"] == "u_numberININC00000001,INC00000002,INC00000003"
+    assert params["sysparm_limit"] == 3
+    output = result["tool_output"]
+    assert list(output["incidents"]) == ["INC00000001", "INC00000003"]
+    assert output["not_found"] == ["INC00000002"]
+
+
+def test_cached_records_skip_the_api(tool, transport):
+    transport.get.return_value = _response(
+        [{"u_number": "INC00000001", "u_state": "Aberto"}]
+    )
+    tool.execute(incident_number="INC00000001")
+
+    transport.get.return_value = _response(
+        [{"u_number": "INC00000002", "u_state": "Fechado"}]
+    )
+    result = tool.execute(incident_numbers=["INC00000001", "INC00000002"])
+
+    assert transport.get.call_count == 2
+    params = transport.get.call_args.kwargs["params"]
+    assert params["sysparm_query"] == "u_numberININC00000002"
+    assert set(result["tool_output"]["incidents"]) == {"INC00000001", "INC00000002"}
+
+
+def test_not_found_is_not_cached(tool, transport):
+    transport.get.return_value = _response([])
+
+    result = tool.execute(incident_number="INC00000009")
+    tool.execute(incident_number="INC00000009")
+
+    assert "Nenhum incidente" in result["tool_output"]["message"]
+    assert transport.get.call_count == 2
+
+
+def test_invalid_number_returns_error_without_calling_api(tool, transport):
+    result = tool.execute(incident_numbers=["INC123"])
+
+    assert "inválido" in result["tool_output"]["error"]
+    transport.get.assert_not_called()
+
+
+def test_http_error_returns_error(tool, transport):
+    transport.get.return_value = _response([], status_code=500)
+
+    result = tool.execute(incident_number="INC00000001")
+
+    assert "500" in result["tool_output"]["error"]
+
+
+def test_missing_number_returns_error(tool):
+    result = tool.execute()
+
+    assert "error" in result["tool_output"]
+
+
+def test_instance_host_is_configured_on_the_transport(transport):
+    with patch.dict(
+        "os.environ",
+        {
+            "SN_INSTANCE_URL": "https://sn.example.com",
+            "SN_POOL_MAXSIZE": "20",
+            "SN_MAX_CONCURRENCY": "5",
+        },
+    ):
+        GetIncidentStatusTool(transport=transport)
+
+    transport.configure_host.assert_called_once_with(
+        "https://sn.example.com", pool_maxsize=20, max_concurrency=5
+    )
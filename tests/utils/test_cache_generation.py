@@ -0,0 +1,39 @@
+from utils.cache_generation import CacheGeneration
+from utils.search_cache import SearchResultCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bump_is_seen_by_other_instances_after_check_interval(tmp_path):
+    path = str(tmp_path / "generation")
+    clock = FakeClock()
+    a = CacheGeneration(path=path, check_seconds=10, clock=clock)
+    b = CacheGeneration(path=path, check_seconds=10, clock=clock)
+
+    assert a.current() == b.current() == "0"
+    new = a.bump()
+    assert a.current() == new
+    assert b.current() == "0"
+
+    clock.now = 10
+    assert b.current() == new
+
+
+def test_search_cache_misses_after_generation_bump(tmp_path):
+    generation = CacheGeneration(path=str(tmp_path / "generation"), check_seconds=0)
+    cache = SearchResultCache(
+        max_size=8, ttl_seconds=60, similarity_threshold=0, generation=generation
+    )
+    cache.set("como abrir um chamado", 3, "index", {"tool_output": ["r"]})
+    assert cache.get("como abrir um chamado", 3, "index") == {"tool_output": ["r"]}
+
+    # outra instância invalida os caches gravando no mesmo arquivo
+    CacheGeneration(path=generation.path).bump()
+
+    assert cache.get("como abrir um chamado", 3, "index") is None
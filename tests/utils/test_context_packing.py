@@ -0,0 +1,76 @@
+from utils.context_packing import (
+    drop_near_duplicates,
+    estimate_tokens,
+    mmr_rerank,
+    pack_context,
+    truncate_to_budget,
+)
+
+
+def test_truncate_to_budget_cuts_at_sentence_boundary():
+    text = "Primeira frase. Segunda frase maior que a primeira. Terceira."
+
+    truncated = truncate_to_budget(text, max_tokens=10)
+
+    assert truncated == "Primeira frase."
+    assert truncate_to_budget(text, max_tokens=1000) == text
+    assert truncate_to_budget(text, max_tokens=1) == ""
+
+
+def test_truncate_to_budget_cuts_long_sentence_at_word_boundary():
+    text = "tabela " * 800
+
+    truncated = truncate_to_budget(text, max_tokens=600)
+
+    assert truncated
+    assert estimate_tokens(truncated) <= 600
+    assert set(truncated.split(" ")) == {"tabela"}
+
+
+def test_pack_context_keeps_chunk_without_fitting_sentence():
+    candidates = [
+        {"chunk": "tabela " * 800, "score": 3, "title": "A"},
+        {"chunk": "Outro. Texto.", "score": 1, "title": "B"},
+    ]
+
+    packed = pack_context(candidates, k=3, token_budget=600)
+
+    assert [c["title"] for c in packed] == ["A", "B"]
+    assert sum(estimate_tokens(c["chunk"]) for c in packed) <= 600
+
+
+def test_drop_near_duplicates_keeps_highest_score():
+    candidates = [
+        {"chunk": "como abrir um chamado no portal", "score": 1.0},
+        {"chunk": "como abrir um chamado no portal!", "score": 2.0},
+        {"chunk": "horário de atendimento", "score": 0.5},
+    ]
+
+    kept = drop_near_duplicates(candidates, threshold=0.85)
+
+    assert [c["score"] for c in kept] == [2.0, 0.5]
+
+
+def test_mmr_prefers_diverse_chunks():
+    candidates = [
+        {"chunk": "reset de senha no portal", "score": 1.0},
+        {"chunk": "reset de senha no portal corporativo", "score": 0.95},
+        {"chunk": "vpn para acesso remoto", "score": 0.8},
+    ]
+
+    reranked = mmr_rerank(candidates, k=2, mmr_lambda=0.5)
+
+    assert [c["score"] for c in reranked] == [1.0, 0.8]
+
+
+def test_pack_context_respects_token_budget():
+    candidates = [
+        {"chunk": "Frase um. " * 50, "score": 2.0},
+        {"chunk": "Outra coisa. " * 50, "score": 1.0},
+    ]
+
+    packed = pack_context(candidates, k=2, token_budget=40)
+
+    total = sum(estimate_tokens(c["chunk"]) for c in packed)
+    assert total <= 40
+    assert all(c["chunk"].endswith(".") for c in packed)
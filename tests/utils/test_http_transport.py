@@ -0,0 +1,89 @@
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from utils.http_transport import HostBusyError, HttpTransport, IDEMPOTENT_METHODS
+
+
+@pytest.fixture
+def transport():
+    transport = HttpTransport(
+        pool_maxsize=4,
+        connect_timeout=0.05,
+        read_timeout=2,
+        retries=2,
+        max_concurrency_per_host=1,
+    )
+    transport.session = MagicMock()
+    return transport
+
+
+def test_request_applies_default_timeout(transport):
+    transport.get("https://example.com/api")
+
+    transport.session.request.assert_called_once_with(
+        "GET", "https://example.com/api", timeout=(0.05, 2)
+    )
+
+
+def test_request_keeps_explicit_timeout(transport):
+    transport.post("https://example.com/api", json={}, timeout=5)
+
+    transport.session.request.assert_called_once_with(
+        "POST", "https://example.com/api", json={}, timeout=5
+    )
+
+
+def test_retry_only_for_idempotent_methods():
+    transport = HttpTransport(retries=3)
+    retry = transport.session.get_adapter("https://example.com").max_retries
+
+    assert retry.total == 3
+    assert "GET" in retry.allowed_methods
+    assert "POST" not in retry.allowed_methods
+    assert set(retry.allowed_methods) == set(IDEMPOTENT_METHODS)
+
+
+def test_host_concurrency_limit_raises_host_busy(transport):
+    entered = threading.Event()
+    release = threading.Event()
+
+    def slow_request(*args, **kwargs):
+        entered.set()
+        release.wait(1)
+        return MagicMock()
+
+    transport.session.request.side_effect = slow_request
+    worker = threading.Thread(target=transport.get, args=("https://slow.com/a",))
+    worker.start()
+    entered.wait(1)
+    try:
+        with pytest.raises(HostBusyError):
+            transport.get("https://slow.com/b")
+        # outro host não é afetado pelo limite
+        transport.session.request.side_effect = None
+        transport.get("https://fast.com/a")
+    finally:
+        release.set()
+        worker.join()
+
+
+def test_configure_host_overrides_limit(transport):
+    transport.configure_host("https://sn.example.com", max_concurrency=3)
+
+    assert transport._semaphore_for("sn.example.com")._initial_value == 3
+    assert transport._semaphore_for("other.com")._initial_value == 1
+
+
+def test_tools_use_shared_transport():
+    from services.tools.get_incident_status_tool import GetIncidentStatusTool
+
+    fake_transport = MagicMock()
+    fake_transport.get.side_effect = HostBusyError("ocupado")
+    tool = GetIncidentStatusTool(transport=fake_transport)
+
+    result = tool.get_incident_status("INC00010001")
+
+    assert "error" in result["tool_output"]
+    fake_transport.get.assert_called_once()
@@ -0,0 +1,99 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from utils.metrics import MetricsRegistry, record_run, RUN_POLLS, RUN_STATUS
+from utils.metrics import REQUEST_LATENCY, track_request
+
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+
+def test_counter_renders_prometheus_text(registry):
+    calls = registry.counter("tool_calls", "Chamadas.", ("tool",))
+    calls.inc(tool="ai_search_tool")
+    calls.inc(2, tool="ai_search_tool")
+    calls.inc(tool='na"me')
+
+    text = registry.render()
+
+    assert "# HELP tool_calls Chamadas." in text
+    assert "# TYPE tool_calls counter" in text
+    assert 'tool_calls_total{tool="ai_search_tool"} 3' in text
+    assert 'tool_calls_total{tool="na\\"me"} 1' in text
+
+
+def test_histogram_renders_cumulative_buckets(registry):
+    latency = registry.histogram("latency_seconds", "Latência.", buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.7, 3):
+        latency.observe(value)
+
+    lines = registry.render().splitlines()
+
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="1"} 3' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+    assert "latency_seconds_sum 4.25" in lines
+    assert "latency_seconds_count 4" in lines
+
+
+def test_registering_same_name_returns_existing_metric(registry):
+    first = registry.counter("runs", "Runs.")
+    assert registry.counter("runs", "Runs.") is first
+
+
+def test_record_run_counts_status_and_polls():
+    context = SimpleNamespace(run=SimpleNamespace(status="expired"), poll_count=4)
+    before = RUN_STATUS.value(status="expired")
+    polls_before = RUN_POLLS.count()
+
+    record_run(context)
+
+    assert RUN_STATUS.value(status="expired") == before + 1
+    assert RUN_POLLS.count() == polls_before + 1
+
+
+def test_track_request_observes_sync_async_and_errors():
+    @track_request("metrics_test")
+    def ok(req):
+        return SimpleNamespace(status_code=400)
+
+    @track_request("metrics_test")
+    async def aok(req):
+        return SimpleNamespace(status_code=200)
+
+    @track_request("metrics_test")
+    def boom(req):
+        raise RuntimeError("falha")
+
+    ok(None)
+    asyncio.run(aok(None))
+    with pytest.raises(RuntimeError):
+        boom(None)
+
+    assert asyncio.iscoroutinefunction(aok)
+    assert REQUEST_LATENCY.count(route="metrics_test", status="400") == 1
+    assert REQUEST_LATENCY.count(route="metrics_test", status="200") == 1
+    assert REQUEST_LATENCY.count(route="metrics_test", status="500") == 1
+
+
+def test_track_request_measures_streams_until_the_last_event():
+    async def body():
+        yield "thread"
+        yield "delta"
+
+    @track_request("metrics_stream_test")
+    async def stream(req):
+        return SimpleNamespace(status_code=200, body_iterator=body())
+
+    async def consume():
+        response = await stream(None)
+        # headers devolvidos, stream ainda não consumido: nada medido
+        assert REQUEST_LATENCY.count(route="metrics_stream_test", status="200") == 0
+        return [chunk async for chunk in response.body_iterator]
+
+    assert asyncio.run(consume()) == ["thread", "delta"]
+    assert REQUEST_LATENCY.count(route="metrics_stream_test", status="200") == 1
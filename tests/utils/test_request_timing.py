@@ -0,0 +1,75 @@
+import threading
+
+from utils.request_timing import RequestTimer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def test_phases_build_waterfall_and_server_timing():
+    clock = FakeClock()
+    timer = RequestTimer(clock=clock)
+
+    with timer.phase("threads.retrieve"):
+        clock.advance(0.05)
+    with timer.phase("run.create") as details:
+        clock.advance(1.2)
+        details["polls"] = 3
+    timer.record("tool.ai_search_tool", 200, started=0.06)
+
+    phases = timer.as_dict()["phases"]
+    assert [p["name"] for p in phases] == [
+        "threads.retrieve",
+        "run.create",
+        "tool.ai_search_tool",
+    ]
+    assert phases[1] == {
+        "name": "run.create",
+        "start_ms": 50.0,
+        "duration_ms": 1200.0,
+        "polls": 3,
+    }
+    assert timer.server_timing() == (
+        "threads.retrieve;dur=50.0, run.create;dur=1200.0, "
+        "tool.ai_search_tool;dur=200.0, total;dur=1250.0"
+    )
+
+
+def test_phase_is_recorded_when_block_raises():
+    timer = RequestTimer()
+    try:
+        with timer.phase("messages.list"):
+            raise RuntimeError("falha")
+    except RuntimeError:
+        pass
+
+    assert [p["name"] for p in timer.entries] == ["messages.list"]
+
+
+def test_server_timing_sanitizes_names():
+    timer = RequestTimer()
+    timer.record("tool.get weather;x", 1)
+
+    assert timer.server_timing().startswith("tool.get_weather_x;dur=1.0")
+
+
+def test_record_is_thread_safe():
+    timer = RequestTimer()
+    threads = [
+        threading.Thread(target=lambda: [timer.record("tool.x", 1) for _ in range(100)])
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(timer.entries) == 800
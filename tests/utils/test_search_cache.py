@@ -0,0 +1,31 @@
+from utils.search_cache import SearchResultCache
+
+
+def test_exact_hit_uses_normalized_query():
+    cache = SearchResultCache(max_size=8, ttl_seconds=60, similarity_threshold=0)
+    cache.set("Como abrir um chamado?", 3, "index", {"tool_output": ["r"]})
+
+    assert cache.get("  como ABRIR um chamado ", 3, "index") == {"tool_output": ["r"]}
+    assert cache.get("como abrir um chamado", 5, "index") is None
+    assert cache.get("como abrir um chamado", 3, "other") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_near_duplicate_mode():
+    cache = SearchResultCache(max_size=8, ttl_seconds=60, similarity_threshold=0.8)
+    cache.set("como abrir um chamado no portal", 3, "index", {"tool_output": ["r"]})
+
+    assert cache.get("como abrir um chamado pelo portal", 3, "index") is None
+    assert cache.get("como eu abrir um chamado no portal", 3, "index") == {
+        "tool_output": ["r"]
+    }
+    assert cache.stats()["near_hits"] == 1
+
+
+def test_clear_invalidates_everything():
+    cache = SearchResultCache(max_size=8, ttl_seconds=60)
+    cache.set("query", 3, "index", {"tool_output": []})
+    cache.clear()
+
+    assert cache.get("query", 3, "index") is None
@@ -0,0 +1,84 @@
+import builtins
+import sys
+
+from utils.startup_profiler import StartupProfiler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def test_phases_record_duration_start_and_nesting():
+    clock = FakeClock()
+    profiler = StartupProfiler(clock=clock)
+
+    clock.advance(0.01)
+    with profiler.phase("assistant"):
+        with profiler.phase("assistant.resolve"):
+            clock.advance(0.2)
+        clock.advance(0.05)
+
+    inner, outer = profiler.phases
+    assert inner == {
+        "name": "assistant.resolve",
+        "start_ms": 10.0,
+        "duration_ms": 200.0,
+        "depth": 1,
+    }
+    assert outer["name"] == "assistant"
+    assert outer["duration_ms"] == 250.0
+    assert outer["depth"] == 0
+
+
+def test_finish_summarizes_top_level_phases_and_eager_tools():
+    clock = FakeClock()
+    profiler = StartupProfiler(clock=clock)
+    with profiler.phase("imports"):
+        clock.advance(0.3)
+        with profiler.phase("nested"):
+            pass
+    profiler.record_tool("AISearchTool", 12.34)
+    profiler.record_tool("WeatherSimulationTool", 1, lazy=True)
+    clock.advance(0.1)
+
+    assert profiler.finish() == 400.0
+    assert profiler.summary() == (
+        "Startup em 400 ms: imports=300ms tools=[AISearchTool=12ms]"
+    )
+    data = profiler.as_dict()
+    assert data["total_ms"] == 400.0
+    assert data["tools"]["WeatherSimulationTool"] == {"duration_ms": 1, "lazy": True}
+
+
+def test_track_imports_times_new_modules_and_restores_import():
+    profiler = StartupProfiler()
+    original_import = builtins.__import__
+    sys.modules.pop("colorsys", None)
+
+    profiler.track_imports(enabled=True)
+    try:
+        import colorsys  # noqa: F401
+        import json  # noqa: F401  (já carregado: não conta)
+    finally:
+        profiler.stop_tracking_imports()
+
+    assert "colorsys" in profiler.imports
+    assert "json" not in profiler.imports
+    assert builtins.__import__ is original_import
+
+
+def test_track_imports_disabled_by_default(monkeypatch):
+    monkeypatch.delenv("STARTUP_PROFILE_IMPORTS", raising=False)
+    profiler = StartupProfiler()
+    original_import = builtins.__import__
+
+    profiler.track_imports()
+
+    assert builtins.__import__ is original_import
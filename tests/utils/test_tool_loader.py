@@ -1,8 +1,15 @@
+import asyncio
+import json
 import pytest
 import importlib
 import pkgutil
 from unittest.mock import MagicMock, patch
-from utils.tool_loader import get_enabled_tools_from_config, load_tools_from_package
+from utils.tool_loader import (
+    LazyTool,
+    get_enabled_tools_from_config,
+    load_tools_from_package,
+    read_tools_manifest,
+)
 from interfaces.tool_base import AssistantToolBase
 
 
@@ -66,9 +73,9 @@ def test_load_tools_from_package():
     mock_module.MockTool = MockTool
 
     with patch(
-        "pkgutil.iter_modules", return_value=[(None, "mock_module", None)]
-    ), patch("importlib.import_module", return_value=mock_module), patch(
         "utils.tool_loader.get_enabled_tools_from_config", return_value=["mock_module"]
+    ), patch("pkgutil.iter_modules", return_value=[(None, "mock_module", None)]), patch(
+        "importlib.import_module", return_value=mock_module
     ), patch(
         "inspect.getmembers", return_value=[("MockTool", MockTool)]
     ):
@@ -88,3 +95,103 @@ def test_load_tools_from_package_no_enabled_tools():
     with patch("utils.tool_loader.get_enabled_tools_from_config", return_value=[]):
         tools = load_tools_from_package(mock_package)
         assert tools == [], "Should return an empty list if no tools are enabled"
+
+
+MOCK_SCHEMA = MockTool().get_tool_infos()
+
+
+@pytest.fixture
+def manifest_package(tmp_path):
+    """Pacote falso com um manifest declarando o MockTool deste módulo."""
+    manifest = {"test_tool_loader": {"class": "MockTool", "schema": MOCK_SCHEMA}}
+    (tmp_path / "manifest.json").write_text(json.dumps(manifest))
+    package = MagicMock()
+    package.__path__ = [str(tmp_path)]
+    package.__name__ = "tests.utils"
+    return package
+
+
+def test_load_tools_from_manifest_is_lazy(manifest_package):
+    with patch(
+        "utils.tool_loader.get_enabled_tools_from_config",
+        return_value=["test_tool_loader"],
+    ), patch("utils.tool_loader.importlib.import_module") as mock_import:
+        tools = load_tools_from_package(manifest_package, lazy=True)
+        mock_import.assert_not_called()
+
+    assert len(tools) == 1
+    assert isinstance(tools[0], LazyTool)
+    assert tools[0].get_tool_infos() == MOCK_SCHEMA
+    assert tools[0].tool is None
+
+
+def test_lazy_tool_with_missing_env_is_not_advertised(tmp_path, monkeypatch):
+    manifest = {
+        "test_tool_loader": {
+            "class": "MockTool",
+            "schema": MOCK_SCHEMA,
+            "required_env": ["MOCK_TOOL_API_KEY"],
+        }
+    }
+    (tmp_path / "manifest.json").write_text(json.dumps(manifest))
+    package = MagicMock()
+    package.__path__ = [str(tmp_path)]
+    package.__name__ = "tests.utils"
+    monkeypatch.delenv("MOCK_TOOL_API_KEY", raising=False)
+
+    with patch(
+        "utils.tool_loader.get_enabled_tools_from_config",
+        return_value=["test_tool_loader"],
+    ), patch("utils.tool_loader.importlib.import_module") as mock_import:
+        assert load_tools_from_package(package, lazy=True) == []
+        monkeypatch.setenv("MOCK_TOOL_API_KEY", "key")
+        tools = load_tools_from_package(package, lazy=True)
+        mock_import.assert_not_called()
+
+    assert [tool.get_tool_infos() for tool in tools] == [MOCK_SCHEMA]
+
+
+def test_lazy_tool_loads_on_first_execute(manifest_package):
+    with patch(
+        "utils.tool_loader.get_enabled_tools_from_config",
+        return_value=["test_tool_loader"],
+    ):
+        tool = load_tools_from_package(manifest_package, lazy=True)[0]
+
+    assert tool.execute() == "executed"
+    loaded = tool.tool
+    assert type(loaded).__name__ == "MockTool"
+    assert asyncio.run(tool.aexecute()) == "executed"
+    assert tool.tool is loaded
+
+
+def test_lazy_loading_disabled_imports_eagerly(manifest_package):
+    with patch(
+        "utils.tool_loader.get_enabled_tools_from_config",
+        return_value=["test_tool_loader"],
+    ):
+        tools = load_tools_from_package(manifest_package, lazy=False)
+
+    assert [type(tool).__name__ for tool in tools] == ["MockTool"]
+
+
+def test_manifest_matches_tool_schemas(monkeypatch):
+    """O manifest versionado precisa refletir o schema atual de cada ferramenta."""
+    from services import tools as tools_package
+
+    monkeypatch.setenv("AZURE_AI_SEARCH_API_KEY", "test_key")
+    monkeypatch.setenv("AZURE_AI_SEARCH_ENDPOINT", "https://example.com")
+    monkeypatch.setenv("AZURE_AI_SEARCH_INDEX", "test_index")
+    manifest = read_tools_manifest(tools_package)
+    assert manifest, "services/tools/manifest.json deve existir"
+
+    with patch("services.tools.ai_search_tool.SearchClient"):
+        for module_name, entry in manifest.items():
+            module = importlib.import_module(f"services.tools.{module_name}")
+            tool = getattr(module, entry["class"])()
+            assert entry["schema"] == json.loads(
+                json.dumps(tool.get_tool_infos())
+            ), f"Regenere o manifest: python -m utils.tool_loader ({module_name})"
+            assert entry.get("required_env", []) == list(
+                tool.required_env
+            ), f"Regenere o manifest: python -m utils.tool_loader ({module_name})"
@@ -0,0 +1,103 @@
+import asyncio
+import json
+
+import azure.functions as func
+import pytest
+
+from utils import trace_recorder
+from utils.trace_recorder import TraceRecorder, parse_server_timing, record_traces
+
+
+def make_request(body):
+    return func.HttpRequest(
+        method="POST",
+        url="/api/chatbotapi",
+        body=json.dumps(body).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+
+
+def make_response(thread_id, status_code=200):
+    return func.HttpResponse(
+        json.dumps({"threadId": thread_id, "answer": "ok", "citations": []}),
+        status_code=status_code,
+        headers={"Server-Timing": "run.create;dur=12.5, total;dur=20.1"},
+    )
+
+
+@pytest.fixture
+def recording(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setenv("TRACE_RECORDING_ENABLED", "true")
+    monkeypatch.setattr(trace_recorder, "_recorder", TraceRecorder(path=str(path)))
+    return path
+
+
+def read_traces(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_parse_server_timing():
+    assert parse_server_timing("a;dur=1.5, tool.x;dur=2, total;dur=3.5") == [
+        {"name": "a", "duration_ms": 1.5},
+        {"name": "tool.x", "duration_ms": 2.0},
+        {"name": "total", "duration_ms": 3.5},
+    ]
+    assert parse_server_timing(None) == []
+
+
+def test_record_traces_writes_request_and_response(recording):
+    @record_traces("chatbotapi")
+    def route(req):
+        return make_response("thread_1")
+
+    route(make_request({"role": "user", "content": "Oi"}))
+    route(make_request({"role": "user", "content": "E aí?", "threadId": "thread_1"}))
+
+    first, follow_up = read_traces(recording)
+    assert first["route"] == "chatbotapi"
+    assert first["request"] == {"role": "user", "content": "Oi", "threadId": None}
+    assert first["threadId"] == "thread_1"
+    assert first["status"] == 200
+    assert first["phases"][0] == {"name": "run.create", "duration_ms": 12.5}
+    assert follow_up["request"]["threadId"] == "thread_1"
+    assert follow_up["ts"] >= first["ts"]
+
+
+def test_record_traces_wraps_async_routes(recording):
+    @record_traces("chatbotapi_async")
+    async def route(req):
+        return make_response("thread_9")
+
+    response = asyncio.run(route(make_request({"role": "user", "content": "Oi"})))
+
+    assert response.status_code == 200
+    assert read_traces(recording)[0]["route"] == "chatbotapi_async"
+
+
+def test_record_traces_skips_invalid_json(recording):
+    @record_traces("chatbotapi")
+    def route(req):
+        return func.HttpResponse("Invalid JSON", status_code=400)
+
+    route(func.HttpRequest(method="POST", url="/api/chatbotapi", body=b"{"))
+
+    assert not recording.exists()
+
+
+def test_recording_is_disabled_by_default(monkeypatch):
+    monkeypatch.delenv("TRACE_RECORDING_ENABLED", raising=False)
+
+    assert trace_recorder.get_trace_recorder() is None
+
+
+def test_sampling_keeps_whole_conversations(tmp_path):
+    recorder = TraceRecorder(path=str(tmp_path / "t.jsonl"), sample_rate=0.5)
+    thread_ids = [f"thread_{i}" for i in range(200)]
+
+    sampled = [thread_id for thread_id in thread_ids if recorder.sampled(thread_id)]
+
+    assert 50 < len(sampled) < 150
+    # a mesma conversa sempre tem a mesma decisão
+    assert all(recorder.sampled(thread_id) for thread_id in sampled)
+    assert not TraceRecorder(sample_rate=0).sampled("thread_1")
@@ -0,0 +1,110 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Cache em memória com despejo LRU e expiração por TTL, seguro para threads.
+
+    Os contadores de acertos e falhas ficam disponíveis em ``stats()``.
+    Attributes:
+        max_size (int): Maximum number of entries kept (least recently used is evicted).
+        ttl_seconds (float): Time to live of each entry; None disables expiration.
+    """
+
+    def __init__(self, max_size=256, ttl_seconds=300, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """Retorna o valor da chave, ou ``default`` se ausente ou expirado."""
+        with self._lock:
+            value = self._get_locked(key)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (self._expires_at(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return default if entry is None else entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def find(self, predicate):
+        """
+        Procura a entrada válida mais recente cuja chave satisfaça ``predicate``.
+
+        Conta como acerto ou falha, como ``get``.
+
+        :return: Tupla (chave, valor) ou None.
+        """
+        with self._lock:
+            now = self._clock()
+            for key in reversed(list(self._data)):
+                expires_at, value = self._data[key]
+                if expires_at is not None and expires_at <= now:
+                    continue
+                if predicate(key):
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return key, value
+            self.misses += 1
+            return None
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / total if total else 0.0,
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._get_locked(key) is not _MISSING
+
+    def _get_locked(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return _MISSING
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= self._clock():
+            del self._data[key]
+            return _MISSING
+        self._data.move_to_end(key)
+        return value
+
+    def _expires_at(self):
+        if self.ttl_seconds is None:
+            return None
+        return self._clock() + self.ttl_seconds
+
+
+_MISSING = object()
@@ -0,0 +1,93 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+
+class CacheGeneration:
+    """
+    Geração compartilhada dos caches de respostas e de resultados de busca.
+
+    A geração faz parte da chave dos dois caches; ``bump`` grava uma geração nova
+    e as entradas antigas deixam de ser encontradas (e expiram pelo TTL). Ela fica
+    num arquivo (``CACHE_GENERATION_PATH``), relido no máximo a cada
+    ``CACHE_GENERATION_CHECK_SECONDS``. Com o arquivo num armazenamento
+    compartilhado (ex.: ``$HOME/data`` no App Service), uma invalidação em uma
+    instância vale para todas após esse intervalo. No padrão (diretório
+    temporário), a invalidação só vale para a instância que a recebeu.
+    Attributes:
+        path (str): File holding the current generation token.
+        check_seconds (float): Minimum interval between two reads of the file.
+    """
+
+    def __init__(self, path=None, check_seconds=None, clock=time.monotonic):
+        self.path = (
+            path
+            or os.getenv("CACHE_GENERATION_PATH")
+            or os.path.join(tempfile.gettempdir(), "rag_cache_generation")
+        )
+        self.check_seconds = (
+            check_seconds
+            if check_seconds is not None
+            else float(os.getenv("CACHE_GENERATION_CHECK_SECONDS", "10"))
+        )
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._value = None
+        self._checked_at = None
+
+    def current(self):
+        """:return: A geração atual (string; "0" se nunca houve invalidação)."""
+        with self._lock:
+            now = self._clock()
+            if self._checked_at is None or now - self._checked_at >= self.check_seconds:
+                self._value = self._read() or self._value or "0"
+                self._checked_at = now
+            return self._value
+
+    def bump(self):
+        """
+        Grava uma geração nova, invalidando os caches de todas as instâncias que
+        leem o mesmo arquivo.
+
+        :return: A nova geração.
+        """
+        value = uuid.uuid4().hex
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                file.write(value)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.error(f"Não foi possível gravar a geração dos caches: {e}")
+        with self._lock:
+            self._value = value
+            self._checked_at = self._clock()
+        logging.info(f"Nova geração dos caches: {value}")
+        return value
+
+    def _read(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                return file.read().strip() or None
+        except OSError:
+            return None
+
+
+_generation = None
+_generation_lock = threading.Lock()
+
+
+def get_cache_generation():
+    """Geração dos caches do processo (compartilhada pelos caches)."""
+    global _generation
+    if _generation is None:
+        with _generation_lock:
+            if _generation is None:
+                _generation = CacheGeneration()
+    return _generation
@@ -0,0 +1,124 @@
+import re
+
+from utils.text import jaccard_similarity, token_set
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?;:])\s+|\n+")
+
+
+def estimate_tokens(text):
+    """
+    Estimativa barata da quantidade de tokens de um texto (~4 caracteres por token).
+    """
+    return (len(text) + 3) // 4
+
+
+def split_sentences(text):
+    """Divide o texto em sentenças, preservando a pontuação final."""
+    return [sentence for sentence in _SENTENCE_END_RE.split(text.strip()) if sentence]
+
+
+def truncate_to_budget(text, max_tokens):
+    """
+    Corta o texto no limite de tokens, em fim de sentença. Se nem a primeira
+    sentença couber (ex.: uma tabela sem pontuação), corta-a em fim de palavra.
+
+    :return: O texto truncado; vazio se nem a primeira palavra couber.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text.strip()
+    sentences = split_sentences(text)
+    kept = []
+    used = 0
+    for sentence in sentences:
+        cost = estimate_tokens(sentence) + 1
+        if used + cost > max_tokens:
+            break
+        kept.append(sentence)
+        used += cost
+    if not kept and sentences:
+        return _truncate_words(sentences[0], max_tokens)
+    return " ".join(kept)
+
+
+def _truncate_words(text, max_tokens):
+    kept = []
+    used = 0
+    for word in text.split():
+        cost = estimate_tokens(word) + 1
+        if used + cost > max_tokens:
+            break
+        kept.append(word)
+        used += cost
+    return " ".join(kept)
+
+
+def drop_near_duplicates(candidates, threshold):
+    """
+    Remove candidatos cujo texto é quase igual ao de um candidato mais relevante.
+
+    :param candidates: Lista de dicionários com ``chunk`` e ``score``, em qualquer ordem.
+    :param threshold: Similaridade (Jaccard) a partir da qual dois chunks são duplicados.
+    """
+    kept = []
+    for candidate in sorted(candidates, key=lambda c: c.get("score", 0), reverse=True):
+        tokens = token_set(candidate.get("chunk", ""))
+        if all(jaccard_similarity(tokens, other) < threshold for _, other in kept):
+            kept.append((candidate, tokens))
+    return [candidate for candidate, _ in kept]
+
+
+def mmr_rerank(candidates, k, mmr_lambda):
+    """
+    Reordena por Maximal Marginal Relevance: equilibra relevância (score da busca,
+    normalizado) e diversidade (similaridade com os chunks já escolhidos).
+
+    :param mmr_lambda: 1 considera só relevância; 0 só diversidade.
+    :return: Até ``k`` candidatos, na ordem de seleção.
+    """
+    max_score = max((c.get("score", 0) or 0 for c in candidates), default=0)
+    pool = [
+        (
+            candidate,
+            (candidate.get("score", 0) or 0) / max_score if max_score else 1.0,
+            token_set(candidate.get("chunk", "")),
+        )
+        for candidate in candidates
+    ]
+    selected = []
+    while pool and len(selected) < k:
+        best_index, best_value = 0, None
+        for index, (_, relevance, tokens) in enumerate(pool):
+            redundancy = max(
+                (jaccard_similarity(tokens, chosen) for _, _, chosen in selected),
+                default=0,
+            )
+            value = mmr_lambda * relevance - (1 - mmr_lambda) * redundancy
+            if best_value is None or value > best_value:
+                best_index, best_value = index, value
+        selected.append(pool.pop(best_index))
+    return [candidate for candidate, _, _ in selected]
+
+
+def pack_context(candidates, k, token_budget, mmr_lambda=0.7, dedup_threshold=0.85):
+    """
+    Seleciona e corta os chunks que vão para o prompt.
+
+    Remove quase-duplicatas, reordena com MMR e preenche o orçamento de tokens em
+    fim de sentença, na ordem de seleção. Um chunk cuja primeira sentença não cabe
+    entra cortado em fim de palavra; só fica de fora o que não cabe nem com uma
+    palavra.
+
+    :return: Lista de candidatos (cópias) com ``chunk`` já truncado.
+    """
+    unique = drop_near_duplicates(candidates, dedup_threshold)
+    packed = []
+    remaining = token_budget
+    for candidate in mmr_rerank(unique, k, mmr_lambda):
+        if remaining <= 0:
+            break
+        chunk = truncate_to_budget(candidate.get("chunk", ""), remaining)
+        if not chunk:
+            continue
+        packed.append({**candidate, "chunk": chunk})
+        remaining -= estimate_tokens(chunk)
+    return packed
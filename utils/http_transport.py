@@ -0,0 +1,137 @@
+import os
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# métodos que podem ser repetidos sem efeito colateral
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class HostBusyError(requests.RequestException):
+    """Levantada quando o limite de requisições simultâneas de um host se esgota."""
+
+
+class HttpTransport:
+    """
+    Camada HTTP compartilhada pelas ferramentas que chamam serviços externos.
+
+    Mantém uma ``requests.Session`` com pool de conexões keep-alive (tamanho por
+    host), timeouts de conexão e leitura aplicados a toda requisição, retry com
+    backoff apenas para métodos idempotentes e um limite de requisições
+    simultâneas por host, para que um serviço lento não prenda todos os workers.
+
+    Configuração: ``HTTP_POOL_MAXSIZE``, ``HTTP_CONNECT_TIMEOUT``,
+    ``HTTP_READ_TIMEOUT``, ``HTTP_RETRIES``, ``HTTP_BACKOFF_FACTOR`` e
+    ``HTTP_MAX_CONCURRENCY_PER_HOST``.
+    """
+
+    def __init__(
+        self,
+        pool_maxsize=None,
+        connect_timeout=None,
+        read_timeout=None,
+        retries=None,
+        backoff_factor=None,
+        max_concurrency_per_host=None,
+    ):
+        self.pool_maxsize = pool_maxsize or int(os.getenv("HTTP_POOL_MAXSIZE", "10"))
+        self.timeout = (
+            connect_timeout or float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05")),
+            read_timeout or float(os.getenv("HTTP_READ_TIMEOUT", "10")),
+        )
+        self.retries = (
+            retries if retries is not None else int(os.getenv("HTTP_RETRIES", "2"))
+        )
+        self.backoff_factor = (
+            backoff_factor
+            if backoff_factor is not None
+            else float(os.getenv("HTTP_BACKOFF_FACTOR", "0.3"))
+        )
+        self.max_concurrency_per_host = max_concurrency_per_host or int(
+            os.getenv("HTTP_MAX_CONCURRENCY_PER_HOST", str(self.pool_maxsize))
+        )
+
+        self.session = requests.Session()
+        adapter = self._create_adapter(self.pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._host_limits = {}
+        self._host_semaphores = {}
+        self._lock = threading.Lock()
+
+    def _create_adapter(self, pool_maxsize):
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=IDEMPOTENT_METHODS,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        return HTTPAdapter(
+            pool_connections=4, pool_maxsize=pool_maxsize, max_retries=retry
+        )
+
+    def configure_host(self, base_url, pool_maxsize=None, max_concurrency=None):
+        """
+        Ajusta o pool e o limite de concorrência de um host específico.
+
+        :param base_url: URL base do serviço (ex.: https://instancia.service-now.com).
+        """
+        if pool_maxsize:
+            self.session.mount(base_url, self._create_adapter(pool_maxsize))
+        if max_concurrency:
+            with self._lock:
+                host = urlsplit(base_url).netloc
+                self._host_limits[host] = max_concurrency
+                self._host_semaphores.pop(host, None)
+
+    def request(self, method, url, **kwargs):
+        """
+        Envia a requisição pelo pool compartilhado.
+
+        :raises HostBusyError: Se o host atingiu o limite de requisições simultâneas
+            e nenhuma vaga abriu dentro do timeout de conexão.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        host = urlsplit(url).netloc
+        semaphore = self._semaphore_for(host)
+        if not semaphore.acquire(timeout=self.timeout[0]):
+            raise HostBusyError(f"Limite de requisições simultâneas para {host}.")
+        try:
+            return self.session.request(method, url, **kwargs)
+        finally:
+            semaphore.release()
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def _semaphore_for(self, host):
+        with self._lock:
+            semaphore = self._host_semaphores.get(host)
+            if semaphore is None:
+                limit = self._host_limits.get(host, self.max_concurrency_per_host)
+                semaphore = threading.BoundedSemaphore(limit)
+                self._host_semaphores[host] = semaphore
+            return semaphore
+
+
+_default_transport = None
+_default_lock = threading.Lock()
+
+
+def get_default_transport():
+    """Retorna o HttpTransport compartilhado do processo, criando-o no primeiro uso."""
+    global _default_transport
+    with _default_lock:
+        if _default_transport is None:
+            _default_transport = HttpTransport()
+        return _default_transport
@@ -0,0 +1,255 @@
+import asyncio
+import functools
+import threading
+import time
+from bisect import bisect_left
+
+# buckets de latência em segundos (de chamadas de cache a runs longos)
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    Contador monotônico, com ou sem labels. ``inc`` custa um lock e uma soma.
+    """
+
+    type_name = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        return self._values.get(key, 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}_total", _format_labels(self.labelnames, key), value
+
+
+class Histogram:
+    """
+    Histograma com buckets fixos. ``observe`` localiza o bucket com bisect e guarda
+    só a contagem do bucket; os acumulados são calculados na exportação.
+    """
+
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        series = self._series.get(key)
+        return series[2] if series else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted(
+                (key, (list(counts), total, count))
+                for key, (counts, total, count) in self._series.items()
+            )
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(
+                    self.labelnames, key, [("le", _format_value(bound))]
+                )
+                yield f"{self.name}_bucket", labels, cumulative
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+
+class MetricsRegistry:
+    """
+    Registro de métricas do processo, exportado no formato texto do Prometheus.
+    """
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """Exporta todas as métricas no formato texto do Prometheus (0.0.4)."""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+REQUEST_LATENCY = metrics.histogram(
+    "chat_request_duration_seconds",
+    "Latência das requisições HTTP, por rota e status.",
+    ("route", "status"),
+)
+RUN_STATUS = metrics.counter(
+    "assistant_runs", "Runs finalizados, por status.", ("status",)
+)
+RUN_POLLS = metrics.histogram(
+    "assistant_run_polls",
+    "Idas ao servidor para acompanhar o run, por requisição.",
+    buckets=COUNT_BUCKETS,
+)
+TOOL_CALLS = metrics.counter("tool_calls", "Chamadas de ferramentas.", ("tool",))
+TOOL_ERRORS = metrics.counter(
+    "tool_errors", "Chamadas de ferramentas com erro ou timeout.", ("tool",)
+)
+TOOL_LATENCY = metrics.histogram(
+    "tool_call_duration_seconds", "Latência das ferramentas.", ("tool",)
+)
+SEARCH_LATENCY = metrics.histogram(
+    "ai_search_duration_seconds", "Latência das buscas no Azure AI Search."
+)
+SEARCH_RESULTS = metrics.histogram(
+    "ai_search_results",
+    "Quantidade de trechos retornados por busca.",
+    buckets=COUNT_BUCKETS,
+)
+SEARCH_PREFETCH = metrics.counter(
+    "ai_search_prefetch",
+    "Buscas adiantadas com a mensagem do usuário, por desfecho.",
+    ("outcome",),
+)
+
+
+def record_run(context):
+    """Registra o status final e as consultas do run de uma requisição."""
+    if context.run is not None:
+        RUN_STATUS.inc(status=context.run.status)
+    RUN_POLLS.observe(context.poll_count)
+
+
+def track_request(route):
+    """
+    Decorator que mede a latência da rota em REQUEST_LATENCY. Funciona com
+    funções síncronas e assíncronas e preserva a assinatura (bindings do Functions).
+
+    Em respostas com ``body_iterator`` (StreamingResponse), a medição vai até o
+    fim do stream (último evento ou desconexão do cliente), e não só até os headers.
+    """
+
+    def decorator(func):
+        def observe(started, response):
+            status = getattr(response, "status_code", 200)
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - started, route=route, status=str(status)
+            )
+
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    response = await func(*args, **kwargs)
+                except BaseException:
+                    observe(started, _ERROR)
+                    raise
+                if getattr(response, "body_iterator", None) is not None:
+                    response.body_iterator = _observe_stream(
+                        response.body_iterator, lambda: observe(started, response)
+                    )
+                else:
+                    observe(started, response if response is not None else _ERROR)
+                return response
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            response = None
+            try:
+                response = func(*args, **kwargs)
+                return response
+            finally:
+                observe(started, response if response is not None else _ERROR)
+
+        return wrapper
+
+    return decorator
+
+
+async def _observe_stream(body_iterator, observe):
+    try:
+        async for chunk in body_iterator:
+            yield chunk
+    finally:
+        observe()
+
+
+class _ErrorResponse:
+    status_code = 500
+
+
+_ERROR = _ErrorResponse()
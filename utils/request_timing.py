@@ -0,0 +1,84 @@
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+_METRIC_NAME_RE = re.compile(r"[^A-Za-z0-9_.\-]")
+
+
+class RequestTimer:
+    """
+    Cascata de tempos de uma requisição.
+
+    Cada fase (``phase``) ou medição avulsa (``record``) vira uma entrada com início
+    relativo ao começo da requisição e duração em ms. As entradas alimentam o header
+    ``Server-Timing`` e o payload de debug. ``record`` é seguro para threads, pois as
+    ferramentas de uma rodada registram seus tempos em paralelo.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self._clock = clock
+        self.started_at = clock()
+        self.entries = []
+        self._sort_keys = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name, **details):
+        """
+        Mede o bloco (também serve para blocos com ``await``).
+
+        :return: O dicionário de detalhes da fase, que o bloco pode completar.
+        """
+        started = self._clock()
+        try:
+            yield details
+        finally:
+            self._append(name, started, self._clock() - started, details)
+
+    def record(self, name, duration_ms, started=None, **details):
+        """
+        Registra uma medição já feita.
+
+        :param started: perf_counter() do início; padrão: agora menos a duração.
+        """
+        duration = duration_ms / 1000
+        if started is None:
+            started = self._clock() - duration
+        self._append(name, started, duration, details)
+
+    def _append(self, name, started, duration, details):
+        entry = {
+            "name": name,
+            "start_ms": round((started - self.started_at) * 1000, 1),
+            "duration_ms": round(duration * 1000, 1),
+        }
+        if details:
+            entry.update(details)
+        with self._lock:
+            # ordena pelos tempos sem arredondamento: fases rápidas empatariam
+            self._sort_keys.append((started, -duration, len(self.entries)))
+            self.entries.append(entry)
+
+    def total_ms(self):
+        return round((self._clock() - self.started_at) * 1000, 1)
+
+    def server_timing(self):
+        """
+        Monta o valor do header Server-Timing, na ordem de início das fases, com
+        a duração total no final.
+        """
+        parts = [
+            f"{_METRIC_NAME_RE.sub('_', entry['name'])};dur={entry['duration_ms']}"
+            for entry in self.sorted_entries()
+        ]
+        parts.append(f"total;dur={self.total_ms()}")
+        return ", ".join(parts)
+
+    def sorted_entries(self):
+        with self._lock:
+            # fases que começam juntas: a que engloba a outra vem antes
+            return [self.entries[key[2]] for key in sorted(self._sort_keys)]
+
+    def as_dict(self):
+        return {"total_ms": self.total_ms(), "phases": self.sorted_entries()}
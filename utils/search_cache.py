@@ -0,0 +1,51 @@
+import os
+
+from utils.cache_generation import get_cache_generation
+from utils.text_cache import SimilarTextCache
+
+
+class SearchResultCache(SimilarTextCache):
+    """
+    Cache de resultados da busca vetorizada.
+
+    A chave é (query normalizada, k_results, índice), com despejo LRU e TTL. No modo
+    de quase-duplicatas (``AI_SEARCH_CACHE_SIMILARITY`` > 0), uma query que não
+    bate exatamente reaproveita o resultado de outra query em cache cuja
+    similaridade de palavras (Jaccard) seja maior ou igual ao limiar. A geração
+    dos caches (CacheGeneration) completa a chave, como no AnswerCache.
+    """
+
+    def __init__(
+        self,
+        max_size=None,
+        ttl_seconds=None,
+        similarity_threshold=None,
+        generation=None,
+    ):
+        super().__init__(
+            max_size=max_size or int(os.getenv("AI_SEARCH_CACHE_SIZE", "256")),
+            ttl_seconds=ttl_seconds
+            or float(os.getenv("AI_SEARCH_CACHE_TTL_SECONDS", "300")),
+            similarity_threshold=(
+                similarity_threshold
+                if similarity_threshold is not None
+                else float(os.getenv("AI_SEARCH_CACHE_SIMILARITY", "0"))
+            ),
+        )
+        self.generation = generation or get_cache_generation()
+
+    def get(self, query, k_results, index_name):
+        """
+        Retorna o resultado em cache para a busca, ou None.
+        """
+        return super().get(query, self._scope(k_results, index_name))
+
+    def set(self, query, k_results, index_name, value):
+        super().set(query, value, self._scope(k_results, index_name))
+
+    def _scope(self, k_results, index_name):
+        return (k_results, index_name, self.generation.current())
+
+    def clear(self):
+        """Descarta todo o cache (ex.: após reindexação do índice de busca)."""
+        super().clear()
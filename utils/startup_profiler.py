@@ -0,0 +1,143 @@
+import builtins
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupProfiler:
+    """
+    Mede o tempo de parede de cada fase do cold start.
+
+    As fases são registradas com ``phase(nome)`` (aninháveis) e as ferramentas com
+    ``record_tool``. Com ``STARTUP_PROFILE_IMPORTS=true``, ``track_imports`` também
+    mede o tempo de cada import de primeiro nível (inclui os imports que ele puxa).
+    ``finish`` loga um resumo de uma linha; ``as_dict`` alimenta o endpoint de
+    diagnóstico.
+    Attributes:
+        started_at (float): perf_counter() when the profiler was created.
+        phases (list): Recorded phases, in the order they finished.
+        tools (dict): Construction time of each tool, in ms.
+        imports (dict): Inclusive time of each top-level import, in ms.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self._clock = clock
+        self.started_at = clock()
+        self.started_at_epoch = time.time()
+        self.phases = []
+        self.tools = {}
+        self.imports = {}
+        self.total_ms = None
+        self._depth = 0
+        self._lock = threading.Lock()
+        self._original_import = None
+
+    def _elapsed_ms(self, since):
+        return round((self._clock() - since) * 1000, 1)
+
+    @contextmanager
+    def phase(self, name):
+        """Mede o bloco como uma fase do startup."""
+        started = self._clock()
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            self.phases.append(
+                {
+                    "name": name,
+                    "start_ms": round((started - self.started_at) * 1000, 1),
+                    "duration_ms": self._elapsed_ms(started),
+                    "depth": self._depth,
+                }
+            )
+
+    def record_tool(self, name, duration_ms, lazy=False):
+        """Registra o tempo de construção de uma ferramenta."""
+        with self._lock:
+            self.tools[name] = {"duration_ms": round(duration_ms, 1), "lazy": lazy}
+
+    def track_imports(self, enabled=None):
+        """
+        Passa a medir os imports de primeiro nível (``STARTUP_PROFILE_IMPORTS``).
+        Só módulos ainda não carregados contam; imports aninhados entram no tempo
+        do import que os originou.
+        """
+        if enabled is None:
+            enabled = os.getenv("STARTUP_PROFILE_IMPORTS", "false").lower() == "true"
+        if not enabled or self._original_import is not None:
+            return
+        self._original_import = builtins.__import__
+        original_import = self._original_import
+        state = threading.local()
+
+        def timed_import(name, *args, **kwargs):
+            if getattr(state, "active", False) or name in sys.modules:
+                return original_import(name, *args, **kwargs)
+            state.active = True
+            started = self._clock()
+            try:
+                return original_import(name, *args, **kwargs)
+            finally:
+                state.active = False
+                self.imports[name] = self._elapsed_ms(started)
+
+        builtins.__import__ = timed_import
+
+    def stop_tracking_imports(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def finish(self):
+        """Encerra a medição do startup e loga o resumo."""
+        self.stop_tracking_imports()
+        self.total_ms = self._elapsed_ms(self.started_at)
+        logging.info(self.summary())
+        return self.total_ms
+
+    def summary(self):
+        """Resumo de uma linha: total, fases de primeiro nível e ferramentas."""
+        total = (
+            self.total_ms
+            if self.total_ms is not None
+            else self._elapsed_ms(self.started_at)
+        )
+        parts = [
+            f"{phase['name']}={phase['duration_ms']:.0f}ms"
+            for phase in self.phases
+            if phase["depth"] == 0
+        ]
+        eager_tools = {
+            name: info for name, info in self.tools.items() if not info["lazy"]
+        }
+        if eager_tools:
+            parts.append(
+                "tools=["
+                + ", ".join(
+                    f"{name}={info['duration_ms']:.0f}ms"
+                    for name, info in eager_tools.items()
+                )
+                + "]"
+            )
+        return f"Startup em {total:.0f} ms: " + " ".join(parts)
+
+    def as_dict(self):
+        slowest_imports = sorted(
+            self.imports.items(), key=lambda item: item[1], reverse=True
+        )
+        return {
+            "started_at": self.started_at_epoch,
+            "total_ms": self.total_ms,
+            "phases": list(self.phases),
+            "tools": dict(self.tools),
+            "imports": dict(slowest_imports),
+        }
+
+
+# profiler do processo: criado no primeiro import, idealmente o primeiro de todos
+startup_profiler = StartupProfiler()
@@ -0,0 +1,32 @@
+import re
+import unicodedata
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def normalize_text(text):
+    """
+    Normaliza um texto para comparação: minúsculas, sem acentos e com espaços
+    e pontuação colapsados.
+    """
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(_WORD_RE.findall(text.lower()))
+
+
+def token_set(text):
+    """Conjunto de palavras do texto normalizado."""
+    return set(normalize_text(text).split())
+
+
+def jaccard_similarity(a, b):
+    """
+    Similaridade de Jaccard entre os conjuntos de palavras de dois textos (0 a 1).
+
+    Aceita textos ou conjuntos já tokenizados.
+    """
+    tokens_a = a if isinstance(a, (set, frozenset)) else token_set(a)
+    tokens_b = b if isinstance(b, (set, frozenset)) else token_set(b)
+    if not tokens_a and not tokens_b:
+        return 1.0
+    return len(tokens_a & tokens_b) / len(tokens_a | tokens_b)
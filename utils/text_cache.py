@@ -0,0 +1,77 @@
+import threading
+
+from utils.cache import TTLCache
+from utils.text import jaccard_similarity, normalize_text
+
+
+class SimilarTextCache:
+    """
+    Cache indexado por texto normalizado mais um escopo (ex.: parâmetros da busca).
+
+    Acertos exatos usam o texto normalizado. Com ``similarity_threshold`` > 0, um
+    texto sem acerto exato reaproveita o valor de outro texto do mesmo escopo cuja
+    similaridade de palavras (Jaccard) seja maior ou igual ao limiar.
+    Attributes:
+        similarity_threshold (float): Near-duplicate threshold; 0 disables the mode.
+    """
+
+    def __init__(self, max_size, ttl_seconds, similarity_threshold=0):
+        self._cache = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self.similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(text, scope=()):
+        return (normalize_text(text),) + tuple(scope)
+
+    def get(self, text, scope=()):
+        """
+        Retorna o valor em cache para o texto no escopo, ou None.
+        """
+        key = self.key(text, scope)
+        value = self._cache.get(key)
+        if value is not None:
+            self._count("hits")
+            return value
+
+        if self.similarity_threshold > 0:
+            tokens = set(key[0].split())
+            match = self._cache.find(
+                lambda cached: cached[1:] == key[1:]
+                and jaccard_similarity(tokens, set(cached[0].split()))
+                >= self.similarity_threshold
+            )
+            if match is not None:
+                self._count("near_hits")
+                return match[1]
+
+        self._count("misses")
+        return None
+
+    def set(self, text, value, scope=()):
+        self._cache.set(self.key(text, scope), value)
+
+    def clear(self):
+        """Descarta todo o cache."""
+        self._cache.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.near_hits + self.misses
+            return {
+                "size": len(self._cache),
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "evictions": self._cache.evictions,
+                "hit_ratio": (
+                    (self.hits + self.near_hits) / lookups if lookups else 0.0
+                ),
+            }
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
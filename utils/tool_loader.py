@@ -1,8 +1,16 @@
+import asyncio
 import importlib
 import inspect
+import json
 import logging
+import os
+import threading
+import time
 import yaml
 from interfaces.tool_base import AssistantToolBase
+from utils.startup_profiler import startup_profiler
+
+MANIFEST_FILENAME = "manifest.json"
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -21,32 +29,178 @@ def get_enabled_tools_from_config(path="config.yaml"):
         return []
 
 
-def load_tools_from_package(package):
+class LazyTool(AssistantToolBase):
+    """
+    Ferramenta declarada no manifest: o schema vem do manifest e o módulo só é
+    importado (e a classe instanciada) na primeira execução.
+
+    Se a construção falhar, o erro sobe para a chamada (que o ToolDispatcher
+    transforma em output de erro) e a próxima chamada tenta de novo.
+    Attributes:
+        module_path (str): Full module path of the tool.
+        class_name (str): Name of the AssistantToolBase subclass in the module.
+        tool (AssistantToolBase): The real tool, or None while not loaded.
+    """
+
+    def __init__(self, module_path, class_name, schema):
+        self.module_path = module_path
+        self.class_name = class_name
+        self.schema = schema
+        self.tool = None
+        self._lock = threading.Lock()
+
+    def get_tool_infos(self):
+        return self.schema
+
+    def load(self):
+        """Importa e instancia a ferramenta real, uma única vez."""
+        if self.tool is None:
+            with self._lock:
+                if self.tool is None:
+                    started = time.perf_counter()
+                    module = importlib.import_module(self.module_path)
+                    self.tool = getattr(module, self.class_name)()
+                    startup_profiler.record_tool(
+                        self.class_name,
+                        (time.perf_counter() - started) * 1000,
+                        lazy=True,
+                    )
+                    logger.info(f"Tool carregada sob demanda: {self.class_name}")
+        return self.tool
+
+    def execute(self, **kwargs):
+        return self.load().execute(**kwargs)
+
+    async def aexecute(self, **kwargs):
+        # a importação e a construção bloqueiam; ficam fora do event loop
+        tool = self.tool or await asyncio.to_thread(self.load)
+        return await tool.aexecute(**kwargs)
+
+
+def get_manifest_path(package):
+    return os.path.join(list(package.__path__)[0], MANIFEST_FILENAME)
+
+
+def read_tools_manifest(package):
+    """
+    Lê o manifest de ferramentas do pacote (``manifest.json``).
+
+    :return: Dicionário {módulo: {"class": nome, "schema": schema, "required_env":
+        [variáveis]}}; vazio se não houver manifest ou se ele estiver inválido.
+    """
+    path = get_manifest_path(package)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError) as e:
+        logger.error(f"Erro ao carregar o manifest de ferramentas: {e}")
+        return {}
+
+
+def _find_tool_classes(module):
+    return [
+        cls
+        for _, cls in inspect.getmembers(module, inspect.isclass)
+        if issubclass(cls, AssistantToolBase)
+        and cls not in (AssistantToolBase, LazyTool)
+    ]
+
+
+def write_tools_manifest(package, path=None):
+    """
+    Gera o manifest instanciando as ferramentas habilitadas. Deve ser executado
+    (``python -m utils.tool_loader``) sempre que o schema de uma ferramenta mudar.
+
+    :return: O manifest gerado.
+    """
+    manifest = {}
+    for module_name in get_enabled_tools_from_config():
+        try:
+            module = importlib.import_module(f"{package.__name__}.{module_name}")
+        except ImportError as e:
+            logger.error(f"Erro ao importar módulo '{module_name}': {e}")
+            continue
+        for cls in _find_tool_classes(module):
+            manifest[module_name] = {
+                "class": cls.__name__,
+                "schema": cls().get_tool_infos(),
+            }
+            if cls.required_env:
+                manifest[module_name]["required_env"] = list(cls.required_env)
+    with open(path or get_manifest_path(package), "w", encoding="utf-8") as file:
+        json.dump(manifest, file, ensure_ascii=False, indent=2)
+        file.write("\n")
+    return manifest
+
+
+def load_tools_from_package(package, lazy=None):
+    """
+    Carrega as ferramentas habilitadas em config.yaml, na ordem do config.
+
+    Com carregamento lazy (``TOOL_LAZY_LOADING``, padrão: true), as ferramentas
+    presentes no manifest viram LazyTool, sem importar nem instanciar nada no
+    cold start. As ausentes do manifest são carregadas na hora, como antes.
+
+    Uma ferramenta do manifest só é anunciada ao assistente se as variáveis de
+    ambiente de que depende (``required_env``) estiverem definidas; sem elas, ela
+    fica de fora, como aconteceria se a construção falhasse no carregamento eager.
+    """
     tools = []
-    enabled_tools = get_enabled_tools_from_config()
+    with startup_profiler.phase("tools.config"):
+        enabled_tools = get_enabled_tools_from_config()
     if not enabled_tools:
         logger.warning("Nenhuma ferramenta habilitada em config.yaml.")
         return tools
 
+    if lazy is None:
+        lazy = os.getenv("TOOL_LAZY_LOADING", "true").lower() == "true"
+    with startup_profiler.phase("tools.manifest"):
+        manifest = read_tools_manifest(package) if lazy else {}
     successfully_loaded = set()
 
     # Itera na ordem exata em que aparecem no config
     for module_name in enabled_tools:
+        entry = manifest.get(module_name)
+        if entry:
+            missing_env = [
+                name for name in entry.get("required_env", []) if not os.getenv(name)
+            ]
+            if missing_env:
+                logger.error(
+                    f"Erro ao carregar '{entry['class']}': variáveis não configuradas: "
+                    f"{', '.join(missing_env)}"
+                )
+                continue
+            tools.append(
+                LazyTool(
+                    f"{package.__name__}.{module_name}",
+                    entry["class"],
+                    entry["schema"],
+                )
+            )
+            successfully_loaded.add(module_name)
+            continue
+
+        started = time.perf_counter()
         try:
             module = importlib.import_module(f"{package.__name__}.{module_name}")
         except ImportError as e:
             logger.error(f"Erro ao importar módulo '{module_name}': {e}")
             continue  # NÃO interrompe o loop
         found = False
-        for _, cls in inspect.getmembers(module, inspect.isclass):
-            if issubclass(cls, AssistantToolBase) and cls is not AssistantToolBase:
-                try:
-                    tools.append(cls())
-                    logger.info(f"Tool carregada: {cls.__name__}")
-                    successfully_loaded.add(module_name)
-                    found = True
-                except Exception as inst_e:
-                    logger.error(f"Erro ao instanciar '{cls.__name__}': {inst_e}")
+        for cls in _find_tool_classes(module):
+            try:
+                tools.append(cls())
+                startup_profiler.record_tool(
+                    cls.__name__, (time.perf_counter() - started) * 1000
+                )
+                logger.info(f"Tool carregada: {cls.__name__}")
+                successfully_loaded.add(module_name)
+                found = True
+            except Exception as inst_e:
+                logger.error(f"Erro ao instanciar '{cls.__name__}': {inst_e}")
         if not found:
             logger.warning(f"Nenhuma classe válida encontrada em '{module_name}'.")
 
@@ -58,3 +212,9 @@ def load_tools_from_package(package):
         )
 
     return tools
+
+
+if __name__ == "__main__":
+    from services import tools as tools_package
+
+    write_tools_manifest(tools_package)
@@ -0,0 +1,180 @@
+import asyncio
+import functools
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import zlib
+
+
+def parse_server_timing(header):
+    """
+    Converte o header Server-Timing em uma lista de fases.
+
+    :return: Lista de dicionários (name, duration_ms), na ordem do header.
+    """
+    phases = []
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        duration = None
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "dur":
+                try:
+                    duration = float(value)
+                except ValueError:
+                    pass
+        phases.append({"name": name, "duration_ms": duration})
+    return phases
+
+
+class TraceRecorder:
+    """
+    Grava o tráfego real das rotas de chat em um arquivo JSON lines, para ser
+    reproduzido depois pelo benchmarks/replay.py.
+
+    Cada linha traz o instante da chegada, o body da requisição, o threadId
+    devolvido (que encadeia os turnos da conversa), o status, a duração e as
+    fases do header Server-Timing. A amostragem é por conversa: o hash do
+    threadId decide, então uma conversa amostrada é gravada inteira.
+
+    Os traces contêm as mensagens dos usuários; a gravação é desligada por padrão.
+    Attributes:
+        path (str): JSON lines file the traces are appended to (TRACE_PATH).
+        sample_rate (float): Fraction of conversations recorded (TRACE_SAMPLE_RATE).
+    """
+
+    def __init__(self, path=None, sample_rate=None):
+        self.path = (
+            path
+            or os.getenv("TRACE_PATH")
+            or os.path.join(tempfile.gettempdir(), "chat_traces.jsonl")
+        )
+        self.sample_rate = (
+            sample_rate
+            if sample_rate is not None
+            else float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+        )
+        self._lock = threading.Lock()
+
+    def sampled(self, thread_id):
+        """Indica se a conversa entra na amostra (determinístico por threadId)."""
+        if self.sample_rate >= 1:
+            return True
+        if not thread_id or self.sample_rate <= 0:
+            return False
+        return zlib.crc32(thread_id.encode("utf-8")) % 10000 < self.sample_rate * 10000
+
+    def record(self, route, request_body, response, started_at, duration_ms):
+        """
+        Grava uma requisição, se a conversa estiver na amostra.
+
+        :param request_body: Body JSON da requisição.
+        :param response: HttpResponse devolvido pela rota.
+        :param started_at: time.time() da chegada da requisição.
+        """
+        try:
+            response_body = json.loads(response.get_body())
+        except (ValueError, TypeError):
+            response_body = {}
+        thread_id = response_body.get("threadId") or request_body.get("threadId")
+        if not self.sampled(thread_id):
+            return
+        record = {
+            "ts": round(started_at, 3),
+            "route": route,
+            "request": {
+                "role": request_body.get("role"),
+                "content": request_body.get("content"),
+                "threadId": request_body.get("threadId"),
+            },
+            "threadId": thread_id,
+            "status": response.status_code,
+            "duration_ms": round(duration_ms, 1),
+            "phases": parse_server_timing(response.headers.get("Server-Timing")),
+        }
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logging.error(f"Falha ao gravar o trace da requisição: {e}")
+
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+def get_trace_recorder():
+    """
+    Recorder do processo, ou None quando TRACE_RECORDING_ENABLED não é "true".
+    """
+    global _recorder
+    if os.getenv("TRACE_RECORDING_ENABLED", "false").lower() != "true":
+        return None
+    if _recorder is None:
+        with _recorder_lock:
+            if _recorder is None:
+                _recorder = TraceRecorder()
+    return _recorder
+
+
+def record_traces(route):
+    """
+    Decorator que grava a requisição e a resposta da rota no TraceRecorder.
+    Com a gravação desligada, só chama a rota. Funciona com funções síncronas e
+    assíncronas e preserva a assinatura (bindings do Functions).
+    """
+
+    def decorator(func):
+        def request_body(req):
+            try:
+                body = req.get_json()
+            except ValueError:
+                return None  # body inválido não tem o que reproduzir
+            return body if isinstance(body, dict) else None
+
+        def record(recorder, body, response, started_at, started):
+            if body is None or response is None:
+                return
+            try:
+                recorder.record(
+                    route,
+                    body,
+                    response,
+                    started_at,
+                    (time.perf_counter() - started) * 1000,
+                )
+            except Exception as e:
+                logging.error(f"Erro ao gravar o trace da requisição: {e}")
+
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(req, *args, **kwargs):
+                recorder = get_trace_recorder()
+                if recorder is None:
+                    return await func(req, *args, **kwargs)
+                started_at, started = time.time(), time.perf_counter()
+                response = await func(req, *args, **kwargs)
+                record(recorder, request_body(req), response, started_at, started)
+                return response
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(req, *args, **kwargs):
+            recorder = get_trace_recorder()
+            if recorder is None:
+                return func(req, *args, **kwargs)
+            started_at, started = time.time(), time.perf_counter()
+            response = func(req, *args, **kwargs)
+            record(recorder, request_body(req), response, started_at, started)
+            return response
+
+        return wrapper
+
+    return decorator